@@ -1,11 +1,26 @@
+from types import SimpleNamespace
 from agents.base import BaseAgent
+from agents.formatter import FormatterPolicy
+from agents.token_budget import budget_for, get_token_counter, token_log
 from datetime import datetime
+from config import settings
+from workflows.tracing import get_tracer
+from workflows.admission import get_admission
 
 class AggregatorAgent(BaseAgent):
-    def __init__(self, gemini_agent):
+    def __init__(self, gemini_agent, formatter=None):
         self.gemini = gemini_agent
+        # Decides when a local (templated) answer is enough and the LLM rewrite can be skipped
+        if formatter is None and settings.FORMATTER_ENABLED:
+            formatter = FormatterPolicy(
+                max_rows=settings.FORMATTER_MAX_ROWS,
+                max_columns=settings.FORMATTER_MAX_COLUMNS,
+                max_cell_chars=settings.FORMATTER_MAX_CELL_CHARS,
+                join_multi_agent=settings.FORMATTER_JOIN_MULTI_AGENT,
+            )
+        self.formatter = formatter
 
-    def summarize_database_output(self, table_text, user_message):
+    def _database_messages(self, table_text, user_message):
         prompt = (
             "You are a helpful and friendly assistant. Organize and present the following database table for the user in a clear, concise, and visually appealing summary. "
             "Use bullet points, short tables, or lists if helpful, and add emojis to enhance readability where appropriate. "
@@ -15,10 +30,9 @@ class AggregatorAgent(BaseAgent):
             f"User question: {user_message}\n"
             f"Database output:\n{table_text}\n"
         )
-        result = self.gemini.invoke([{"role": "user", "content": prompt}])
-        return result.content if hasattr(result, "content") else str(result)
+        return [{"role": "user", "content": prompt}]
 
-    def summarize_multiple_agents(self, agent_outputs, user_message):
+    def _multiple_agents_messages(self, agent_outputs, user_message):
         prompt = (
             "You are a helpful and friendly assistant. The following are responses from multiple support agents to the same user query. "
             "Please combine, reorganize, and summarize all relevant information into a single, concise, and easy-to-read reply for the user. "
@@ -28,39 +42,87 @@ class AggregatorAgent(BaseAgent):
             f"User question: {user_message}\n"
             "Agent outputs:\n"
         )
+        # Each agent output gets an equal share of the aggregator budget
+        counter, share = get_token_counter(), budget_for("aggregator") // max(1, len(agent_outputs))
         for label, text in agent_outputs:
-            prompt += f"[{label}]: {text}\n"
-        result = self.gemini.invoke([{"role": "user", "content": prompt}])
-        return result.content if hasattr(result, "content") else str(result)
+            prompt += f"[{label}]: {counter.truncate(text, share)}\n"
+        return [{"role": "user", "content": prompt}]
 
-    def process(self, state: dict) -> dict:
+    async def _astream_text(self, messages) -> tuple:
+        """(text, usage holder); astream lets workflow.astream(stream_mode="messages") forward tokens to the UI."""
+        parts, usage = [], None
+        async for chunk in self.gemini.astream(messages):
+            content = chunk.content if hasattr(chunk, "content") else str(chunk)
+            if isinstance(content, str):
+                parts.append(content)
+            usage = getattr(chunk, "usage_metadata", None) or usage
+        return "".join(parts), SimpleNamespace(usage_metadata=usage)
+
+    def _plan(self, state: dict, log_msg: list, now: str) -> dict:
+        """
+        Decide how to build the final answer.
+        Returns {"final_response": ...} for a pass-through, or
+        {"messages": [...], "done_log": ...} when an LLM summary is needed.
+        """
         assigned_agents = state.get("assigned_agents", [])
+        agent_results = state.get("agent_results", {})
         user_message = state.get("user_message", "")
-        log_msg = []
-        now = datetime.now().isoformat(timespec='seconds')
-        log_msg.append(f"[{now}] [AggregatorAgent] Processing assigned_agents: {[a['agent'] for a in assigned_agents]}")
-        waiting = [a["agent"] for a in assigned_agents if not a.get("result")]
+        agents = [a["agent"] for a in assigned_agents]
+        log_msg.append(f"[{now}] [AggregatorAgent] Processing assigned_agents: {agents}")
+        # The graph defers this node until all branches finish; this is only a safety net
+        waiting = [agent for agent in agents if not agent_results.get(agent)]
         if waiting:
-            log_msg.append(f"[{now}] [AggregatorAgent] Waiting for agents: {waiting}")
-            return {"logs": log_msg}
-        if len(assigned_agents) == 1:
-            agent = assigned_agents[0]["agent"]
-            result = assigned_agents[0].get("result", "")
-            if agent != "coffee_db_agent":
-                log_msg.append(f"[{now}] [AggregatorAgent] Single agent, passing through result.")
-                return {"final_response": result, "logs": log_msg}
-            summary = self.summarize_database_output(result, user_message)
-            log_msg.append(f"[{now}] [AggregatorAgent] Summarized database output.")
-            return {"final_response": summary, "logs": log_msg}
+            log_msg.append(f"[{now}] [AggregatorAgent] Missing results from agents: {waiting}")
+        if len(agents) == 1 and agents[0] != "coffee_db_agent":
+            log_msg.append(f"[{now}] [AggregatorAgent] Single agent, passing through result.")
+            return {"final_response": agent_results.get(agents[0], "")}
+        if self.formatter is not None:
+            with get_tracer().span("aggregator.format") as span:
+                decision = self.formatter.decide(user_message, agents, agent_results, state.get("agent_data", {}))
+                span.set(action=decision["action"])
+            log_msg.append(f"[{now}] [AggregatorAgent] Formatter policy: {decision['action']} ({decision['reason']})")
+            if decision["action"] == "local":
+                log_msg.append(f"[{now}] [AggregatorAgent] Formatted locally; LLM call skipped.")
+                return {"final_response": decision["response"]}
+        if len(agents) == 1:
+            result = agent_results.get(agents[0], "")
+            return {"messages": self._database_messages(result, user_message), "done_log": "Summarized database output."}
         agent_outputs = []
         for a in assigned_agents:
             agent = a["agent"]
-            result = a.get("result", "")
+            result = agent_results.get(agent, "")
             if result:
                 agent_outputs.append((agent, result))
-        summary = self.summarize_multiple_agents(agent_outputs, user_message)
-        log_msg.append(f"[{now}] [AggregatorAgent] Summarized multi-agent output.")
-        return {"final_response": summary.strip(), "logs": log_msg}
+        return {"messages": self._multiple_agents_messages(agent_outputs, user_message), "done_log": "Summarized multi-agent output."}
 
+    def _start(self, state: dict) -> dict:
+        """{"output": update} when no LLM call is needed, else the LLM call context (messages, done_log, logs, now)."""
+        log_msg = []
+        now = datetime.now().isoformat(timespec='seconds')
+        plan = self._plan(state, log_msg, now)
+        if "final_response" in plan:
+            return {"output": {"final_response": plan["final_response"], "logs": log_msg}}
+        return {**plan, "logs": log_msg, "now": now}
 
+    def _finish(self, ctx: dict, summary: str, usage, span) -> dict:
+        """usage: the LLM result (or a holder with its usage_metadata) for the token log."""
+        ctx["logs"].append(f"[{ctx['now']}] [AggregatorAgent] {ctx['done_log']}")
+        ctx["logs"].append(token_log("AggregatorAgent", ctx["now"], usage, ctx["messages"], summary, span=span))
+        return {"final_response": summary.strip(), "logs": ctx["logs"]}
+
+    def process(self, state: dict) -> dict:
+        ctx = self._start(state)
+        if "output" in ctx:
+            return ctx["output"]
+        with get_admission().stage("llm"), get_tracer().span("aggregator.llm") as span:
+            result = self.gemini.invoke(ctx["messages"])
+            return self._finish(ctx, result.content if hasattr(result, "content") else str(result), result, span)
 
+    async def aprocess(self, state: dict) -> dict:
+        ctx = self._start(state)
+        if "output" in ctx:
+            return ctx["output"]
+        async with get_admission().astage("llm"):
+            with get_tracer().span("aggregator.llm", streamed=True) as span:
+                summary, usage = await self._astream_text(ctx["messages"])
+                return self._finish(ctx, summary, usage, span)
@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Dict
 
@@ -17,5 +18,9 @@ class BaseAgent(ABC):
         """
         pass
 
-
-
+    async def aprocess(self, state: Dict) -> Dict:
+        """
+        Async variant of process, used by workflow.ainvoke()/astream().
+        Defaults to running process in a worker thread; agents override it to use ainvoke/astream.
+        """
+        return await asyncio.to_thread(self.process, state)
@@ -1,5 +1,37 @@
+import asyncio
+import re
 from agents.base import BaseAgent
+from agents.token_budget import budget_for, fit_context, get_token_counter, token_log
+from database.sql_cache import AS_OF_PREFIX
 from datetime import datetime
+from workflows.tracing import get_tracer
+from workflows.admission import get_admission
+
+# A question ends at "?" (ASCII or full-width); ";" also separates requests. Line breaks only
+# split when every line is a list item or a question (not the "As of <timestamp>" header).
+QUESTION_BOUNDARY = re.compile(r"(?<=[?？])\s+|\s*;+\s*")
+LIST_ITEM = re.compile(r"^(?:[-*•]|\d+[.)])\s*")
+QUESTION_WORD = re.compile(
+    r"[?？]|\b(?:what|when|where|which|who|whose|why|how|is|are|do|does|did|can|could|will|would|should|any|"
+    r"tell|show|list|give|explain|describe|recommend)\b|อะไร|ไหม|มั้ย|เท่าไ|ที่ไหน|เมื่อไ|กี่|ยังไง|อย่างไร|บ้าง|หรือเปล่า|แนะนำ|ขอ",
+    re.IGNORECASE,
+)
+
+def _chunks(text: str) -> tuple:
+    """(chunks, is_list); list items are kept even without a question word ("- parking")."""
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if len(lines) > 1 and all(LIST_ITEM.match(line) or line.endswith(("?", "？")) for line in lines):
+        return [LIST_ITEM.sub("", line) for line in lines], any(LIST_ITEM.match(line) for line in lines)
+    return [" ".join(lines)], False
+
+def split_questions(text: str, max_parts: int = 4) -> list:
+    """Sub-questions of a multi-part command ([text] when there is only one)."""
+    chunks, is_list = _chunks(AS_OF_PREFIX.sub("", text or ""))
+    parts = [p.strip() for chunk in chunks for p in QUESTION_BOUNDARY.split(chunk)
+             if len(p.strip()) > 2 and (is_list or QUESTION_WORD.search(p))]
+    if len(parts) <= 1:
+        return [text]
+    return parts[:max_parts - 1] + [" ".join(parts[max_parts - 1:])] if len(parts) > max_parts else parts
 
 class LanscapeCafeBot(BaseAgent):
     def __init__(self, rag_system, gemini_agent, system_prompt: str = None, top_k: int = 8):
@@ -15,35 +47,92 @@ class LanscapeCafeBot(BaseAgent):
             "- Always use the same language as the user."
         )
 
-    def process(self, state: dict) -> dict:
-        question = ""
+    def _get_question(self, state: dict) -> str:
         for a in state.get("assigned_agents", []):
             if a["agent"] == "landscape_cafe_bot":
-                question = a["command"]
-                break
+                return a["command"]
+        return ""
+
+    def _retrieve(self, question: str) -> tuple:
+        """(context, log note); a multi-part command is retrieved in one batch."""
+        parts = split_questions(question)
+        with get_tracer().span("cafe_bot.retrieve", queries=len(parts)):
+            results = self.rag.query_batch(parts, top_k=self.top_k)
+        # Interleave the per-question rankings, skipping chunks already taken, up to top_k chunks
+        seen, merged = set(), []
+        for rank in range(self.top_k):
+            for r in results:
+                if rank < len(r["ids"]) and r["ids"][rank] not in seen and len(merged) < self.top_k:
+                    seen.add(r["ids"][rank])
+                    merged.append((r["documents"][rank], r["metadatas"][rank]))
+        # Drop near-duplicate chunks and keep the context within the prompt budget
+        rows, budget = fit_context(merged, budget_for("landscape_cafe_bot"), get_token_counter())
+        context = self.rag.format_context(rows)
+        note = f"{len(parts)} sub-question(s), {budget['chunks_after']}/{budget['chunks_before']} chunks, {budget['tokens_after']} tokens"
+        if budget["tokens_after"] < budget["tokens_before"]:
+            note += (f" ({budget['duplicates']} duplicates removed, {budget['truncated'] + budget['dropped']} truncated/dropped, "
+                     f"{budget['tokens_before'] - budget['tokens_after']} tokens saved)")
+        reranked = [r["rerank"] for r in results if r.get("rerank") and not r["rerank"]["skipped"]]
+        if reranked:
+            note += (f", reranked {sum(s['candidates'] for s in reranked)} -> {sum(s['kept'] for s in reranked)} chunks, "
+                     f"~{sum(s['tokens_saved'] for s in reranked)} prompt tokens saved")
+        return context, note
+
+    def _build_messages(self, context: str, question: str) -> list:
+        user_prompt = f"Reference context:\n{context}\n\nUser question: {question}"
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+    def _start(self, state: dict) -> dict:
+        """Retrieve the context: {"output": update} on failure, else the LLM call context (messages, logs, now)."""
+        question = self._get_question(state)
         logs = []
         now = datetime.now().isoformat(timespec='seconds')
         logs.append(f"[{now}] [CafeBot] Received question: '{question}'")
         try:
-            context = self.rag.query(question, top_k=self.top_k)
-            logs.append(f"[{now}] [CafeBot] RAG context retrieved. Context length: {len(context)}")
+            context, note = self._retrieve(question)
+            logs.append(f"[{now}] [CafeBot] RAG context retrieved ({note}). Context length: {len(context)}")
         except Exception as e:
             logs.append(f"[{now}] [CafeBot][ERROR] Failed to retrieve context: {e}")
-            return {"result": f"❌ Failed to retrieve reference context: {e}", "logs": logs}
-        user_prompt = f"Reference context:\n{context}\n\nUser question: {question}"
-        messages = [
-            {"role": "system", "content": self.system_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
+            return {"output": {"agent_results": {"landscape_cafe_bot": f"❌ Failed to retrieve reference context: {e}"}, "logs": logs}}
+        return {"messages": self._build_messages(context, question), "logs": logs, "now": now}
+
+    def _read_response(self, ctx: dict, answer, span) -> str:
+        result = answer.content if hasattr(answer, "content") else str(answer)
+        ctx["logs"].append(f"[{ctx['now']}] [CafeBot] Gemini LLM returned answer. Length: {len(result)}")
+        ctx["logs"].append(token_log("CafeBot", ctx["now"], answer, ctx["messages"], result, span=span))
+        return result
+
+    def _llm_failed(self, ctx: dict, e: Exception) -> dict:
+        ctx["logs"].append(f"[{ctx['now']}] [CafeBot][ERROR] Gemini LLM failed: {e}")
+        return {"agent_results": {"landscape_cafe_bot": f"❌ Gemini LLM Error: {e}"}, "logs": ctx["logs"]}
+
+    def _finish(self, ctx: dict, result: str) -> dict:
+        ctx["logs"].append(f"[{ctx['now']}] [CafeBot] Result returned to aggregator.")
+        return {"agent_results": {"landscape_cafe_bot": result}, "logs": ctx["logs"]}
+
+    def process(self, state: dict) -> dict:
+        ctx = self._start(state)
+        if "output" in ctx:
+            return ctx["output"]
         try:
-            answer = self.gemini.invoke(messages)
-            result = answer.content if hasattr(answer, "content") else str(answer)
-            logs.append(f"[{now}] [CafeBot] Gemini LLM returned answer. Length: {len(result)}")
+            with get_admission().stage("llm"), get_tracer().span("cafe_bot.llm") as span:
+                result = self._read_response(ctx, self.gemini.invoke(ctx["messages"]), span)
         except Exception as e:
-            logs.append(f"[{now}] [CafeBot][ERROR] Gemini LLM failed: {e}")
-            return {"result": f"❌ Gemini LLM Error: {e}", "logs": logs}
-        for a in state.get("assigned_agents", []):
-            if a["agent"] == "landscape_cafe_bot":
-                a["result"] = result
-        logs.append(f"[{now}] [CafeBot] Result set in assigned_agents.")
-        return {"logs": logs} 
\ No newline at end of file
+            return self._llm_failed(ctx, e)
+        return self._finish(ctx, result)
+
+    async def aprocess(self, state: dict) -> dict:
+        # Retrieval is CPU-bound (embedding), keep it off the event loop
+        ctx = await asyncio.to_thread(self._start, state)
+        if "output" in ctx:
+            return ctx["output"]
+        try:
+            async with get_admission().astage("llm"):
+                with get_tracer().span("cafe_bot.llm") as span:
+                    result = self._read_response(ctx, await self.gemini.ainvoke(ctx["messages"]), span)
+        except Exception as e:
+            return self._llm_failed(ctx, e)
+        return self._finish(ctx, result)
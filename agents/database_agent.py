@@ -1,59 +1,52 @@
+import asyncio
 from agents.base import BaseAgent
-import sqlite3
+from agents.token_budget import budget_for, compact_table, get_token_counter, token_log
 import pandas as pd
 from datetime import datetime
 import re
+from config import settings
+from database.guard import QueryGuardError, describe, guarded_query
+from database.pool import get_pool
+from database.schema import get_schema_overview
+from workflows.tracing import get_tracer
+from workflows.admission import get_admission
 
 class CoffeeDatabaseAgent(BaseAgent):
-    def __init__(self, db_path: str, llm_agent):
+    def __init__(self, db_path: str, llm_agent, sql_cache=None, index_advisor=None):
         self.db_path = db_path
         self.llm_agent = llm_agent
+        # Optional SQLPlanCache (database/sql_cache.py) shared across sessions
+        self.sql_cache = sql_cache
+        # Optional IndexAdvisor (database/index_advisor.py); indexes are created on the next sync
+        self.index_advisor = index_advisor
+        # Read-only per-thread connections shared by every session (database/pool.py)
+        self.pool = get_pool(db_path, mmap_size=settings.DB_MMAP_SIZE, cache_size_kib=settings.DB_CACHE_SIZE_KIB)
 
     def check_connection(self) -> bool:
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.execute("SELECT 1;")
-            conn.close()
-            return True
+            return self.pool.check()
         except Exception as e:
             print(f"[DatabaseAgent] DB Connection Error: {e}")
             return False
 
     def get_schema_overview(self) -> str:
+        # Precomputed by database/create_db.py and cached until the DB files change
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            tables = cursor.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
-            if not tables:
-                return "(No tables found)"
-            lines = []
-            for (table,) in tables:
-                columns = cursor.execute(f"PRAGMA table_info({table})").fetchall()
-                col_list = [col[1] for col in columns]
-                col_meta = []
-                for col in col_list:
-                    if any(kw in col.lower() for kw in ["status", "type", "category", "state", "flag"]):
-                        vals = cursor.execute(f"SELECT DISTINCT {col} FROM {table} LIMIT 21").fetchall()
-                        vals = [str(v[0]) for v in vals if v[0] is not None]
-                        if 1 < len(vals) <= 20:
-                            col_meta.append(f"{col}: [{', '.join(vals)}]")
-                if col_meta:
-                    lines.append(f"{table}({', '.join(col_list)})  # " + "; ".join(col_meta))
-                else:
-                    lines.append(f"{table}({', '.join(col_list)})")
-            conn.close()
-            return "\n".join(lines)
+            return get_schema_overview(self.db_path, conn=self.pool.connection())
         except Exception as e:
             return f"(Schema error: {e})"
 
-    def llm_to_sql(self, command: str, schema: str) -> str:
+    def _sql_prompt(self, command: str, schema: str) -> list:
         prompt = (
             "You are a database specialist agent. Given the schema and user request, generate a single, safe SQL SELECT statement. "
             "If you cannot answer with available tables/columns, reply NO_SQL.\n"
             f"Database schema overview:\n{schema}\n"
             f"User request: {command}\nSQL:"
         )
-        response = self.llm_agent.invoke([{"role": "user", "content": prompt}])
+        return [{"role": "user", "content": prompt}]
+
+    @staticmethod
+    def _parse_sql(response) -> str:
         if hasattr(response, 'content'):
             sql = response.content
         else:
@@ -67,51 +60,176 @@ class CoffeeDatabaseAgent(BaseAgent):
             sql = sql[4:].strip()
         return sql
 
-    def query_database(self, sql: str, max_rows: int = 15) -> pd.DataFrame:
-        if sql.upper() == "NO_SQL":
+    def llm_to_sql(self, command: str, schema: str) -> str:
+        return self._parse_sql(self.llm_agent.invoke(self._sql_prompt(command, schema)))
+
+    async def allm_to_sql(self, command: str, schema: str) -> str:
+        return self._parse_sql(await self.llm_agent.ainvoke(self._sql_prompt(command, schema)))
+
+    def execute_query(self, sql: str, max_rows: int = 15):
+        """Run generated SQL under the cost guard (database/guard.py). Returns (DataFrame, stats)."""
+        if sql.strip().upper() == "NO_SQL":
             raise ValueError("Cannot answer this question with the given schema.")
-        conn = sqlite3.connect(self.db_path)
-        try:
-            df = pd.read_sql_query(sql, conn)
-        finally:
-            conn.close()
-        return df.head(max_rows)
+        return guarded_query(
+            self.pool.connection(),
+            sql,
+            max_rows=max_rows,
+            time_budget=settings.DB_QUERY_TIME_BUDGET,
+            max_vm_steps=settings.DB_QUERY_MAX_VM_STEPS,
+            max_scan_rows=settings.DB_FULL_SCAN_MAX_ROWS,
+        )
 
-    def process(self, state: dict) -> dict:
-        command = ""
+    def query_database(self, sql: str, max_rows: int = 15) -> pd.DataFrame:
+        return self.execute_query(sql, max_rows)[0]
+
+    def _get_command(self, state: dict) -> str:
         for a in state.get("assigned_agents", []):
             if a["agent"] == "coffee_db_agent":
-                command = a["command"]
-                break
-        logs = []
-        now = datetime.now().isoformat(timespec='seconds')
-        logs.append(f"[{now}] [DatabaseAgent] Received command: '{command}'")
-        if not self.check_connection():
-            log = f"[{now}] [DatabaseAgent][ERROR] Cannot connect to database ({self.db_path})"
-            return {"result": "❌ Database connection failed.", "logs": [log]}
-        schema = self.get_schema_overview()
+                return a["command"]
+        return ""
+
+    def _load_schema(self, logs: list, now: str):
+        """Return the schema overview, or None if the database is unreachable."""
+        with get_admission().stage("sqlite"), get_tracer().span("db.schema"):
+            if not self.check_connection():
+                logs.append(f"[{now}] [DatabaseAgent][ERROR] Cannot connect to database ({self.db_path})")
+                return None
+            schema = self.get_schema_overview()
         logs.append(f"[{now}] [DatabaseAgent] Schema overview: {schema}")
+        return schema
+
+    def _cached_sql(self, command: str, schema: str, logs: list, now: str):
+        if self.sql_cache is None:
+            return None
+        with get_tracer().span("db.sql_cache") as span:
+            sql = self.sql_cache.get(command, schema)
+            span.set(cache_hit=sql is not None)
+        if sql is not None:
+            logs.append(f"[{now}] [DatabaseAgent] SQL plan cache hit, LLM skipped: {sql}")
+        return sql
+
+    def _finish_query(self, command: str, schema: str, sql: str, from_cache: bool, logs: list, now: str) -> tuple:
+        """Run the SQL and keep the plan cache in sync with the outcome. Returns (result text, payload)."""
+        result, ok, payload = self._run_query(sql, logs, now)
+        if self.sql_cache is not None:
+            if ok and not from_cache:
+                self.sql_cache.put(command, schema, sql)
+            elif not ok and from_cache:
+                self.sql_cache.discard(command, schema)
+            stats = self.sql_cache.stats()
+            logs.append(f"[{now}] [DatabaseAgent] SQL plan cache: {stats['hits']} hits / {stats['misses']} misses (hit rate {stats['hit_rate']:.0%})")
+        return result, payload
+
+    def _record_for_indexes(self, sql: str, logs: list, now: str) -> None:
+        if self.index_advisor is None:
+            return
         try:
-            sql = self.llm_to_sql(command, schema)
-            logs.append(f"[{now}] [DatabaseAgent] LLM generated SQL: {sql}")
+            keys = self.index_advisor.record(self.pool.connection(), sql.strip().rstrip(";"))
+            if keys:
+                logs.append(f"[{now}] [DatabaseAgent] Index advice recorded: {', '.join(keys)}")
         except Exception as e:
-            log = f"[{now}] [DatabaseAgent][ERROR] LLM to SQL failed: {e}"
-            return {"result": f"❌ [LLM Error]: {e}", "logs": logs + [log]}
+            logs.append(f"[{now}] [DatabaseAgent][WARN] Index advisor skipped: {e}")
+
+    @staticmethod
+    def _payload(df: pd.DataFrame, stats: dict) -> dict:
+        """Structured result for the aggregator's local formatter (plain Python values, NaN -> None)."""
+        rows = df.astype(object).where(df.notna(), None).to_numpy().tolist()
+        return {"columns": [str(c) for c in df.columns], "rows": rows, "truncated": bool(stats["truncated"])}
+
+    def _run_query(self, sql: str, logs: list, now: str):
+        """Returns (result text, success flag, structured payload or None)."""
+        ok, payload = False, None
         try:
-            df = self.query_database(sql)
+            with get_admission().stage("sqlite"), get_tracer().span("db.sql_execute") as span:
+                df, stats = self.execute_query(sql)
+                span.set(rows=len(df), truncated=bool(stats["truncated"]))
+            payload = self._payload(df, stats)
             if df.empty:
                 result = "No data found for your request."
             else:
-                result = f"Query result:\n{df.to_string(index=False)}"
+                # Compact CSV (pruned columns, short cells) within the budget instead of df.to_string()
+                result = f"Query result:\n{compact_table(df, budget_for('coffee_db_agent'), get_token_counter())}"
+                if stats["truncated"]:
+                    result += f"\n(Showing the first {len(df)} rows.)"
             logs.append(f"[{now}] [DatabaseAgent] Query executed successfully. Rows: {len(df)}")
+            logs.append(f"[{now}] [DatabaseAgent] Query guard: {describe(stats)}")
+            self._record_for_indexes(sql, logs, now)
+            ok = True
+        except QueryGuardError as e:
+            result = f"❌ [DB Guard]: {e}\n(SQL: {sql})"
+            logs.append(f"[{now}] [DatabaseAgent][ERROR] Query guard fired: {describe(e.stats)}")
+            if e.stats["guard"] == "full_scan":
+                self._record_for_indexes(sql, logs, now)
         except Exception as e:
             result = f"❌ [DB Error]: {e}\n(SQL: {sql})"
             logs.append(f"[{now}] [DatabaseAgent][ERROR] Query execution failed: {e}")
-        logs.append(f"[{now}] [DatabaseAgent] Done. Result set in assigned_agents.")
-        for a in state.get("assigned_agents", []):
-            if a["agent"] == "coffee_db_agent":
-                a["result"] = result
-        return {"logs": logs}
+        logs.append(f"[{now}] [DatabaseAgent] Done. Result returned to aggregator.")
+        return result, ok, payload
+
+    @staticmethod
+    def _output(result: str, payload, logs: list) -> dict:
+        output = {"agent_results": {"coffee_db_agent": result}, "logs": logs}
+        if payload is not None:
+            output["agent_data"] = {"coffee_db_agent": payload}
+        return output
 
+    def _start(self, state: dict) -> dict:
+        """
+        Load the schema and look up the plan cache: {"output": update} on failure, else the
+        query context (command, schema, sql or None, and the LLM messages when sql is None).
+        """
+        command = self._get_command(state)
+        logs = []
+        now = datetime.now().isoformat(timespec='seconds')
+        logs.append(f"[{now}] [DatabaseAgent] Received command: '{command}'")
+        schema = self._load_schema(logs, now)
+        if schema is None:
+            return {"output": {"agent_results": {"coffee_db_agent": "❌ Database connection failed."}, "logs": logs}}
+        ctx = {"command": command, "schema": schema, "logs": logs, "now": now}
+        ctx["sql"] = self._cached_sql(command, schema, logs, now)
+        if ctx["sql"] is None:
+            ctx["messages"] = self._sql_prompt(command, schema)
+        return ctx
+
+    def _read_response(self, ctx: dict, response, span) -> str:
+        sql = self._parse_sql(response)
+        ctx["logs"].append(f"[{ctx['now']}] [DatabaseAgent] LLM generated SQL: {sql}")
+        ctx["logs"].append(token_log("DatabaseAgent", ctx["now"], response, ctx["messages"], sql, span=span))
+        return sql
+
+    def _llm_failed(self, ctx: dict, e: Exception) -> dict:
+        ctx["logs"].append(f"[{ctx['now']}] [DatabaseAgent][ERROR] LLM to SQL failed: {e}")
+        return {"agent_results": {"coffee_db_agent": f"❌ [LLM Error]: {e}"}, "logs": ctx["logs"]}
 
+    def _finish(self, ctx: dict, sql: str) -> dict:
+        from_cache = "messages" not in ctx
+        result, payload = self._finish_query(ctx["command"], ctx["schema"], sql, from_cache, ctx["logs"], ctx["now"])
+        return self._output(result, payload, ctx["logs"])
+
+    def process(self, state: dict) -> dict:
+        ctx = self._start(state)
+        if "output" in ctx:
+            return ctx["output"]
+        sql = ctx["sql"]
+        if sql is None:
+            try:
+                with get_admission().stage("llm"), get_tracer().span("db.sql_generate") as span:
+                    sql = self._read_response(ctx, self.llm_agent.invoke(ctx["messages"]), span)
+            except Exception as e:
+                return self._llm_failed(ctx, e)
+        return self._finish(ctx, sql)
 
+    async def aprocess(self, state: dict) -> dict:
+        # SQLite work is blocking, run it in worker threads
+        ctx = await asyncio.to_thread(self._start, state)
+        if "output" in ctx:
+            return ctx["output"]
+        sql = ctx["sql"]
+        if sql is None:
+            try:
+                async with get_admission().astage("llm"):
+                    with get_tracer().span("db.sql_generate") as span:
+                        sql = self._read_response(ctx, await self.llm_agent.ainvoke(ctx["messages"]), span)
+            except Exception as e:
+                return self._llm_failed(ctx, e)
+        return await asyncio.to_thread(self._finish, ctx, sql)
@@ -0,0 +1,142 @@
+import math
+import re
+from typing import Any, Dict, List, Optional
+
+from config import settings
+
+# Deterministic answer formatting for the aggregator.
+# Small database results (a price, a count, a few rows) are rendered from the structured
+# payload the database agent puts in state["agent_data"], using fixed templates in the
+# user's language (Thai or English, detected from the script). FormatterPolicy decides per
+# turn whether this local rendering is enough or an LLM rewrite is needed.
+
+THAI_CHAR = re.compile(r"[฀-๿]")
+LATIN_CHAR = re.compile(r"[A-Za-z]")
+
+TEMPLATES = {
+    "en": {
+        "intro": "Here is what I found:",
+        "empty": "Sorry, no data was found for your request.",
+        "truncated": "(Showing the first {shown} rows.)",
+    },
+    "th": {
+        "intro": "ข้อมูลที่พบมีดังนี้ค่ะ:",
+        "empty": "ขออภัยค่ะ ไม่พบข้อมูลที่ตรงกับคำขอ",
+        "truncated": "(แสดง {shown} รายการแรก)",
+    },
+}
+
+def detect_language(text: str) -> str:
+    """ "th" when the text is mostly Thai script, else "en"."""
+    thai, latin = len(THAI_CHAR.findall(text or "")), len(LATIN_CHAR.findall(text or ""))
+    return "th" if thai and thai >= latin / 2 else "en"
+
+def humanize(column: str) -> str:
+    """Readable column label: "total_amount" -> "Total amount", "COUNT(*)" -> "Count"."""
+    column = re.sub(r"\(\*\)|[()]", " ", str(column))
+    return re.sub(r"[_\s]+", " ", column).strip().capitalize()
+
+def format_value(value: Any) -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "-"
+    if isinstance(value, bool):
+        return str(value)
+    if isinstance(value, int):
+        return f"{value:,}"
+    if isinstance(value, float):
+        return f"{value:,.0f}" if value.is_integer() else f"{value:,.2f}"
+    return str(value).strip()
+
+def render_table(payload: Dict[str, Any], lang: str) -> str:
+    """Bullet rendering of {"columns", "rows", "truncated"} in lang."""
+    t = TEMPLATES.get(lang, TEMPLATES["en"])
+    columns, rows = payload["columns"], payload["rows"]
+    if not rows:
+        return t["empty"]
+    if len(rows) == 1 and len(columns) == 1:
+        return f"✅ {humanize(columns[0])}: **{format_value(rows[0][0])}**"
+    lines = [t["intro"]]
+    if len(rows) == 1:
+        lines += [f"- **{humanize(c)}**: {format_value(v)}" for c, v in zip(columns, rows[0])]
+    else:
+        for row in rows:
+            rest = ", ".join(f"{humanize(c)}: {format_value(v)}" for c, v in zip(columns[1:], row[1:]) if v is not None)
+            lines.append(f"- **{format_value(row[0])}**" + (f" — {rest}" if rest else ""))
+    if payload.get("truncated"):
+        lines.append(t["truncated"].format(shown=len(rows)))
+    return "\n".join(lines)
+
+class FormatterPolicy:
+    def __init__(
+        self,
+        max_rows: int = 8,
+        max_columns: int = 6,
+        max_cell_chars: int = 120,
+        llm_keywords: Optional[List[str]] = None,
+        join_multi_agent: bool = True,
+    ):
+        """
+        Local rendering is used for database results of at most max_rows x max_columns with
+        cells up to max_cell_chars, unless the user message contains one of llm_keywords
+        (requests to compare, explain or recommend need the LLM).
+        join_multi_agent: answer multi-agent turns by joining the agents' answers (same language,
+        no errors, small tables) instead of an LLM merge.
+        """
+        self.max_rows = max_rows
+        self.max_columns = max_columns
+        self.max_cell_chars = max_cell_chars
+        self.llm_keywords = [k.lower() for k in (llm_keywords if llm_keywords is not None else settings.FORMATTER_LLM_KEYWORDS)]
+        self.join_multi_agent = join_multi_agent
+        self.stats = {"local": 0, "llm": 0}
+
+    def _table_reason(self, payload: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Why a database payload cannot be rendered locally (None if it can)."""
+        if payload is None:
+            return "no structured database result"
+        if len(payload["rows"]) > self.max_rows:
+            return f"{len(payload['rows'])} rows > {self.max_rows}"
+        if len(payload["columns"]) > self.max_columns:
+            return f"{len(payload['columns'])} columns > {self.max_columns}"
+        if any(len(format_value(v)) > self.max_cell_chars for row in payload["rows"] for v in row):
+            return f"cell longer than {self.max_cell_chars} chars"
+        return None
+
+    def decide(self, user_message: str, agents: List[str], agent_results: Dict[str, str], agent_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        {"action": "local" | "llm", "reason": str, "response": str (local only)}.
+        A single non-database agent is passed through by the aggregator before this is asked.
+        """
+        decision = self._decide(user_message, agents, agent_results, agent_data or {})
+        self.stats[decision["action"]] += 1
+        return decision
+
+    def _decide(self, user_message, agents, agent_results, agent_data) -> Dict[str, Any]:
+        if not agents:
+            return {"action": "llm", "reason": "no agent results"}
+        text = (user_message or "").lower()
+        keyword = next((k for k in self.llm_keywords if k in text), None)
+        if keyword:
+            return {"action": "llm", "reason": f"request needs a rewrite ('{keyword}')"}
+        lang = detect_language(user_message)
+        if agents == ["coffee_db_agent"]:
+            reason = self._table_reason(agent_data.get("coffee_db_agent"))
+            if reason:
+                return {"action": "llm", "reason": reason}
+            return {"action": "local", "reason": f"small database result, templated ({lang})",
+                    "response": render_table(agent_data["coffee_db_agent"], lang)}
+        if not self.join_multi_agent:
+            return {"action": "llm", "reason": "multi-agent turn"}
+        # Several agents: join the text answers with locally rendered tables, when every part allows it
+        parts = []
+        for agent in agents:
+            if agent == "coffee_db_agent":
+                reason = self._table_reason(agent_data.get(agent))
+                if reason:
+                    return {"action": "llm", "reason": f"multi-agent turn, {reason}"}
+                parts.append(render_table(agent_data[agent], lang))
+            else:
+                answer = agent_results.get(agent, "")
+                if not answer or answer.startswith("❌") or detect_language(answer) != lang:
+                    return {"action": "llm", "reason": f"multi-agent turn, {agent} answer needs merging"}
+                parts.append(answer.strip())
+        return {"action": "local", "reason": f"multi-agent turn joined locally ({lang})", "response": "\n\n".join(parts)}
@@ -1,12 +1,20 @@
+import asyncio
 from agents.base import BaseAgent
+from agents.token_budget import budget_for, fit_history, get_token_counter, token_log
 from datetime import datetime
+from config import settings
 from config.config import ALLOWED_AGENTS, INTAKE_PROMPT, RESPONSIBLITY
+from workflows.tracing import get_tracer
+from workflows.admission import get_admission
+from workflows.prerouter import is_standalone
 
 class IntakeAgent(BaseAgent):
-    def __init__(self, gemini_with_output, allowed_agents=None, intake_prompt=None):
+    def __init__(self, gemini_with_output, allowed_agents=None, intake_prompt=None, pre_router=None):
         self.gemini_with_output = gemini_with_output
         self.allowed_agents = allowed_agents or ALLOWED_AGENTS
         self.intake_prompt = intake_prompt or INTAKE_PROMPT
+        # Optional local router (see workflows/prerouter.py); confident routes skip the LLM call
+        self.pre_router = pre_router
 
     def build_messages(self, system_prompt: str, history: list, user_message: str) -> list:
         messages = []
@@ -30,7 +38,7 @@ class IntakeAgent(BaseAgent):
     def get_agent_capabilities(allowed_agents):
         return "\n".join([f"- {k}: {v['capability']}" for k, v in allowed_agents.items()])
 
-    def process(self, state: dict) -> dict:
+    def _prepare(self, state: dict):
         now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         allowed_agents = self.allowed_agents
         system_prompt = self.intake_prompt.format(
@@ -40,16 +48,23 @@ class IntakeAgent(BaseAgent):
             agent_names=list(allowed_agents.keys())
         )
         user_message = state.get("user_message", "")
-        history = state.get("chat_history", [])
+        full_history = state.get("chat_history", [])
         logs = []
         logs.append(f"[{now}] [IntakeAgent] Received user message: '{user_message}'")
+        # Latest turns within the history budget; older turns become a short summary
+        history, stats = fit_history(full_history, budget_for("intake_agent"), settings.INTAKE_SUMMARY_TOKENS, get_token_counter())
         prompt = self.build_messages(system_prompt, history, user_message)
-        logs.append(f"[{now}] [IntakeAgent] Built prompt for LLM. History count: {len(history)}")
+        logs.append(f"[{now}] [IntakeAgent] Built prompt for LLM. History count: {len(full_history)}")
+        if stats["summarized"]:
+            logs.append(f"[{now}] [IntakeAgent] History over budget: {stats['summarized']} older messages summarized, "
+                        f"{stats['tokens_before']} -> {stats['tokens_after']} tokens")
+        return prompt, logs, now
+
+    def _handle_result(self, gemini_result, logs: list, now: str) -> dict:
         try:
-            gemini_result = self.gemini_with_output.invoke(prompt)
             assignments = gemini_result.get("assignments", [])
             logs.append(f"[{now}] [IntakeAgent] LLM returned assignments: {assignments}")
-            self.validate_assignments(assignments, allowed_agents)
+            self.validate_assignments(assignments, self.allowed_agents)
         except Exception as e:
             logs.append(f"[{now}] [IntakeAgent][ERROR] LLM or assignment validation failed: {e}")
             return {"assigned_agents": [], "final_response": "", "logs": logs}
@@ -68,5 +83,72 @@ class IntakeAgent(BaseAgent):
             "logs": logs
         }
 
+    def _pre_route(self, state: dict):
+        """Return a workflow update if the pre-router is confident, else None."""
+        if self.pre_router is None:
+            return None
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        user_message = state.get("user_message", "")
+        # The message is passed through as the command, so follow-ups go to the LLM with the history
+        if settings.PREROUTER_FIRST_TURN_ONLY and state.get("chat_history") and not is_standalone(user_message):
+            return None
+        try:
+            with get_tracer().span("intake.prerouter") as span:
+                route = self.pre_router.route(user_message)
+                span.set(cache_hit=route is not None)
+        except Exception as e:
+            print(f"[IntakeAgent] Pre-router failed, falling back to LLM: {e}")
+            return None
+        if route is None or route["agent"] not in self.allowed_agents:
+            return None
+        assignments = [{
+            "agent": route["agent"],
+            "command": f"As of {now}\n{user_message.strip()}",
+            "result": "",
+            "finish": False,
+        }]
+        logs = [
+            f"[{now}] [IntakeAgent] Received user message: '{user_message}'",
+            f"[{now}] [IntakeAgent] Pre-router assigned {route['agent']} (score {route['score']:.3f}, margin {route['margin']:.3f}); LLM intake skipped.",
+        ]
+        return {"assigned_agents": assignments, "final_response": "", "logs": logs}
+
+    def _start(self, state: dict) -> dict:
+        """{"output": update} when the pre-router answered, else the LLM call context (prompt, logs, now)."""
+        fast = self._pre_route(state)
+        if fast is not None:
+            return {"output": fast}
+        prompt, logs, now = self._prepare(state)
+        return {"prompt": prompt, "logs": logs, "now": now}
 
+    def _read_response(self, ctx: dict, gemini_result, span):
+        ctx["logs"].append(token_log("IntakeAgent", ctx["now"], gemini_result, ctx["prompt"], str(gemini_result), span=span))
+        return gemini_result
 
+    def _llm_failed(self, ctx: dict, e: Exception) -> dict:
+        ctx["logs"].append(f"[{ctx['now']}] [IntakeAgent][ERROR] LLM or assignment validation failed: {e}")
+        return {"assigned_agents": [], "final_response": "", "logs": ctx["logs"]}
+
+    def process(self, state: dict) -> dict:
+        ctx = self._start(state)
+        if "output" in ctx:
+            return ctx["output"]
+        try:
+            with get_admission().stage("llm"), get_tracer().span("intake.llm") as span:
+                gemini_result = self._read_response(ctx, self.gemini_with_output.invoke(ctx["prompt"]), span)
+        except Exception as e:
+            return self._llm_failed(ctx, e)
+        return self._handle_result(gemini_result, ctx["logs"], ctx["now"])
+
+    async def aprocess(self, state: dict) -> dict:
+        # Embedding the message (pre-router) is CPU-bound, keep it off the event loop
+        ctx = await asyncio.to_thread(self._start, state)
+        if "output" in ctx:
+            return ctx["output"]
+        try:
+            async with get_admission().astage("llm"):
+                with get_tracer().span("intake.llm") as span:
+                    gemini_result = self._read_response(ctx, await self.gemini_with_output.ainvoke(ctx["prompt"]), span)
+        except Exception as e:
+            return self._llm_failed(ctx, e)
+        return self._handle_result(gemini_result, ctx["logs"], ctx["now"])
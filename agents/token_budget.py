@@ -0,0 +1,194 @@
+import re
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from config import settings
+
+# Prompt-token budgeting shared by the agents.
+# Tokens are counted locally with the bge-m3 tokenizer (already on disk for the embedding
+# model) or, if it cannot be loaded, estimated from character counts. Each agent trims
+# what it sends to the LLM to its budget in settings.TOKEN_BUDGETS: intake history is cut
+# to the latest turns plus a short extractive summary, retrieved chunks are deduplicated
+# and truncated, and database results are sent as compact CSV.
+
+THAI_CHAR = re.compile(r"[฀-๿]")
+SENTENCE_END = re.compile(r"(?<=[.!?。])\s+|\n+")
+MESSAGE_OVERHEAD = 4  # role / separator tokens per chat message
+
+class TokenCounter:
+    def __init__(self, model_name: Optional[str] = None):
+        self.model_name = model_name or settings.TOKEN_COUNTER_MODEL
+        self.tokenizer = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                from transformers import AutoTokenizer
+                self.tokenizer = AutoTokenizer.from_pretrained(self.model_name, local_files_only=True)
+            except Exception as e:
+                print(f"⚠️ Tokenizer {self.model_name} unavailable, estimating tokens from characters: {e}")
+            self._loaded = True
+
+    @property
+    def exact(self) -> bool:
+        self._load()
+        return self.tokenizer is not None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        self._load()
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text, add_special_tokens=False))
+        thai = len(THAI_CHAR.findall(text))
+        return (len(text) - thai) // 4 + thai // 3 + 1
+
+    def count_messages(self, messages: Sequence[Dict[str, Any]]) -> int:
+        return sum(self.count(str(m.get("content", ""))) + MESSAGE_OVERHEAD for m in messages)
+
+    def truncate(self, text: str, max_tokens: int, marker: str = " …") -> str:
+        """text cut to at most max_tokens (at a word boundary when possible)."""
+        tokens = self.count(text)
+        if tokens <= max_tokens:
+            return text
+        if max_tokens <= 0:
+            return ""
+        cut = int(len(text) * max_tokens / tokens)
+        while cut > 0:
+            candidate = text[:cut]
+            space = candidate.rfind(" ")
+            if space > cut * 0.8:
+                candidate = candidate[:space]
+            if self.count(candidate) + self.count(marker) <= max_tokens:
+                return candidate.rstrip() + marker
+            cut = int(cut * 0.9)
+        return ""
+
+_counter = None
+_counter_lock = threading.Lock()
+
+def get_token_counter() -> TokenCounter:
+    """Process-wide counter (the tokenizer is loaded once, on first use)."""
+    global _counter
+    with _counter_lock:
+        if _counter is None:
+            _counter = TokenCounter()
+        return _counter
+
+def budget_for(agent: str) -> int:
+    return settings.TOKEN_BUDGETS.get(agent, settings.TOKEN_BUDGETS["default"])
+
+def usage_from_response(response, messages: Sequence[Dict[str, Any]], output_text: str, counter: TokenCounter) -> Tuple[int, int, str]:
+    """(tokens in, tokens out, source): provider usage metadata when present, else counted locally."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage.get("input_tokens") is not None:
+        return usage["input_tokens"], usage.get("output_tokens", 0), "reported"
+    return counter.count_messages(messages), counter.count(output_text), "local"
+
+def token_log(agent_label: str, now: str, response, messages, output_text: str, counter: Optional[TokenCounter] = None, span=None) -> str:
+    """Log line with the call's tokens; also attached to span (workflows/tracing.py) when given."""
+    counter = counter or get_token_counter()
+    tokens_in, tokens_out, source = usage_from_response(response, messages, output_text, counter)
+    if span is not None:
+        span.set(tokens_in=tokens_in, tokens_out=tokens_out, token_source=source)
+    return f"[{now}] [{agent_label}] Tokens: {tokens_in} in / {tokens_out} out ({source})"
+
+def summarize_messages(messages: List[Dict[str, Any]], max_tokens: int, counter: TokenCounter) -> str:
+    """Extractive summary: the first sentence of each message, oldest first, within max_tokens."""
+    lines = []
+    for m in messages:
+        content = str(m.get("content", "")).strip()
+        if not content:
+            continue
+        first = SENTENCE_END.split(content, maxsplit=1)[0]
+        lines.append(f"{m.get('role', 'user')}: {counter.truncate(first, 40)}")
+    summary = "\n".join(lines)
+    # Keep the most recent lines if the summary itself is too long
+    while lines and counter.count(summary) > max_tokens:
+        lines.pop(0)
+        summary = "\n".join(lines)
+    return summary
+
+def fit_history(history: List[Dict[str, Any]], max_tokens: int, summary_tokens: int, counter: TokenCounter) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Latest messages that fit max_tokens; older ones are replaced by one summary message.
+    Returns (messages, stats) with tokens before/after and how many messages were summarized.
+    """
+    before = counter.count_messages(history)
+    stats = {"tokens_before": before, "tokens_after": before, "summarized": 0}
+    if before <= max_tokens:
+        return history, stats
+    kept, used = [], summary_tokens + MESSAGE_OVERHEAD
+    for m in reversed(history):
+        cost = counter.count(str(m.get("content", ""))) + MESSAGE_OVERHEAD
+        if used + cost > max_tokens:
+            break
+        kept.insert(0, m)
+        used += cost
+    if not kept and history:
+        last = history[-1]
+        kept = [{**last, "content": counter.truncate(str(last.get("content", "")), max_tokens - used - MESSAGE_OVERHEAD)}]
+    older = history[:len(history) - len(kept)]
+    summary = summarize_messages(older, summary_tokens, counter) if older else ""
+    messages = ([{"role": "user", "content": f"(Summary of the earlier conversation)\n{summary}"}] if summary else []) + kept
+    stats.update(tokens_after=counter.count_messages(messages), summarized=len(older))
+    return messages, stats
+
+def _shingles(text: str, size: int = 5) -> set:
+    words = re.sub(r"\s+", " ", text.lower()).split(" ")
+    return {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+
+def fit_context(rows: List[Tuple[str, Dict[str, Any]]], max_tokens: int, counter: TokenCounter, similarity: float = 0.8) -> Tuple[List[Tuple[str, Dict[str, Any]]], Dict[str, int]]:
+    """
+    Retrieved (document, metadata) rows in rank order without near-duplicates (chunk overlap,
+    the same section in several files), truncated to max_tokens in total.
+    """
+    kept, seen, used = [], [], 0
+    stats = {"chunks_before": len(rows), "duplicates": 0, "truncated": 0, "dropped": 0,
+             "tokens_before": sum(counter.count(doc) for doc, _ in rows)}
+    for doc, meta in rows:
+        shingles = _shingles(doc)
+        if any(len(shingles & other) / max(1, min(len(shingles), len(other))) >= similarity for other in seen):
+            stats["duplicates"] += 1
+            continue
+        remaining = max_tokens - used
+        if remaining < 32:
+            stats["dropped"] += 1
+            continue
+        cost = counter.count(doc)
+        if cost > remaining:
+            doc = counter.truncate(doc, remaining)
+            cost = counter.count(doc)
+            stats["truncated"] += 1
+        seen.append(shingles)
+        kept.append((doc, meta))
+        used += cost
+    stats.update(chunks_after=len(kept), tokens_after=used)
+    return kept, stats
+
+def compact_table(df: pd.DataFrame, max_tokens: int, counter: TokenCounter, max_cell_chars: int = 80) -> str:
+    """
+    DataFrame as compact CSV for an LLM prompt: all-empty columns are dropped, columns with
+    one value in every row become a "column: value" header line, long cells are shortened,
+    and trailing rows are dropped (with a note) to stay within max_tokens.
+    """
+    df = df.dropna(axis=1, how="all")
+    if len(df.columns):
+        df = df.apply(lambda col: col.map(lambda v: v if not isinstance(v, str) or len(v) <= max_cell_chars else v[:max_cell_chars - 1] + "…"))
+    constant = [c for c in df.columns if len(df) > 1 and df[c].nunique(dropna=False) == 1]
+    header = [f"{c}: {df[c].iloc[0]}" for c in constant]
+    df = df.drop(columns=constant)
+    lines = header + (df.to_csv(index=False).strip().splitlines() if len(df.columns) else [])
+    text = "\n".join(lines)
+    rows = len(df)
+    while rows > 1 and counter.count(text) > max_tokens:
+        rows = max(1, int(rows * 0.8))
+        body = df.head(rows).to_csv(index=False).strip().splitlines()
+        text = "\n".join(header + body + [f"({len(df) - rows} more rows not shown)"])
+    return text
@@ -0,0 +1,90 @@
+"""
+Queries/sec of the database agent's SQLite access: a fresh connection per step
+(check + schema + query, as before) vs. the pooled read-only connections.
+
+Usage (from the project root):
+    python -m benchmarks.bench_db_pool --seconds 3 --threads 1 8 32
+
+Runs on a temporary WAL copy of database/database.db so the committed file is untouched.
+"""
+import argparse
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from config import settings
+from database.pool import SQLiteConnectionPool
+from database.schema import compute_schema_overview, read_schema_overview
+
+QUERY = (
+    "SELECT m.product_name, SUM(oi.quantity) AS qty FROM order_items oi "
+    "JOIN menu_list m ON m.product_id = oi.product_id GROUP BY m.product_name ORDER BY qty DESC LIMIT 15"
+)
+
+def naive_request(db_path: str) -> None:
+    conn = sqlite3.connect(db_path)
+    conn.execute("SELECT 1;")
+    conn.close()
+    conn = sqlite3.connect(db_path)
+    read_schema_overview(conn) or compute_schema_overview(conn)
+    conn.close()
+    conn = sqlite3.connect(db_path)
+    try:
+        pd.read_sql_query(QUERY, conn)
+    finally:
+        conn.close()
+
+def pooled_request(pool: SQLiteConnectionPool) -> None:
+    pool.check()
+    # The agent serves the schema from memory (database/schema.py), only the query hits SQLite
+    pd.read_sql_query(QUERY, pool.connection())
+
+def measure(fn, threads: int, seconds: float) -> float:
+    done = [0] * threads
+    stop = threading.Event()
+
+    def worker(i):
+        while not stop.is_set():
+            fn()
+            done[i] += 1
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    time.sleep(seconds)
+    stop.set()
+    for w in workers:
+        w.join()
+    return sum(done) / (time.perf_counter() - start)
+
+def run(seconds: float, thread_counts: list) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "database.db")
+        shutil.copy(settings.DATABASE_PATH, db_path)
+        conn = sqlite3.connect(db_path)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.close()
+        # Fail fast if the query does not match the current schema
+        naive_request(db_path)
+
+        print(f"🏁 SQLite connection benchmark ({seconds:.0f}s per run)")
+        for threads in thread_counts:
+            pool = SQLiteConnectionPool(db_path, mmap_size=settings.DB_MMAP_SIZE, cache_size_kib=settings.DB_CACHE_SIZE_KIB)
+            naive = measure(lambda: naive_request(db_path), threads, seconds)
+            pooled = measure(lambda: pooled_request(pool), threads, seconds)
+            print(f"   threads={threads:<3} connect-per-step: {naive:9.1f} q/s   pooled: {pooled:9.1f} q/s   ({pooled / naive:4.1f}x)")
+            print(f"      pool stats: {pool.stats()}")
+            pool.close_all()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+    run(args.seconds, args.threads)
@@ -0,0 +1,65 @@
+"""
+CSV -> SQLite sync timing on scaled copies of raw_data: replace-all (the old
+pd.read_csv + to_sql path) vs. the incremental, chunked csvs_to_sqlite.
+
+Scenarios per scale: first load, re-sync with nothing changed, and re-sync after
+appending 1% new orders / order items (append-only fast path).
+
+Usage (from the project root):
+    python -m benchmarks.bench_db_sync --scales 10 100 --base-orders 10000
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks.bench_index_advisor import legacy_build
+from benchmarks.scale_data import orders_factor, scale_csvs
+from database.create_db import csvs_to_sqlite
+
+def _timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def append_new_rows(csv_dir: Path, fraction: float = 0.01) -> int:
+    """Append copies of the last rows of orders/order_items with fresh ids."""
+    added = 0
+    for table, id_cols in (("orders", ["order_id"]), ("order_items", ["order_item_id", "order_id"])):
+        path = csv_dir / f"{table}.csv"
+        df = pd.read_csv(path)
+        tail = df.tail(max(1, int(len(df) * fraction))).copy()
+        for col in id_cols:
+            tail[col] = tail[col].astype(str) + "-new"
+        tail.to_csv(path, mode="a", header=False, index=False)
+        added += len(tail)
+    return added
+
+def run(scales: list, base_orders: int) -> None:
+    print(f"🏁 CSV sync benchmark (1x = {base_orders:,} orders)")
+    for scale in scales:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            rows = scale_csvs(tmp / "csv", orders_factor(base_orders * scale))
+            total = sum(rows.values())
+            legacy = _timed(lambda: legacy_build(tmp / "csv", tmp / "legacy.db"))
+            first = _timed(lambda: csvs_to_sqlite(str(tmp / "csv"), str(tmp / "inc.db"), index_advisor=False))
+            unchanged = _timed(lambda: csvs_to_sqlite(str(tmp / "csv"), str(tmp / "inc.db"), index_advisor=False))
+            added = append_new_rows(tmp / "csv")
+            legacy_append = _timed(lambda: legacy_build(tmp / "csv", tmp / "legacy.db"))
+            appended = _timed(lambda: csvs_to_sqlite(str(tmp / "csv"), str(tmp / "inc.db"), index_advisor=False))
+            print(f"\n   {scale}x ({total:,} rows, {rows['orders']:,} orders)")
+            print(f"      replace-all load:              {legacy:8.2f}s")
+            print(f"      incremental first load:        {first:8.2f}s")
+            print(f"      re-sync, nothing changed:      {unchanged:8.3f}s")
+            print(f"      replace-all after +{added:,} rows: {legacy_append:8.2f}s")
+            print(f"      incremental after +{added:,} rows: {appended:8.2f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--base-orders", type=int, default=10_000)
+    args = parser.parse_args()
+    run(args.scales, args.base_orders)
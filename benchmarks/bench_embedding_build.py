@@ -0,0 +1,68 @@
+"""
+Knowledge-base build throughput (chunks/sec) and peak RSS: the previous single-process
+build (batch_size=16, every chunk held in memory, one Chroma write) vs. the streaming
+pipeline in rag/embedding_pipeline.py.
+
+Usage (from the project root):
+    python -m benchmarks.bench_embedding_build --kb-factors 1 20 --workers 1 4
+
+Each configuration runs in a fresh interpreter with the embedding cache disabled, writing
+to a temporary Chroma directory. Peak RSS = main process + largest encoding worker.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.scale_data import scale_knowledge_base
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROBE = r"""
+import json, resource, sys
+from config import settings
+settings.EMBEDDING_CACHE_ENABLED = False
+from rag.rag_system import RAGSystem
+kb, db, mode, workers = sys.argv[1], sys.argv[2], sys.argv[3], int(sys.argv[4])
+rag = RAGSystem(knowledge_base_path=kb, db_path=db, collection_name="bench_build")
+p = rag.embedding_pipeline
+if mode == "legacy":
+    p.workers, p.batch_tokens, p.max_batch_size, p.window_size, p.write_batch_size = 1, None, 16, None, 10**9
+else:
+    p.workers, p.pool_min_texts = workers, 0
+stats = rag.build_knowledge_base()
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+print("RESULT " + json.dumps({**stats, "peak_rss_mb": rss / 1024}))
+"""
+
+def _run_once(kb_dir: Path, mode: str, workers: int) -> dict:
+    with tempfile.TemporaryDirectory() as db:
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE, str(kb_dir), db, mode, str(workers)],
+            cwd=ROOT, env=dict(os.environ, PYTHONPATH=str(ROOT)), capture_output=True, text=True, check=True,
+        )
+    line = next(l for l in out.stdout.splitlines() if l.startswith("RESULT "))
+    return json.loads(line[len("RESULT "):])
+
+def run(kb_factors: list, worker_counts: list) -> None:
+    print("🏁 Knowledge-base build benchmark (embedding cache disabled)")
+    for factor in kb_factors:
+        with tempfile.TemporaryDirectory() as tmp:
+            kb_dir = Path(tmp) / "knowledge_base"
+            files = scale_knowledge_base(kb_dir, factor)
+            print(f"\n   knowledge base x{factor} ({files} files)")
+            configs = [("legacy", 1)] + [("pipeline", w) for w in worker_counts]
+            for mode, workers in configs:
+                r = _run_once(kb_dir, mode, workers)
+                label = "single process, batch 16" if mode == "legacy" else f"pipeline, {workers} worker(s)"
+                print(f"      {label:<28} {r['chunks']:>6} chunks  {r['chunks_per_sec']:8.1f} chunks/s  peak RSS {r['peak_rss_mb']:8.0f} MB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kb-factors", type=int, nargs="+", default=[1, 20])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+    run(args.kb_factors, args.workers)
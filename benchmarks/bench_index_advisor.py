@@ -0,0 +1,87 @@
+"""
+Query latency on a scaled-up copy of the raw_data CSVs, before and after the index advisor.
+
+"before" builds the database the old way (plain DataFrame.to_sql: no keys, no indexes).
+The workload is then recorded with IndexAdvisor and the database is rebuilt with
+csvs_to_sqlite, which declares primary keys and applies the advice.
+
+Usage (from the project root):
+    python -m benchmarks.bench_index_advisor --orders 1000000
+    python -m benchmarks.bench_index_advisor --orders 100000 --repeat 20   # quicker run
+"""
+import argparse
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks.scale_data import orders_factor, scale_csvs
+from database.create_db import csvs_to_sqlite
+from database.index_advisor import IndexAdvisor
+
+WORKLOAD = {
+    "orders of a customer": "SELECT order_id, order_datetime, total_amount FROM orders WHERE customer_id = 'C003-777' ORDER BY order_datetime DESC",
+    "items of an order": "SELECT m.product_name, oi.quantity, oi.subtotal FROM order_items oi JOIN menu_list m ON m.product_id = oi.product_id WHERE oi.order_id = 'O1004-4242'",
+    "sales on one day": "SELECT COUNT(*) AS orders, SUM(total_amount) AS revenue FROM orders WHERE order_datetime >= '2025-03-14' AND order_datetime < '2025-03-15'",
+    "customer by id": "SELECT first_name, last_name, member_level FROM customer WHERE customer_id = 'C005-1234'",
+    "upcoming reservations": "SELECT reservation_id, reservation_datetime FROM reservations WHERE status = 'Confirmed' AND reservation_datetime >= '2025-07-01' ORDER BY reservation_datetime LIMIT 15",
+    "order with customer": "SELECT o.order_id, c.first_name, o.total_amount FROM orders o JOIN customer c ON c.customer_id = o.customer_id WHERE o.order_id = 'O1002-999'",
+}
+
+def legacy_build(csv_dir: Path, db_path: Path) -> None:
+    conn = sqlite3.connect(db_path)
+    for path in sorted(csv_dir.glob("*.csv")):
+        pd.read_csv(path).to_sql(path.stem, conn, if_exists="replace", index=False)
+    conn.commit()
+    conn.close()
+
+def time_workload(db_path: Path, repeat: int) -> dict:
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    results = {}
+    for name, sql in WORKLOAD.items():
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            conn.execute(sql).fetchall()
+            samples.append((time.perf_counter() - start) * 1000)
+        results[name] = statistics.median(samples)
+    conn.close()
+    return results
+
+def run(target_orders: int, repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        factor = orders_factor(target_orders)
+        rows = scale_csvs(tmp / "csv", factor)
+        print(f"🏁 Index advisor benchmark (x{factor}: {rows['orders']:,} orders, {rows['order_items']:,} order items)")
+
+        start = time.perf_counter()
+        legacy_build(tmp / "csv", tmp / "before.db")
+        print(f"   legacy build: {time.perf_counter() - start:.1f}s")
+        before = time_workload(tmp / "before.db", repeat)
+
+        advisor = IndexAdvisor(tmp / "index_advice.json")
+        conn = sqlite3.connect(tmp / "before.db")
+        for sql in WORKLOAD.values():
+            advisor.record(conn, sql)
+        conn.close()
+        print(f"   recorded advice: {', '.join(advisor.advice) or 'none'}")
+
+        start = time.perf_counter()
+        csvs_to_sqlite(str(tmp / "csv"), str(tmp / "after.db"), index_advisor=advisor)
+        print(f"   csvs_to_sqlite + advisor build: {time.perf_counter() - start:.1f}s")
+        after = time_workload(tmp / "after.db", repeat)
+
+        print(f"\n   {'query':<24}{'before':>12}{'after':>12}{'speedup':>10}")
+        for name in WORKLOAD:
+            print(f"   {name:<24}{before[name]:>10.2f}ms{after[name]:>10.3f}ms{before[name] / max(after[name], 1e-6):>9.0f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    run(args.orders, args.repeat)
@@ -0,0 +1,76 @@
+"""
+Knowledge-base ingestion throughput: serial reading (previous behaviour) vs. the parallel
+reader in rag/ingestion.py, plus chunk statistics of the heading-aware chunker.
+
+Usage (from the project root):
+    python -m benchmarks.bench_ingestion --kb-factor 50 --pdfs 100 --pdf-pages 20
+
+The corpus is several hundred mixed files: scaled copies of the markdown knowledge base,
+plain-text variants of them, and generated multi-page PDFs (PyMuPDF).
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import fitz  # PyMuPDF
+
+from benchmarks.scale_data import scale_knowledge_base
+from config import settings
+from rag.chunking import MarkdownChunker
+from rag.ingestion import iter_documents, read_document
+
+def build_corpus(root: Path, kb_factor: int, pdfs: int, pdf_pages: int) -> list:
+    scale_knowledge_base(root, kb_factor)
+    markdown = sorted(root.rglob("*.md"))
+    # Plain-text variants (no headings survive as structure) of half the markdown files
+    for path in markdown[::2]:
+        path.with_name(path.stem + "_plain.txt").write_text(path.read_text(encoding="utf-8").replace("#", ""), encoding="utf-8")
+    pdf_dir = root / "pdf"
+    pdf_dir.mkdir(exist_ok=True)
+    source = [p.read_text(encoding="utf-8") for p in markdown[:pdf_pages]]
+    for i in range(pdfs):
+        doc = fitz.open()
+        for page_no in range(pdf_pages):
+            page = doc.new_page()
+            page.insert_textbox(fitz.Rect(36, 36, 560, 800), source[page_no % len(source)][:2500], fontsize=8)
+        doc.save(str(pdf_dir / f"brochure_{i}.pdf"))
+        doc.close()
+    return [(p, p.relative_to(root).parts[0]) for p in sorted(root.rglob("*")) if p.suffix.lower() in (".md", ".txt", ".pdf")]
+
+def run(kb_factor: int, pdfs: int, pdf_pages: int) -> None:
+    chunker = MarkdownChunker()
+    with tempfile.TemporaryDirectory() as tmp:
+        files = build_corpus(Path(tmp), kb_factor, pdfs, pdf_pages)
+        size_mb = sum(p.stat().st_size for p, _ in files) / 1e6
+        kinds = {ext: sum(1 for p, _ in files if p.suffix == ext) for ext in (".md", ".txt", ".pdf")}
+        print(f"🏁 Ingestion benchmark: {len(files)} files ({kinds}), {size_mb:.1f} MB")
+
+        start = time.perf_counter()
+        serial = [(p, c, read_document(str(p))) for p, c in files]
+        serial_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parallel = list(iter_documents(files, settings.INGEST_PDF_WORKERS, settings.INGEST_TEXT_WORKERS))
+        parallel_s = time.perf_counter() - start
+        assert [d[2] for d in serial] == [d[2] for d in parallel], "parallel reader changed the extracted text"
+
+        start = time.perf_counter()
+        chunks = [c for p, _, text in parallel for c in chunker.split(text, is_markdown=p.suffix == ".md")]
+        chunk_s = time.perf_counter() - start
+        lengths = [len(text) for _, text in chunks]
+        with_section = sum(1 for section, _ in chunks if section)
+
+        print(f"   serial read:    {serial_s:7.2f}s  ({len(files) / serial_s:8.1f} files/s)")
+        print(f"   parallel read:  {parallel_s:7.2f}s  ({len(files) / parallel_s:8.1f} files/s, {serial_s / parallel_s:.1f}x)")
+        print(f"   chunking:       {chunk_s:7.2f}s  {len(chunks)} chunks, median {statistics.median(lengths):.0f} chars, "
+              f"{with_section / len(chunks):.0%} with a section title")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kb-factor", type=int, default=50)
+    parser.add_argument("--pdfs", type=int, default=100)
+    parser.add_argument("--pdf-pages", type=int, default=20)
+    args = parser.parse_args()
+    run(args.kb_factor, args.pdfs, args.pdf_pages)
@@ -0,0 +1,70 @@
+"""
+Multi-agent turn latency: specialists run concurrently in the graph vs. one after another.
+
+Usage (from the project root):
+    python -m benchmarks.bench_parallel_agents --llm-latency 0.5 --rag-latency 0.2
+
+The LLM and RAG are local stubs with injected delays. For a question routed to both
+landscape_cafe_bot and coffee_db_agent, the parallel graph should cost
+intake + max(specialists) + aggregator instead of intake + sum(specialists) + aggregator.
+"""
+import argparse
+import statistics
+import time
+
+import main
+from benchmarks.stub_llm import StubLLM, StubRAG
+
+API_KEY = "AI-benchmark-key"
+QUESTION = "Sales this month and opening hours"
+
+def _state() -> dict:
+    return {
+        "user_message": QUESTION,
+        "chat_history": [],
+        "allowed_agents": list(main.AGENT_REGISTRY.keys()),
+        "assigned_agents": {"assignments": []},
+        "agent_results": {},
+        "final_response": "",
+        "logs": [],
+    }
+
+def _sequential_turn(nodes: dict) -> None:
+    state = _state()
+    state.update(nodes["intake_agent"].invoke(state))
+    results = {}
+    for a in state["assigned_agents"]:
+        results.update(nodes[a["agent"]].invoke(state)["agent_results"])
+    state["agent_results"] = results
+    nodes["aggregator_agent"].invoke(state)
+
+def run(turns: int, llm_latency: float, rag_latency: float) -> None:
+    main.get_llm = lambda api_key: StubLLM(latency=llm_latency)
+    main.pre_router = None  # always exercise the intake LLM stub
+    stub_rag = StubRAG(latency=rag_latency)
+    workflow = main.build_supportflowx_workflow(API_KEY, stub_rag)
+    nodes = main.make_agents(API_KEY, stub_rag)
+
+    parallel, sequential = [], []
+    for _ in range(turns):
+        start = time.perf_counter()
+        workflow.invoke(_state())
+        parallel.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        _sequential_turn(nodes)
+        sequential.append(time.perf_counter() - start)
+
+    # intake + cafe bot (RAG + LLM) / db agent (LLM) + aggregator
+    expected_max = 2 * llm_latency + max(rag_latency + llm_latency, llm_latency)
+    expected_sum = 2 * llm_latency + (rag_latency + llm_latency) + llm_latency
+    print(f"🏁 Parallel agents benchmark ({turns} turns, llm={llm_latency}s, rag={rag_latency}s)")
+    print(f"   sequential specialists: median {statistics.median(sequential):.3f}s (expected ≈ {expected_sum:.3f}s)")
+    print(f"   parallel graph:         median {statistics.median(parallel):.3f}s (expected ≈ {expected_max:.3f}s)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--rag-latency", type=float, default=0.2)
+    args = parser.parse_args()
+    run(args.turns, args.llm_latency, args.rag_latency)
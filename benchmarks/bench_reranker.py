@@ -0,0 +1,56 @@
+"""
+Cross-encoder reranking: prompt tokens and recall of the retrieved context with and without
+the reranker in rag/reranker.py, over the labeled queries of bench_retrieval.
+
+Usage (from the project root):
+    python -m benchmarks.bench_reranker --top-k 8 --cutoffs 0.05 0.1 0.3
+
+Tokens are the reranker's estimate (chars / 4). A query counts as a hit when the expected
+phrase appears in the context sent to the LLM. The latency budget is disabled here so
+every query is reranked; the rerank time per query is reported instead.
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.bench_retrieval import DATA_PATH, load_dataset, percentile
+from config import settings
+from rag.embedding_pipeline import estimate_tokens
+from rag.rag_system import RAGSystem
+
+def run(top_k: int, cutoffs: list, mode: str) -> None:
+    rows = load_dataset(DATA_PATH)
+    rag = RAGSystem()
+    print(f"🏁 Reranker benchmark ({len(rows)} labeled queries, top_k={top_k}, {mode} retrieval, "
+          f"{settings.RERANK_CANDIDATES} candidates, model {settings.RERANK_MODEL_NAME})")
+
+    tokens, hits = [], 0
+    for row in rows:
+        result = rag.query_batch([row["query"]], top_k=top_k, mode=mode, rerank=False)[0]
+        tokens.append(sum(estimate_tokens(d) for d in result["documents"]))
+        hits += row["expect"].lower() in result["context"].lower()
+    print(f"   no reranking              recall {hits / len(rows):6.1%}  context tokens p50 {statistics.median(tokens):6.0f}")
+
+    rag.query_batch([rows[0]["query"]], top_k=top_k, mode=mode, rerank=True)  # load the cross-encoder
+    rag.reranker.latency_budget = None
+    for cutoff in cutoffs:
+        rag.reranker.score_cutoff = cutoff
+        tokens, saved, latencies, hits = [], [], [], 0
+        for row in rows:
+            start = time.perf_counter()
+            result = rag.query_batch([row["query"]], top_k=top_k, mode=mode, rerank=True)[0]
+            latencies.append(time.perf_counter() - start)
+            tokens.append(result["rerank"]["tokens"])
+            saved.append(result["rerank"]["tokens_saved"])
+            hits += row["expect"].lower() in result["context"].lower()
+        print(f"   rerank, cutoff {cutoff:<9} recall {hits / len(rows):6.1%}  context tokens p50 {statistics.median(tokens):6.0f}  "
+              f"saved/query {statistics.mean(saved):6.0f}  query latency p50 {statistics.median(latencies) * 1000:6.0f} ms  "
+              f"p95 {percentile(latencies, 95) * 1000:6.0f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top-k", type=int, default=8)
+    parser.add_argument("--cutoffs", type=float, nargs="+", default=[0.05, 0.1, 0.3])
+    parser.add_argument("--mode", choices=["vector", "lexical", "hybrid"], default=settings.RETRIEVAL_MODE)
+    args = parser.parse_args()
+    run(args.top_k, args.cutoffs, args.mode)
@@ -0,0 +1,84 @@
+"""
+Retrieval latency and recall@k of the three retrieval modes (vector, lexical BM25, hybrid RRF)
+over a labeled query set of exact menu/promotion names, paraphrased questions and Thai questions.
+
+Usage (from the project root):
+    python -m benchmarks.bench_retrieval --top-k 3 5 --repeat 5
+
+A query counts as a hit when the expected phrase appears in one of the top-k retrieved chunks.
+The knowledge base must be built first (python rag/rag_system.py). Lexical mode is also timed
+from a fresh, lazily-loaded RAGSystem to show it answers without loading the embedding model.
+The last section compares one query() call per question with one query_batch() for the whole set.
+"""
+import argparse
+import json
+import statistics
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from config import settings
+from rag.rag_system import RAGSystem
+
+DATA_PATH = Path(__file__).parent / "data" / "retrieval_eval.jsonl"
+MODES = ("vector", "lexical", "hybrid")
+
+def load_dataset(path: Path) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def percentile(values: list, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+def run(top_ks: list, repeat: int) -> None:
+    rows = load_dataset(DATA_PATH)
+    settings.EMBEDDING_CACHE_ENABLED = False  # time real query embeddings
+
+    start = time.perf_counter()
+    cold = RAGSystem(lazy=True)
+    cold.query(rows[0]["query"], top_k=max(top_ks), mode="lexical")
+    cold_s = time.perf_counter() - start
+    print(f"🏁 Retrieval benchmark ({len(rows)} labeled queries)")
+    print(f"   lexical query from a cold start: {cold_s * 1000:.0f} ms (embedding model loaded: {cold.status == 'ready'})")
+
+    rag = RAGSystem()
+    for mode in MODES:  # warm-up (index load, first model call)
+        rag.query(rows[0]["query"], top_k=max(top_ks), mode=mode)
+    for top_k in top_ks:
+        print(f"\n   top_k={top_k}")
+        for mode in MODES:
+            latencies, hits = [], defaultdict(list)
+            for row in rows:
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    context = rag.query(row["query"], top_k=top_k, mode=mode)
+                    latencies.append(time.perf_counter() - start)
+                hits[row["kind"]].append(row["expect"].lower() in context.lower())
+            recall = {kind: sum(v) / len(v) for kind, v in hits.items()}
+            overall = sum(sum(v) for v in hits.values()) / len(rows)
+            by_kind = "  ".join(f"{kind} {r:5.1%}" for kind, r in sorted(recall.items()))
+            print(f"      {mode:<8} recall@{top_k} {overall:5.1%} ({by_kind})   "
+                  f"p50 {statistics.median(latencies) * 1000:6.2f} ms  p95 {percentile(latencies, 95) * 1000:6.2f} ms")
+
+    # All queries at once: one forward pass and one vector search vs. one query() call each
+    queries = [row["query"] for row in rows]
+    print(f"\n   {len(queries)} queries, top_k={max(top_ks)}: query() per question vs. one query_batch()")
+    for mode in ("vector", "hybrid"):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for q in queries:
+                rag.query(q, top_k=max(top_ks), mode=mode)
+        loop_s = (time.perf_counter() - start) / repeat
+        start = time.perf_counter()
+        for _ in range(repeat):
+            rag.query_batch(queries, top_k=max(top_ks), mode=mode)
+        batch_s = (time.perf_counter() - start) / repeat
+        print(f"      {mode:<8} loop {loop_s * 1000:8.1f} ms   batch {batch_s * 1000:8.1f} ms   ({loop_s / batch_s:.1f}x)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top-k", type=int, nargs="+", default=[3, 5])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.top_k, args.repeat)
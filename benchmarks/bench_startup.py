@@ -0,0 +1,51 @@
+"""
+Startup time of `import main` and time-to-first-retrieval, eager vs. lazy RAG init.
+
+Usage (from the project root):
+    python -m benchmarks.bench_startup --runs 3
+
+Each run is a fresh interpreter so model/Chroma loading is not shared between runs.
+"first response" = first RAGSystem.query() completing (the LLM is not called).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROBE = r"""
+import json, time
+t0 = time.perf_counter()
+import main
+t_import = time.perf_counter() - t0
+if main.settings.RAG_LAZY_INIT:
+    main.rag.start_background_load()
+main.rag.query("เวลาเปิดปิดร้าน", top_k=3)
+t_first = time.perf_counter() - t0
+print("RESULT " + json.dumps({"import": t_import, "first_response": t_first}))
+"""
+
+def _run_once(lazy: bool) -> dict:
+    env = dict(os.environ, RAG_LAZY_INIT="1" if lazy else "0")
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    line = next(l for l in out.stdout.splitlines() if l.startswith("RESULT "))
+    return json.loads(line[len("RESULT "):])
+
+def run(runs: int) -> None:
+    print(f"🏁 Startup benchmark ({runs} runs per mode)")
+    for lazy in (False, True):
+        samples = [_run_once(lazy) for _ in range(runs)]
+        imp = statistics.median(s["import"] for s in samples)
+        first = statistics.median(s["first_response"] for s in samples)
+        label = "lazy" if lazy else "eager"
+        print(f"   {label:<6} import main: {imp:7.2f}s   time to first retrieval: {first:7.2f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    run(args.runs)
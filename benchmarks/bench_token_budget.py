@@ -0,0 +1,84 @@
+"""
+Prompt tokens per agent before and after the token budgets in agents/token_budget.py:
+intake history (20 messages, as kept by main.chat), cafe-agent context (top_k=8 chunks),
+and database output (df.to_string() vs. compact CSV) for a few real queries.
+
+Usage (from the project root):
+    python -m benchmarks.bench_token_budget --history 20 --top-k 8
+
+Runs offline: chunks come from the markdown chunker over the knowledge base (with the
+overlap duplicates a scaled knowledge base produces), tables from database/database.db.
+"""
+import argparse
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from agents.token_budget import budget_for, compact_table, fit_context, fit_history, get_token_counter
+from benchmarks.scale_data import scale_knowledge_base
+from config import settings
+from rag.chunking import MarkdownChunker
+
+QUERIES = [
+    "SELECT * FROM menu_list LIMIT 15",
+    "SELECT * FROM orders ORDER BY order_datetime DESC LIMIT 15",
+    "SELECT * FROM promotions LIMIT 15",
+    "SELECT * FROM reservations LIMIT 15",
+]
+
+def chat_history(messages: int) -> list:
+    history = []
+    for i in range(messages):
+        if i % 2 == 0:
+            history.append({"role": "user", "content": f"Question {i // 2}: what do you recommend for a family visit on the weekend, "
+                                                        "and can the kids feed the ducks? Is there parking nearby?"})
+        else:
+            history.append({"role": "assistant", "content": "🌳 Landscape CAFE is great for families! Weekend mornings are busy, "
+                                                             "so arrive early for garden seats. Kids can feed the fish and ducks "
+                                                             "(ask staff for food). There is spacious on-site parking. " * 3})
+    return history
+
+def report(label: str, before: int, after: int, seconds: float) -> None:
+    print(f"   {label:<34} {before:6d} -> {after:6d} tokens  ({1 - after / max(1, before):5.1%} saved, {seconds * 1000:6.1f} ms)")
+
+def run(history_len: int, top_k: int) -> None:
+    counter = get_token_counter()
+    print(f"🏁 Token budget benchmark ({'bge-m3 tokenizer' if counter.exact else 'character estimate'}), budgets {settings.TOKEN_BUDGETS}")
+
+    history = chat_history(history_len)
+    start = time.perf_counter()
+    _, stats = fit_history(history, budget_for("intake_agent"), settings.INTAKE_SUMMARY_TOKENS, counter)
+    report(f"intake history ({history_len} messages)", stats["tokens_before"], stats["tokens_after"], time.perf_counter() - start)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        scale_knowledge_base(Path(tmp), 2)
+        chunker = MarkdownChunker()
+        chunks = [(text, {}) for p in sorted(Path(tmp).rglob("*.md")) for _, text in chunker.split(p.read_text(encoding="utf-8"))]
+    # Retrieval over a scaled knowledge base returns the same section from several copies
+    retrieved = [chunks[i % (top_k // 2)] for i in range(top_k)] if top_k > 1 else chunks[:top_k]
+    start = time.perf_counter()
+    _, stats = fit_context(retrieved, budget_for("landscape_cafe_bot"), counter)
+    report(f"cafe context ({top_k} chunks, {stats['duplicates']} dup)", stats["tokens_before"], stats["tokens_after"], time.perf_counter() - start)
+
+    conn = sqlite3.connect(f"file:{settings.DATABASE_PATH}?mode=ro", uri=True)
+    for sql in QUERIES:
+        try:
+            df = pd.read_sql_query(sql, conn)
+        except Exception as e:
+            print(f"   {sql}: skipped ({e})")
+            continue
+        start = time.perf_counter()
+        compact = compact_table(df, budget_for("coffee_db_agent"), counter)
+        seconds = time.perf_counter() - start
+        report(f"db output: {sql.split('FROM ')[1].split()[0]} ({len(df)} rows)", counter.count(df.to_string(index=False)), counter.count(compact), seconds)
+    conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--history", type=int, default=20)
+    parser.add_argument("--top-k", type=int, default=8)
+    args = parser.parse_args()
+    run(args.history, args.top_k)
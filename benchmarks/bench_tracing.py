@@ -0,0 +1,67 @@
+"""
+Tracing overhead and per-stage breakdown (workflows/tracing.py).
+
+Usage (from the project root):
+    python -m benchmarks.bench_tracing --turns 20 --llm-latency 0.05 --jsonl /tmp/trace.jsonl
+
+1. Cost of one span: disabled (no-op), enabled, enabled with a JSONL trace file.
+2. Full turns through main.chat with the stub LLM/RAG, tracing off vs. on, then the
+   per-stage latency summary and the size of the /metrics payload.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import main
+from benchmarks.stub_llm import StubLLM, StubRAG
+from workflows import tracing
+
+API_KEY = "AI-benchmark-key"
+QUESTIONS = ["What time do you open?", "Sales this month and opening hours", "How much is a latte?"]
+
+def span_cost(tracer: tracing.Tracer, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        with tracer.span("bench", tokens_in=1) as span:
+            span.set(cache_hit=True)
+    return (time.perf_counter() - start) / n
+
+def run_turns(turns: int) -> list:
+    seconds = []
+    for i in range(turns):
+        start = time.perf_counter()
+        main.chat(QUESTIONS[i % len(QUESTIONS)], [], API_KEY)
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+def run(turns: int, llm_latency: float, jsonl: str) -> None:
+    print("🏁 Tracing benchmark")
+    with tempfile.TemporaryDirectory() as tmp:
+        file_tracer = tracing.Tracer(True, jsonl or os.path.join(tmp, "trace.jsonl"))
+        for label, tracer in [("disabled", tracing.Tracer(False)), ("enabled", tracing.Tracer(True)), ("enabled + JSONL", file_tracer)]:
+            print(f"   span cost, {label:<16} {span_cost(tracer, 20000) * 1e6:7.2f} µs")
+
+    main.get_llm = lambda api_key: StubLLM(latency=llm_latency)
+    main.pre_router = None
+    main.response_cache = None
+    main.workflow_cache = main.WorkflowCache(lambda api_key: main.build_supportflowx_workflow(api_key, StubRAG()))
+    for enabled in (False, True):
+        tracing._tracer = tracing.Tracer(enabled, jsonl if enabled else None, main.settings.TRACE_BUCKETS)
+        seconds = run_turns(turns)
+        print(f"   {turns} turns, tracing {'on ' if enabled else 'off'}: median {statistics.median(seconds) * 1000:.1f} ms")
+
+    tracer = tracing.get_tracer()
+    print(f"\n   {'stage':<20} {'count':>6} {'mean ms':>9} {'p95 <=':>8} {'errors':>7}")
+    for stage, s in tracer.summary().items():
+        print(f"   {stage:<20} {s['count']:6d} {s['mean'] * 1000:9.2f} {s['p95']:7.3f}s {s['errors']:7d}")
+    print(f"\n   /metrics payload: {len(tracer.prometheus().splitlines())} lines" + (f", trace file: {jsonl}" if jsonl else ""))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--jsonl", default="", help="also write the traced turns to this JSONL file")
+    args = parser.parse_args()
+    run(args.turns, args.llm_latency, args.jsonl)
@@ -0,0 +1,87 @@
+"""
+Vector search latency: Chroma (persistent client, HNSW + SQLite metadata) vs. the memory-mapped
+NumPy index in rag/numpy_index.py (exact cosine, argpartition top-k), single and batched.
+
+Usage (from the project root):
+    python -m benchmarks.bench_vector_backend --kb-factor 1 --repeat 20
+    python -m benchmarks.bench_vector_backend --kb-factor 20 --dtype float16
+
+Query embeddings are computed once up front, so the numbers are search cost only.
+With --kb-factor > 1 a scaled copy of the knowledge base is built into a temporary directory.
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.scale_data import scale_knowledge_base
+from config import settings
+from rag.rag_system import RAGSystem
+
+DATA_PATH = Path(__file__).parent / "data" / "retrieval_eval.jsonl"
+
+def percentile(values: list, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+def timed(fn, repeat: int) -> list:
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def report(label: str, latencies: list, per: int = 1) -> None:
+    print(f"      {label:<34} p50 {statistics.median(latencies) / per * 1000:7.3f} ms  "
+          f"p99 {percentile(latencies, 99) / per * 1000:7.3f} ms  (per query)")
+
+def bench(rag: RAGSystem, top_k: int, repeat: int, category: str) -> None:
+    with open(DATA_PATH, "r", encoding="utf-8") as f:
+        queries = [json.loads(line)["query"] for line in f if line.strip()]
+    vectors = rag.embed(queries)
+    index = rag._refresh_numpy_index(force=True)
+    print(f"   {len(index)} chunks, {len(queries)} queries, top_k={top_k}, matrix {index.matrix.dtype} "
+          f"{index.matrix.nbytes / 1e6:.1f} MB (memory-mapped)")
+
+    where = {"category": category} if category else None
+    chroma, numpy_single = [], []
+    agree = 0
+    for vector in vectors:
+        chroma += timed(lambda: rag.collection.query(query_embeddings=[vector.tolist()], n_results=top_k, where=where), repeat)
+        numpy_single += timed(lambda: index.search(vector, top_k, category), repeat)
+        expected = rag.collection.query(query_embeddings=[vector.tolist()], n_results=1, where=where)["ids"][0]
+        agree += index.rows(index.search(vector, 1, category)[0])[0][0] == expected[0]
+    numpy_batch = timed(lambda: index.search(vectors, top_k, category), repeat)
+
+    report("chroma collection.query", chroma)
+    report("numpy index, one query", numpy_single)
+    report(f"numpy index, batch of {len(queries)}", numpy_batch, per=len(queries))
+    print(f"      top-1 agreement (HNSW vs exact): {agree}/{len(queries)}")
+
+def run(kb_factor: int, top_k: int, repeat: int, dtype: str, category: str) -> None:
+    settings.NUMPY_INDEX_DTYPE = dtype
+    print(f"🏁 Vector backend benchmark (knowledge base x{kb_factor}{', category ' + category if category else ''})")
+    if kb_factor == 1:
+        rag = RAGSystem()
+        rag.numpy_index_dir = Path(tempfile.mkdtemp()) / "numpy_index"
+        bench(rag, top_k, repeat, category)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        kb_dir = Path(tmp) / "knowledge_base"
+        scale_knowledge_base(kb_dir, kb_factor)
+        rag = RAGSystem(knowledge_base_path=str(kb_dir), db_path=str(Path(tmp) / "db"), collection_name="bench_vectors")
+        rag.build_knowledge_base()
+        bench(rag, top_k, repeat, category)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kb-factor", type=int, default=1)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    parser.add_argument("--category", default=None, help="e.g. promotion, to time the filtered path")
+    args = parser.parse_args()
+    run(args.kb_factor, args.top_k, args.repeat, args.dtype, args.category)
@@ -0,0 +1,77 @@
+"""
+Per-turn overhead of rebuilding the workflow vs. reusing it from WorkflowCache.
+
+Usage (from the project root):
+    python -m benchmarks.bench_workflow_cache --turns 200
+    python -m benchmarks.bench_workflow_cache --real-client   # also time ChatGoogleGenerativeAI construction
+
+The LLM is a local stub (no network), so the numbers isolate the cost of
+get_llm + with_structured_output + agent construction + graph compile.
+"""
+import argparse
+import statistics
+import time
+
+import main
+from benchmarks.stub_llm import StubLLM, StubRAG
+
+API_KEY = "AI-benchmark-key"
+
+def _state(message: str) -> dict:
+    return {
+        "user_message": message,
+        "chat_history": [],
+        "allowed_agents": list(main.AGENT_REGISTRY.keys()),
+        "assigned_agents": {"assignments": []},
+        "agent_results": {},
+        "final_response": "",
+        "logs": [],
+    }
+
+def _time_turns(get_workflow, turns: int) -> list:
+    samples = []
+    for i in range(turns):
+        start = time.perf_counter()
+        workflow = get_workflow()
+        workflow.invoke(_state("Location and parking lots?"))
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def _report(label: str, samples: list) -> None:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{label:<28} mean={statistics.mean(samples):8.3f}ms  p50={statistics.median(samples):8.3f}ms  p95={p95:8.3f}ms")
+
+def run(turns: int, real_client: bool) -> None:
+    real_get_llm = main.get_llm
+    main.get_llm = lambda api_key: StubLLM()
+    main.pre_router = None  # measure the workflow itself, not local routing
+    stub_rag = StubRAG()
+    main.workflow_cache.factory = lambda api_key: main.build_supportflowx_workflow(api_key, stub_rag)
+
+    before = _time_turns(lambda: main.build_supportflowx_workflow(API_KEY, stub_rag), turns)
+    main.workflow_cache.invalidate()
+    after = _time_turns(lambda: main.workflow_cache.get(API_KEY), turns)
+
+    print(f"🏁 Workflow cache benchmark ({turns} turns, stub LLM)")
+    _report("rebuild every turn", before)
+    _report("cached workflow", after)
+    print(f"   Saved per turn: {statistics.mean(before) - statistics.mean(after):.3f}ms")
+    print(f"   Cache stats: {main.workflow_cache.stats()}")
+
+    if real_client:
+        # Client construction only; nothing is sent to Gemini
+        samples = []
+        for _ in range(min(turns, 50)):
+            start = time.perf_counter()
+            llm = real_get_llm(API_KEY)
+            llm.with_structured_output(main.AssignmentResponse)
+            samples.append((time.perf_counter() - start) * 1000)
+        _report("ChatGoogleGenerativeAI init", samples)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--real-client", action="store_true")
+    args = parser.parse_args()
+    run(args.turns, args.real_client)
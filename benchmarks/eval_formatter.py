@@ -0,0 +1,56 @@
+"""
+Aggregator formatter policy over typical database turns: how many answers are rendered
+locally (no LLM rewrite) and what that saves with a given LLM latency.
+
+Usage (from the project root):
+    python -m benchmarks.eval_formatter --llm-latency 1.2
+
+Each turn is (user message, the SQL the database agent would generate); the SQL runs on
+database/database.db through the same guard and payload as CoffeeDatabaseAgent.
+"""
+import argparse
+import time
+
+from agents.aggregator_agent import AggregatorAgent
+from agents.database_agent import CoffeeDatabaseAgent
+from config import settings
+
+TURNS = [
+    ("How much is a latte?", "SELECT price FROM menu_list WHERE product_name LIKE '%Latte%' LIMIT 1"),
+    ("ลาเต้ราคาเท่าไหร่", "SELECT product_name, price FROM menu_list WHERE product_name LIKE '%Latte%'"),
+    ("How many orders do we have?", "SELECT COUNT(*) FROM orders"),
+    ("Total sales so far?", "SELECT SUM(total_amount) AS total_sales FROM orders"),
+    ("Which promotions are active?", "SELECT promo_name, start_date, end_date FROM promotions WHERE is_active = 1"),
+    ("มีโปรโมชั่นอะไรบ้าง", "SELECT promo_name, end_date FROM promotions"),
+    ("Which tables are free?", "SELECT table_number, seats, location FROM table_status WHERE status = 'available'"),
+    ("Show today's reservations", "SELECT reservation_id, table_id, reservation_datetime, status FROM reservations"),
+    ("Who is working as barista?", "SELECT name, phone FROM staff WHERE role LIKE '%barista%'"),
+    ("Show the full menu", "SELECT product_name, category, price FROM menu_list"),
+    ("List all menu items with descriptions", "SELECT * FROM menu_list"),
+    ("Compare the prices of our coffee drinks", "SELECT product_name, price FROM menu_list WHERE category LIKE '%coffee%'"),
+    ("Which drink would you recommend?", "SELECT product_name, price FROM menu_list LIMIT 5"),
+    ("แนะนำเมนูขายดีหน่อย", "SELECT product_id, SUM(quantity) AS sold FROM order_items GROUP BY product_id ORDER BY sold DESC LIMIT 5"),
+    ("Customer list with emails", "SELECT first_name, last_name, email, member_level FROM customer"),
+]
+
+def run(llm_latency: float) -> None:
+    db = CoffeeDatabaseAgent(db_path=settings.DATABASE_PATH, llm_agent=None)
+    aggregator = AggregatorAgent(gemini_agent=None)
+    local = 0
+    print(f"🏁 Formatter policy evaluation ({len(TURNS)} database turns)")
+    for message, sql in TURNS:
+        result, _, payload = db._run_query(sql, [], "")
+        start = time.perf_counter()
+        decision = aggregator.formatter.decide(message, ["coffee_db_agent"], {"coffee_db_agent": result},
+                                               {"coffee_db_agent": payload} if payload else {})
+        ms = (time.perf_counter() - start) * 1000
+        local += decision["action"] == "local"
+        print(f"   {decision['action']:<6} {ms:5.2f} ms  {message[:40]:<42} {decision['reason']}")
+    print(f"\n   rendered locally: {local}/{len(TURNS)} ({local / len(TURNS):.0%}); "
+          f"LLM time saved at {llm_latency:.1f}s per call: {local * llm_latency:.1f}s over {len(TURNS)} turns")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-latency", type=float, default=1.2)
+    args = parser.parse_args()
+    run(args.llm_latency)
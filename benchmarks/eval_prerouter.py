@@ -0,0 +1,95 @@
+"""
+Offline evaluation of the local pre-router against labeled messages (and optionally the LLM intake).
+
+Usage (from the project root):
+    python -m benchmarks.eval_prerouter                     # accuracy + % of LLM calls saved
+    python -m benchmarks.eval_prerouter --sweep             # grid over threshold/margin
+    GOOGLE_API_KEY=AI... python -m benchmarks.eval_prerouter --llm   # also compare with Gemini routing
+
+Labels: landscape_cafe_bot, coffee_db_agent, or "multi" (needs both agents, the
+pre-router should abstain and leave it to the LLM).
+"""
+import argparse
+import json
+import os
+from pathlib import Path
+
+from config import settings
+from config.config import PREROUTER_EXAMPLES
+from rag.rag_system import RAGSystem
+from workflows.prerouter import PreRouter
+
+DATA_PATH = Path(__file__).parent / "data" / "routing_eval.jsonl"
+
+def load_dataset(path: Path) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def evaluate(rows: list, scores: list, threshold: float, margin: float) -> dict:
+    routed = correct = abstain_ok = wrong = 0
+    for row, agent_scores in zip(rows, scores):
+        ranked = sorted(agent_scores.items(), key=lambda kv: kv[1], reverse=True)
+        (best_agent, best), second = ranked[0], ranked[1][1]
+        confident = best >= threshold and best - second >= margin
+        if not confident:
+            abstain_ok += row["label"] == "multi"
+            continue
+        routed += 1
+        if best_agent == row["label"]:
+            correct += 1
+        else:
+            wrong += 1
+    return {
+        "threshold": threshold,
+        "margin": margin,
+        "llm_calls_saved": routed / len(rows),
+        "routed_accuracy": correct / routed if routed else 1.0,
+        "misroutes": wrong,
+        "multi_abstained": abstain_ok,
+    }
+
+def llm_routes(rows: list) -> list:
+    """Route each message with the real Gemini intake (pre-router disabled)."""
+    import main
+    from workflows.state import AssignmentResponse
+    intake = main.AGENT_REGISTRY["intake_agent"](
+        gemini_with_output=main.get_llm(os.environ["GOOGLE_API_KEY"]).with_structured_output(AssignmentResponse)
+    )
+    routes = []
+    for row in rows:
+        out = intake.process({"user_message": row["text"], "chat_history": []})
+        agents = sorted({a["agent"] for a in out.get("assigned_agents", [])})
+        routes.append("multi" if len(agents) > 1 else (agents[0] if agents else "END"))
+    return routes
+
+def run(sweep: bool, use_llm: bool) -> None:
+    rows = load_dataset(DATA_PATH)
+    router = PreRouter(RAGSystem(), PREROUTER_EXAMPLES)
+    scores = [router.score(row["text"]) for row in rows]
+    multi = sum(1 for r in rows if r["label"] == "multi")
+
+    print(f"🏁 Pre-router evaluation ({len(rows)} messages, {multi} multi-agent)")
+    grid = [(t, m) for t in (0.60, 0.65, 0.70, 0.72, 0.75, 0.80) for m in (0.02, 0.04, 0.06, 0.08)] if sweep \
+        else [(settings.PREROUTER_THRESHOLD, settings.PREROUTER_MARGIN)]
+    for threshold, margin in grid:
+        r = evaluate(rows, scores, threshold, margin)
+        print(f"   threshold={threshold:.2f} margin={margin:.2f}  LLM calls saved: {r['llm_calls_saved']:6.1%}  "
+              f"routed accuracy: {r['routed_accuracy']:6.1%}  misroutes: {r['misroutes']}  multi abstained: {r['multi_abstained']}/{multi}")
+
+    if use_llm:
+        routes = llm_routes(rows)
+        llm_acc = sum(1 for row, route in zip(rows, routes) if route == row["label"]) / len(rows)
+        agree = total = 0
+        for row, agent_scores, route in zip(rows, scores, routes):
+            ranked = sorted(agent_scores.items(), key=lambda kv: kv[1], reverse=True)
+            if ranked[0][1] >= settings.PREROUTER_THRESHOLD and ranked[0][1] - ranked[1][1] >= settings.PREROUTER_MARGIN:
+                total += 1
+                agree += ranked[0][0] == route
+        print(f"   LLM intake accuracy: {llm_acc:.1%}   pre-router/LLM agreement on routed messages: {agree}/{total}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sweep", action="store_true")
+    parser.add_argument("--llm", action="store_true")
+    args = parser.parse_args()
+    run(args.sweep, args.llm)
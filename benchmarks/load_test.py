@@ -0,0 +1,284 @@
+"""
+Offline load test: concurrent chat sessions against the real workflow with the stub LLM.
+
+Usage (from the project root):
+    python -m benchmarks.load_test --sessions 1 8 32 --turns 5 --llm-latency 0.3 --data-factor 100 --out results.json
+    python -m benchmarks.load_test --scenarios graph --sessions 16 --compare results.json --tolerance 0.15
+
+Scenarios (each run once per --sessions value, every session sending --turns messages
+with its own chat history):
+    chat   main.chat in one thread per session (the blocking path)
+    achat  main.achat on one event loop (the streaming UI path)
+    graph  the compiled graph directly (workflow.invoke), without main's caches and turn queue
+
+The pre-router, response cache, SQL plan cache and index advisor are off for every scenario
+(so nothing is written to database/index_advice.json); main's globals are restored afterwards.
+
+--data-factor scales assets/raw_data with benchmarks/scale_data.py into a temporary SQLite
+database; --kb-factor scales the knowledge base and indexes it with the real RAGSystem
+(--rag real, needs bge-m3). --admission runs turns through workflows/admission.py with the
+settings' queue and stage limits. Each scenario reports p50/p95/p99 turn latency, turns/sec, error
+turns and a per-stage breakdown from the workflows/tracing.py spans. --out writes the
+results as JSON; --compare prints deltas against an earlier file and exits 1 when p95 or
+throughput regressed by more than --tolerance.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+import main
+from benchmarks.scale_data import scale_csvs, scale_knowledge_base
+from benchmarks.stub_llm import StubLLM, StubRAG
+from config import settings
+from database.create_db import csvs_to_sqlite
+from workflows import admission, tracing
+
+RESULTS_FORMAT = 1
+API_KEY = "AI-benchmark-key"
+# Mix of cafe-only, database-only, multi-agent and Thai turns
+MESSAGES = [
+    "What time do you open?",
+    "Sales this month",
+    "How much is a latte?",
+    "Is there parking and can kids feed the fish?",
+    "Latest orders and opening hours",
+    "ยอดขายเดือนนี้เท่าไหร่",
+    "Any reservations today?",
+    "มีที่จอดรถไหม",
+]
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0, "max": 0.0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99), "mean": float(np.mean(values)), "max": float(max(values))}
+
+def stage_breakdown(trace_path: Path) -> dict:
+    """Exact per-stage latency (ms) from the JSONL trace of one scenario."""
+    stages = {}
+    if trace_path.exists():
+        for line in trace_path.read_text(encoding="utf-8").splitlines():
+            span = json.loads(line)
+            stages.setdefault(span["stage"], []).append(span["ms"])
+    return {
+        stage: {"count": len(ms), **{k: round(v, 3) for k, v in percentiles(ms).items() if k in ("mean", "p50", "p95")}}
+        for stage, ms in sorted(stages.items())
+    }
+
+def is_error(history: list, logs: str) -> bool:
+    reply = history[-1]["content"] if history else ""
+    return not history or logs.startswith("❌") or reply.startswith("❌") or reply == main.FALLBACK_REPLY
+
+def chat_session(session: int, turns: int) -> list:
+    history, samples = [], []
+    for t in range(turns):
+        start = time.perf_counter()
+        new_history, logs = main.chat(MESSAGES[(session + t) % len(MESSAGES)], history, API_KEY)
+        samples.append((time.perf_counter() - start, is_error(new_history, logs)))
+        history = new_history or history
+    return samples
+
+async def achat_session(session: int, turns: int) -> list:
+    history, samples = [], []
+    for t in range(turns):
+        start = time.perf_counter()
+        new_history, logs = history, "❌ no output"
+        async for new_history, logs in main.achat(MESSAGES[(session + t) % len(MESSAGES)], history, API_KEY):
+            pass
+        samples.append((time.perf_counter() - start, is_error(new_history, logs)))
+        history = new_history or history
+    return samples
+
+def graph_session(session: int, turns: int) -> list:
+    workflow = main.workflow_cache.get(API_KEY)
+    history, samples = [], []
+    for t in range(turns):
+        message = MESSAGES[(session + t) % len(MESSAGES)]
+        start = time.perf_counter()
+        with tracing.get_tracer().span("turn", streamed=False):
+            result = workflow.invoke(main.initial_state(message, history))
+        reply = result.get("final_response") or ""
+        samples.append((time.perf_counter() - start, not reply or reply.startswith("❌")))
+        history = main.finish_turn(history, message, reply)
+    return samples
+
+def run_scenario(name: str, sessions: int, turns: int, trace_path: Path) -> dict:
+    tracing._tracer = tracing.Tracer(True, str(trace_path), settings.TRACE_BUCKETS)
+    controller = admission.get_admission()
+    controller.queue_wait = tracing.Histogram(controller.queue_wait.buckets)
+    start = time.perf_counter()
+    if name == "achat":
+        async def run_all():
+            return await asyncio.gather(*(achat_session(s, turns) for s in range(sessions)))
+        per_session = asyncio.run(run_all())
+    else:
+        session_fn = chat_session if name == "chat" else graph_session
+        with ThreadPoolExecutor(max_workers=sessions) as pool:
+            per_session = list(pool.map(session_fn, range(sessions), [turns] * sessions))
+    wall = time.perf_counter() - start
+    samples = [s for session in per_session for s in session]
+    tracing.get_tracer().close()
+    latencies = [seconds for seconds, _ in samples]
+    return {
+        "scenario": name,
+        "sessions": sessions,
+        "turns": len(samples),
+        "errors": sum(1 for _, error in samples if error),
+        "seconds": round(wall, 4),
+        "turns_per_sec": round(len(samples) / wall, 3) if wall else 0.0,
+        "latency": {k: round(v, 4) for k, v in percentiles(latencies).items()},
+        "stages_ms": stage_breakdown(trace_path),
+        "queue_wait": {k: round(v, 4) for k, v in admission.get_admission().stats().items() if k.startswith("queue_wait")},
+    }
+
+# Module globals setup() replaces; teardown() puts them back
+PATCHED = [
+    (main, ("rag", "get_llm", "pre_router", "response_cache", "sql_cache", "index_advisor", "workflow_cache")),
+    (settings, ("DATABASE_PATH",)),
+    (admission, ("_controller",)),
+    (tracing, ("_tracer",)),
+]
+
+def save_globals() -> list:
+    return [(module, {name: getattr(module, name) for name in names}) for module, names in PATCHED]
+
+def teardown(saved: list) -> None:
+    for module, values in saved:
+        for name, value in values.items():
+            setattr(module, name, value)
+
+def setup(args, tmp: Path) -> dict:
+    """Point main at the stub LLM, a scaled database and a stub (or real, scaled) RAG."""
+    data = {"data_factor": args.data_factor, "kb_factor": args.kb_factor, "rag": args.rag}
+    if args.data_factor > 1:
+        rows = scale_csvs(tmp / "csv", args.data_factor)
+        csvs_to_sqlite(str(tmp / "csv"), str(tmp / "database.db"), index_advisor=False)
+        settings.DATABASE_PATH = str(tmp / "database.db")
+        data["rows"] = rows
+    if args.rag == "real":
+        kb_dir = settings.KNOWLEDGE_BASE_PATH
+        if args.kb_factor > 1:
+            data["kb_files"] = scale_knowledge_base(tmp / "kb", args.kb_factor)
+            kb_dir = tmp / "kb"
+        rag = main.RAGSystem(knowledge_base_path=str(kb_dir), db_path=str(tmp / "embeddings"))
+        rag.build_knowledge_base()
+    else:
+        rag = StubRAG(args.rag_latency, args.jitter, args.seed)
+    main.rag = rag
+    main.get_llm = lambda api_key: StubLLM(args.llm_latency, jitter=args.jitter, seed=args.seed)
+    main.pre_router = None       # every turn exercises the intake LLM stub
+    main.response_cache = None   # repeated messages would otherwise skip the workflow
+    main.sql_cache = None        # cached plans would hide SQL-generation latency
+    main.index_advisor = None    # synthetic data must not feed the real database/index_advice.json
+    main.workflow_cache = main.WorkflowCache(lambda api_key: main.build_supportflowx_workflow(api_key, rag))
+    # All sessions share one API key, so the per-key rate limit stays off; queue and stage limits apply with --admission
+    admission._controller = admission.AdmissionController(
+        enabled=args.admission,
+        max_active=settings.ADMISSION_MAX_ACTIVE,
+        max_queue=max(settings.ADMISSION_MAX_QUEUE, max(args.sessions)),
+        queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+        stage_limits=settings.STAGE_LIMITS,
+        buckets=settings.TRACE_BUCKETS,
+    )
+    data["admission"] = {"max_active": settings.ADMISSION_MAX_ACTIVE, "stage_limits": settings.STAGE_LIMITS} if args.admission else None
+    return data
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10).stdout.strip()
+    except Exception:
+        return ""
+
+def compare(results: dict, baseline_path: str, tolerance: float) -> bool:
+    """Print deltas against a baseline results file; True when nothing regressed beyond tolerance."""
+    baseline = json.loads(Path(baseline_path).read_text(encoding="utf-8"))
+    if baseline.get("format") != RESULTS_FORMAT:
+        print(f"⚠️ {baseline_path} has results format {baseline.get('format')}, expected {RESULTS_FORMAT}")
+    changed = {k for k in results["config"] if k != "rows" and baseline.get("config", {}).get(k) != results["config"][k]}
+    if changed:
+        print(f"⚠️ Baseline was run with different settings: {', '.join(sorted(changed))}")
+    old = {(r["scenario"], r["sessions"]): r for r in baseline.get("results", [])}
+    ok = True
+    print(f"\n📊 Compared with {baseline_path} ({baseline.get('commit') or 'unknown commit'}), tolerance {tolerance:.0%}")
+    for r in results["results"]:
+        b = old.get((r["scenario"], r["sessions"]))
+        if b is None:
+            print(f"   {r['scenario']:<6} x{r['sessions']:<4} (no baseline)")
+            continue
+        p95 = r["latency"]["p95"] / b["latency"]["p95"] - 1 if b["latency"]["p95"] else 0.0
+        tps = r["turns_per_sec"] / b["turns_per_sec"] - 1 if b["turns_per_sec"] else 0.0
+        regressed = p95 > tolerance or tps < -tolerance
+        ok = ok and not regressed
+        print(f"   {r['scenario']:<6} x{r['sessions']:<4} p95 {b['latency']['p95']:.3f}s -> {r['latency']['p95']:.3f}s ({p95:+.1%})  "
+              f"turns/sec {b['turns_per_sec']:.2f} -> {r['turns_per_sec']:.2f} ({tps:+.1%})" + ("  ❌ regression" if regressed else ""))
+    return ok
+
+def run_all(args, tmp: Path) -> list:
+    print(f"🏁 Load test: llm={args.llm_latency}s rag={args.rag_latency}s jitter={args.jitter:.0%}, "
+          f"data x{args.data_factor}, {args.rag} RAG" + (f" (kb x{args.kb_factor})" if args.rag == "real" else ""))
+    results = []
+    for name in args.scenarios:
+        for sessions in args.sessions:
+            r = run_scenario(name, sessions, args.turns, tmp / f"trace_{name}_{sessions}.jsonl")
+            results.append(r)
+            lat = r["latency"]
+            print(f"   {name:<6} x{sessions:<4} {r['turns']:5d} turns  {r['turns_per_sec']:8.2f} turns/s  "
+                  f"p50 {lat['p50']:.3f}s  p95 {lat['p95']:.3f}s  p99 {lat['p99']:.3f}s  errors {r['errors']}"
+                  + (f"  queue wait mean {r['queue_wait']['queue_wait_mean']:.3f}s" if args.admission else ""))
+            if args.stages:
+                for stage, s in r["stages_ms"].items():
+                    print(f"      {stage:<20} {s['count']:6d}  mean {s['mean']:8.2f} ms  p95 {s['p95']:8.2f} ms")
+    return results
+
+def run(args) -> int:
+    saved = save_globals()
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        try:
+            data = setup(args, tmp)
+            results = run_all(args, tmp)
+        finally:
+            tracing.get_tracer().close()
+            teardown(saved)
+    output = {
+        "format": RESULTS_FORMAT,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "config": {"llm_latency": args.llm_latency, "rag_latency": args.rag_latency, "jitter": args.jitter,
+                   "seed": args.seed, "turns_per_session": args.turns, **data},
+        "results": results,
+    }
+    ok = compare(output, args.compare, args.tolerance) if args.compare else True
+    if args.out:
+        Path(args.out).write_text(json.dumps(output, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\n💾 Results written to {args.out}")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=["chat", "achat", "graph"], default=["chat", "achat"])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--turns", type=int, default=5, help="turns per session")
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--rag-latency", type=float, default=0.05, help="stub RAG only")
+    parser.add_argument("--jitter", type=float, default=0.2, help="+/- fraction of the stub latencies")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-factor", type=int, default=1, help="scale assets/raw_data (10-1000)")
+    parser.add_argument("--kb-factor", type=int, default=1, help="scale the knowledge base (--rag real)")
+    parser.add_argument("--rag", choices=["stub", "real"], default="stub")
+    parser.add_argument("--admission", action="store_true", help="apply the admission queue and stage limits (settings)")
+    parser.add_argument("--stages", action="store_true", help="print the per-stage breakdown")
+    parser.add_argument("--out", default="", help="write results JSON here")
+    parser.add_argument("--compare", default="", help="baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    sys.exit(run(parser.parse_args()))
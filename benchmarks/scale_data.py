@@ -0,0 +1,109 @@
+"""
+Synthetic scale-up of assets/raw_data and assets/knowledge_base for benchmarks.
+
+Transactional tables (customer, orders, order_items, reservations) are replicated
+`factor` times with suffixed ids ("O1001" -> "O1001-42") so foreign keys stay
+consistent, and order/reservation dates are spread over the two years before the
+original date. Reference tables (menu_list, promotions, staff, table_status) are
+copied unchanged.
+
+scale_knowledge_base() does the same for assets/knowledge_base: every document is
+copied `factor` times under a distinct branch heading, so no two chunks are identical
+(the embedding cache cannot short-circuit the copies).
+
+Usage (from the project root):
+    python -m benchmarks.scale_data --orders 1000000 --out /tmp/cafe_scaled
+    python -m benchmarks.scale_data --kb-factor 20 --out /tmp/cafe_scaled
+"""
+import argparse
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config import settings
+
+RAW_DATA_DIR = settings.ASSETS_DIR / "raw_data"
+KB_DIR = settings.KNOWLEDGE_BASE_PATH
+SCALED_TABLES = {
+    # table: (id column, foreign id columns that point at other scaled tables, datetime column)
+    "customer": ("customer_id", [], None),
+    "orders": ("order_id", ["customer_id"], "order_datetime"),
+    "order_items": ("order_item_id", ["order_id"], None),
+    "reservations": ("reservation_id", ["customer_id"], "reservation_datetime"),
+}
+DATE_SPREAD_DAYS = 730
+
+def _suffix(values: pd.Series, copies: np.ndarray) -> pd.Series:
+    out = values.astype(str).to_numpy(dtype=object)
+    mask = copies > 0
+    out[mask] = out[mask] + "-" + copies[mask].astype(str)
+    return pd.Series(out, index=values.index)
+
+def scale_table(df: pd.DataFrame, table: str, factor: int, seed: int = 0) -> pd.DataFrame:
+    """Replicate df `factor` times; copy 0 keeps the original ids."""
+    id_col, fk_cols, dt_col = SCALED_TABLES[table]
+    n = len(df)
+    big = df.iloc[np.tile(np.arange(n), factor)].reset_index(drop=True)
+    copies = np.repeat(np.arange(factor), n)
+    for col in [id_col] + fk_cols:
+        big[col] = _suffix(big[col], copies)
+    if dt_col:
+        rng = np.random.default_rng(seed)
+        offsets = rng.integers(0, DATE_SPREAD_DAYS, size=len(big))
+        offsets[copies == 0] = 0
+        shifted = pd.to_datetime(big[dt_col]) - pd.to_timedelta(offsets, unit="D")
+        big[dt_col] = shifted.dt.strftime("%Y-%m-%d %H:%M")
+    return big
+
+def orders_factor(target_orders: int, csv_dir: Path = RAW_DATA_DIR) -> int:
+    base = len(pd.read_csv(Path(csv_dir) / "orders.csv"))
+    return max(1, -(-target_orders // base))
+
+def scale_csvs(out_dir: str, factor: int, csv_dir: Path = RAW_DATA_DIR, seed: int = 0) -> dict:
+    """Write scaled copies of every raw_data CSV into out_dir; returns {table: rows}."""
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    rows = {}
+    for path in sorted(Path(csv_dir).glob("*.csv")):
+        table = path.stem
+        if table in SCALED_TABLES:
+            df = scale_table(pd.read_csv(path), table, factor, seed)
+            df.to_csv(out / path.name, index=False)
+            rows[table] = len(df)
+        else:
+            shutil.copy(path, out / path.name)
+            rows[table] = len(pd.read_csv(path))
+    return rows
+
+def scale_knowledge_base(out_dir: str, factor: int, kb_dir: Path = KB_DIR) -> int:
+    """Write `factor` variants of every text document into out_dir (same category folders); returns file count."""
+    kb_dir, out = Path(kb_dir), Path(out_dir)
+    files = 0
+    for path in sorted(kb_dir.rglob("*")):
+        if path.suffix.lower() not in (".md", ".txt"):
+            continue
+        target_dir = out / path.parent.relative_to(kb_dir)
+        target_dir.mkdir(parents=True, exist_ok=True)
+        text = path.read_text(encoding="utf-8")
+        for k in range(factor):
+            name = path.name if k == 0 else f"{path.stem}_branch{k}{path.suffix}"
+            body = text if k == 0 else f"# Branch {k}\n\nBranch {k} edition of {path.stem}.\n\n{text.replace('Landscape', f'Landscape {k}')}"
+            (target_dir / name).write_text(body, encoding="utf-8")
+            files += 1
+    return files
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=1_000_000, help="approximate number of orders")
+    parser.add_argument("--kb-factor", type=int, default=0, help="also write a knowledge base scaled this many times")
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+    if args.kb_factor:
+        n = scale_knowledge_base(Path(args.out) / "knowledge_base", args.kb_factor)
+        print(f"Knowledge base x{args.kb_factor}: {n} files")
+    factor = orders_factor(args.orders)
+    print(f"Scaling raw_data x{factor} -> {args.out}")
+    for table, n in scale_csvs(args.out, factor).items():
+        print(f"   {table:<14} {n:>12,} rows")
@@ -0,0 +1,111 @@
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+
+# Deterministic local stand-ins for ChatGoogleGenerativeAI and RAGSystem.
+# They implement only the surface the agents use (invoke / ainvoke / astream / with_structured_output / query),
+# so benchmarks can drive the real workflow without network calls or model downloads.
+# Latency is `latency` seconds per call, optionally varied by +/- `jitter` (a fraction) from a seeded RNG.
+
+DB_KEYWORDS = ["sales", "order", "price", "table", "reservation", "ยอดขาย", "ราคา", "โต๊ะ", "สินค้า"]
+
+def route_message(text: str) -> list:
+    """Pick specialist agents with a keyword heuristic (stand-in for the intake LLM)."""
+    lowered = text.lower()
+    agents = []
+    if any(kw in lowered for kw in DB_KEYWORDS):
+        agents.append("coffee_db_agent")
+    if not agents or " and " in lowered or "และ" in lowered:
+        agents.append("landscape_cafe_bot")
+    return agents
+
+# Generated SQL per request keyword (first match), so scaled databases see realistic queries
+STUB_SQL = [
+    (("sales", "ยอดขาย"), "SELECT substr(order_datetime, 1, 7) AS month, SUM(total_amount) AS sales FROM orders "
+                          "GROUP BY month ORDER BY month DESC LIMIT 12"),
+    (("order",), "SELECT order_id, order_datetime, total_amount FROM orders ORDER BY order_datetime DESC LIMIT 10"),
+    (("reservation", "table", "โต๊ะ"), "SELECT status, COUNT(*) AS reservations FROM reservations GROUP BY status"),
+]
+DEFAULT_SQL = "SELECT product_name, price FROM menu_list LIMIT 5"
+
+class _Delay:
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+
+    def seconds(self) -> float:
+        if not self.jitter:
+            return self.latency
+        return max(0.0, self.latency * (1 + self._rng.uniform(-self.jitter, self.jitter)))
+
+def _last_user_text(messages) -> str:
+    if isinstance(messages, str):
+        return messages
+    for m in reversed(messages):
+        if m.get("role") == "user":
+            return m.get("content", "")
+    return ""
+
+class StubStructuredLLM(_Delay):
+    def invoke(self, messages, **kwargs):
+        time.sleep(self.seconds())
+        return self._assignments(messages)
+
+    async def ainvoke(self, messages, **kwargs):
+        await asyncio.sleep(self.seconds())
+        return self._assignments(messages)
+
+    def _assignments(self, messages) -> dict:
+        text = _last_user_text(messages)
+        return {
+            "assignments": [
+                {"agent": a, "command": text, "result": "", "finish": False}
+                for a in route_message(text)
+            ]
+        }
+
+class StubLLM(_Delay):
+    def __init__(self, latency: float = 0.0, reply: str = "This is a stub answer. ☕", jitter: float = 0.0, seed: int = 0):
+        super().__init__(latency, jitter, seed)
+        self.reply = reply
+
+    def invoke(self, messages, **kwargs):
+        time.sleep(self.seconds())
+        return SimpleNamespace(content=self._reply_for(messages))
+
+    async def ainvoke(self, messages, **kwargs):
+        await asyncio.sleep(self.seconds())
+        return SimpleNamespace(content=self._reply_for(messages))
+
+    async def astream(self, messages, **kwargs):
+        await asyncio.sleep(self.seconds())
+        for word in self._reply_for(messages).split(" "):
+            yield SimpleNamespace(content=word + " ")
+
+    def _reply_for(self, messages) -> str:
+        text = _last_user_text(messages)
+        if "Database schema overview" in text:
+            request = text.rsplit("User request:", 1)[-1].lower()
+            return next((sql for keywords, sql in STUB_SQL if any(k in request for k in keywords)), DEFAULT_SQL)
+        return self.reply
+
+    def with_structured_output(self, schema):
+        return StubStructuredLLM(self.latency, self.jitter, self._rng.randrange(1 << 30))
+
+class StubRAG(_Delay):
+    def query(self, query_text: str, top_k: int = 5, category_filter: str = None) -> str:
+        time.sleep(self.seconds())
+        return "[Context 1]\nSource: stub.md (Category: stub)\nContent: Open daily 8:00-18:00.\n"
+
+    def query_batch(self, queries: list, top_k: int = 5, category_filter: str = None) -> list:
+        time.sleep(self.seconds())
+        meta = {"filename": "stub.md", "category": "stub"}
+        return [{"query": q, "ids": ["stub_0"], "scores": [1.0], "documents": ["Open daily 8:00-18:00."],
+                 "metadatas": [meta], "context": self.format_context([("Open daily 8:00-18:00.", meta)])} for q in queries]
+
+    @staticmethod
+    def format_context(results: list) -> str:
+        return "\n---\n".join(f"[Context {i+1}]\nSource: {m['filename']} (Category: {m['category']})\nContent: {doc}\n"
+                                for i, (doc, m) in enumerate(results))
@@ -97,4 +97,70 @@ PRODUCT_AGENT_PROMPT = (
     "- Respond with clear and polite language. You may use emojis to enhance your response.\n"
     "- Do not include opinions, further explanations, or follow-up questions in your replies.\n"
     "- Always use the same language as the user."
-) 
\ No newline at end of file
+) 
+
+# Labeled example utterances for the local pre-router (workflows/prerouter.py).
+# Messages that clearly match one agent skip the intake LLM call.
+PREROUTER_EXAMPLES = {
+    "landscape_cafe_bot": [
+        "Location and parking lots?",
+        "Where is the cafe located?",
+        "How do I get to the cafe?",
+        "Is there parking available?",
+        "What time do you open?",
+        "What are your opening hours?",
+        "Are you open on weekends?",
+        "What signature drinks do you recommend?",
+        "What is the Butterfly Pea Latte like?",
+        "Tell me about the duck and fish specials",
+        "Can I feed the ducks and fish?",
+        "Is the cafe kid friendly?",
+        "Do you allow pets?",
+        "What promotions are running this month?",
+        "Any deals for students?",
+        "What do reviewers say about the cafe?",
+        "Do you have wifi?",
+        "How can I contact the cafe?",
+        "เวลาเปิดปิดร้าน",
+        "ร้านเปิดกี่โมง",
+        "ร้านอยู่ที่ไหน",
+        "มีที่จอดรถไหม",
+        "เดินทางไปร้านยังไง",
+        "โปรโมชั่นประจำเดือน",
+        "เดือนนี้มีโปรอะไรบ้าง",
+        "เมนูแนะนำของร้านมีอะไรบ้าง",
+        "ให้อาหารเป็ดกับปลาได้ไหม",
+        "ร้านเหมาะกับเด็กไหม",
+        "พาสุนัขไปได้ไหม",
+        "ติดต่อร้านได้ทางไหน",
+        "รีวิวร้านเป็นยังไงบ้าง",
+    ],
+    "coffee_db_agent": [
+        "Sales this month",
+        "What were total sales today?",
+        "Show me yesterday's orders",
+        "How many orders were completed this week?",
+        "List all products with prices",
+        "What is the price of an Americano?",
+        "Which tables are available right now?",
+        "Show reservations for tomorrow",
+        "Is reservation R1001 confirmed?",
+        "Which staff are working as baristas?",
+        "List active staff members",
+        "What is customer C001's member level?",
+        "Show Gold member customers",
+        "What are the top selling items?",
+        "Show the order history of customer C002",
+        "ยอดขายเดือนนี้",
+        "ยอดขายวันนี้เท่าไหร่",
+        "ขอรายการสินค้าที่มีพร้อมราคา",
+        "ราคาอเมริกาโน่เท่าไหร่",
+        "ตรวจสอบโต๊ะว่างขณะนี้",
+        "มีโต๊ะว่างกี่โต๊ะ",
+        "ดูการจองโต๊ะวันพรุ่งนี้",
+        "รายชื่อพนักงานทั้งหมด",
+        "ลูกค้าระดับ Gold มีใครบ้าง",
+        "สินค้าขายดีที่สุดคืออะไร",
+        "คำสั่งซื้อล่าสุดของลูกค้า C001",
+    ],
+}
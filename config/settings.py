@@ -15,18 +15,132 @@ UI_DIR = BASE_DIR / "ui"
 
 # Database
 DATABASE_PATH = DATABASE_DIR / "database.db"
+SQL_CACHE_ENABLED = True       # reuse validated NL-to-SQL plans (skips the LLM on hits)
+SQL_CACHE_MAX_ENTRIES = 256
+DB_MMAP_SIZE = 256 * 1024 * 1024   # bytes memory-mapped per pooled read connection
+DB_CACHE_SIZE_KIB = 64 * 1024      # page cache per pooled read connection
+DB_QUERY_TIME_BUDGET = 5.0         # seconds before a generated query is aborted
+DB_QUERY_MAX_VM_STEPS = 50_000_000 # SQLite VM instructions before a generated query is aborted
+DB_FULL_SCAN_MAX_ROWS = 1_000_000  # reject plans that SCAN a table larger than this
+INDEX_ADVISOR_ENABLED = True       # record executed SQL and create helpful indexes on sync
+INDEX_ADVICE_PATH = DATABASE_DIR / "index_advice.json"
+INDEX_ADVISOR_MIN_USES = 1         # recorded uses before an index is created
+INDEX_ADVICE_SAVE_INTERVAL = 30.0  # seconds between writes of recorded advice (also saved at exit)
+DB_SYNC_CHUNK_ROWS = 50_000        # CSV rows per executemany batch in csvs_to_sqlite
+DB_APPEND_ONLY_TABLES = ("orders", "order_items")  # CSVs that only grow: load just the new rows
 
 # RAG/Embedding
 KNOWLEDGE_BASE_PATH = ASSETS_DIR / "knowledge_base"
 EMBEDDING_PATH = RAG_DIR / "embedding"
 EMBEDDING_MODEL_NAME = "BAAI/bge-m3"
 COLLECTION_NAME = "landscape_cafe"
+KB_MANIFEST_NAME = "kb_manifest.json"  # per-file/per-chunk hashes for incremental sync
+
+# Embedding cache (in-memory LRU + SQLite on disk), shared by queries and KB builds
+EMBEDDING_CACHE_ENABLED = True
+EMBEDDING_CACHE_PATH = RAG_DIR / "embedding_cache.sqlite3"
+EMBEDDING_CACHE_MEMORY_ITEMS = 4096
+
+# Knowledge-base build pipeline (rag/embedding_pipeline.py)
+EMBED_WORKERS = int(os.environ.get("EMBED_WORKERS", "1"))  # encoding processes; 1 = in-process, 0 = auto (up to 4)
+EMBED_POOL_MIN_TEXTS = 4096  # uncached texts in one build before the multi-process pool is started
+EMBED_BATCH_TOKENS = 8192   # padded tokens per batch; batch size adapts to chunk length
+EMBED_MAX_BATCH_SIZE = 64
+EMBED_WINDOW_CHUNKS = 1024  # chunks held in memory at once while building
+CHROMA_WRITE_BATCH = 256    # chunks per Chroma upsert
+INGEST_PDF_WORKERS = 0      # processes for PDF text extraction; 0 = one per CPU
+INGEST_TEXT_WORKERS = 8     # threads for reading text/markdown files
+
+# Retrieval (rag/bm25.py): "hybrid" = BM25 + vector fused with RRF, "vector", or "lexical" (no embedding call)
+RETRIEVAL_MODE = os.environ.get("RETRIEVAL_MODE", "vector")  # opt in to "hybrid"; it changes the ranking
+BM25_INDEX_NAME = "bm25_index.json"  # stored next to the Chroma collection
+HYBRID_CANDIDATES = 4       # each retriever returns top_k * HYBRID_CANDIDATES candidates for fusion
+RRF_K = 60                  # reciprocal rank fusion constant
+
+# Vector backend for queries: "chroma" (HNSW) or "numpy" (rag/numpy_index.py: exact cosine over a
+# memory-mapped matrix, rebuilt from the collection after every build/sync). Builds always write to Chroma.
+VECTOR_BACKEND = os.environ.get("VECTOR_BACKEND", "chroma")
+NUMPY_INDEX_DIR_NAME = "numpy_index"  # stored next to the Chroma collection
+NUMPY_INDEX_DTYPE = "float32"  # "float16" halves memory, each query casts the matrix back to float32
+
+# Cross-encoder reranking (rag/reranker.py): retrieve RERANK_CANDIDATES chunks, keep the relevant ones
+RERANK_ENABLED = os.environ.get("RERANK_ENABLED", "0") == "1"
+RERANK_MODEL_NAME = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"  # small multilingual model (Thai + English)
+RERANK_CANDIDATES = 24
+RERANK_BATCH_SIZE = 16
+RERANK_MAX_LENGTH = 512
+RERANK_SCORE_CUTOFF = 0.1       # relevance in [0, 1]; the best chunk is always kept
+RERANK_TOKEN_BUDGET = 1200      # estimated prompt tokens of the kept chunks (None = no limit)
+RERANK_LATENCY_BUDGET = 0.3     # seconds; skip reranking when scoring is expected to take longer
+
+# Prompt-token budgets (agents/token_budget.py), counted with the bge-m3 tokenizer
+TOKEN_COUNTER_MODEL = EMBEDDING_MODEL_NAME
+TOKEN_BUDGETS = {
+    "intake_agent": 1500,        # chat history sent to intake; older turns are summarized
+    "landscape_cafe_bot": 2000,  # retrieved context in the cafe agent prompt
+    "coffee_db_agent": 800,      # query result table passed on to the aggregator
+    "aggregator": 3000,          # agent outputs combined by the aggregator
+    "default": 2000,
+}
+INTAKE_SUMMARY_TOKENS = 200      # extractive summary of the history that no longer fits
+
+# Aggregator formatter (agents/formatter.py): render small DB results locally instead of an LLM rewrite
+FORMATTER_ENABLED = True
+FORMATTER_MAX_ROWS = 8
+FORMATTER_MAX_COLUMNS = 6
+FORMATTER_MAX_CELL_CHARS = 120
+FORMATTER_JOIN_MULTI_AGENT = True  # join same-language multi-agent answers without an LLM merge
+FORMATTER_LLM_KEYWORDS = (         # requests that still need an LLM rewrite
+    "compare", "why", "recommend", "suggest", "explain", "summar", "trend", "analy",
+    "เปรียบเทียบ", "ทำไม", "แนะนำ", "อธิบาย", "สรุป", "แนวโน้ม", "วิเคราะห์",
+)
 
 # Gradio UI
 APP_TITLE = "Landscape Cafe & Eatery Chatbot"
+SERVER_HOST = os.environ.get("GRADIO_SERVER_NAME", "127.0.0.1")
+SERVER_PORT = int(os.environ.get("GRADIO_SERVER_PORT", "7860"))
+
+# Startup: load bge-m3/ChromaDB in the background after the server starts ("0" = eager, at import)
+RAG_LAZY_INIT = os.environ.get("RAG_LAZY_INIT", "1") == "1"
 
 # API/LLM
 GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY", "")
 GEMINI_MODEL = "gemini-2.5-flash-preview-05-20"
 
+# Pre-router: embedding-similarity routing that skips the intake LLM when confident
+PREROUTER_ENABLED = True
+PREROUTER_THRESHOLD = 0.72  # min mean top-k similarity for the best agent
+PREROUTER_MARGIN = 0.06     # min gap to the second-best agent
+PREROUTER_FIRST_TURN_ONLY = True  # after the first turn, only pre-route messages that stand on their own
+
+# Semantic response cache (question -> answer), consulted before the workflow runs
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_THRESHOLD = 0.95       # min cosine similarity to reuse an answer
+RESPONSE_CACHE_MAX_ENTRIES = 512
+RESPONSE_CACHE_LIVE_DATA_TTL = 120    # seconds; answers using coffee_db_agent (0 = never cache)
+RESPONSE_CACHE_FIRST_TURN_ONLY = True  # follow-ups depend on chat history, so only cache standalone turns
+
+# Workflow cache (compiled graph + agents reused per API key)
+WORKFLOW_CACHE_SIZE = 32
+WORKFLOW_CACHE_TTL = 30 * 60  # seconds of inactivity before eviction
+
+# Tracing (workflows/tracing.py): per-stage spans -> latency histograms at METRICS_PATH (Prometheus text)
+TRACING_ENABLED = os.environ.get("TRACING_ENABLED", "1") == "1"
+TRACE_JSONL_PATH = os.environ.get("TRACE_JSONL_PATH", "")  # one JSON line per span ("" = off)
+METRICS_PATH = "/metrics"
+TRACE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)  # seconds
+
+# Admission control (workflows/admission.py): bounded concurrency in front of the workflow
+ADMISSION_ENABLED = os.environ.get("ADMISSION_ENABLED", "1") == "1"
+ADMISSION_MAX_ACTIVE = 8          # turns running the workflow at once
+ADMISSION_MAX_QUEUE = 32          # turns waiting for a slot; more are turned away with a friendly message
+ADMISSION_QUEUE_TIMEOUT = 60.0    # seconds a turn may wait in the queue
+ADMISSION_KEY_RATE_PER_MIN = 20   # turns per minute per API key (token bucket refill; 0 = no limit)
+ADMISSION_KEY_BURST = 5           # turns an API key may send back-to-back
+STAGE_LIMITS = {
+    "embedding": 2,  # concurrent bge-m3 / cross-encoder calls (CPU-bound)
+    "sqlite": 8,     # concurrent database agent queries
+    "llm": 8,        # concurrent Gemini calls across all sessions
+}
+
 # Other settings can be added here 
\ No newline at end of file
@@ -1,48 +1,234 @@
 import os
 import glob
+import hashlib
+import time
 import pandas as pd
 import sqlite3
+from typing import Dict, Optional, Tuple
 from config import settings
+from database.index_advisor import IndexAdvisor
+from database.schema import is_internal_table, read_schema_overview, write_schema_overview
 
-def csvs_to_sqlite(csv_folder: str = None, db_path: str = None):
+# Incremental CSV -> SQLite sync.
+# SYNC_MANIFEST_TABLE remembers size/mtime/sha256/rows of every CSV that was loaded, so
+# unchanged files are skipped. Changed files are streamed in chunks into "<table>__new"
+# and swapped in with DROP + RENAME inside one transaction (readers see the old or the
+# new table, never a half-loaded one). Append-only tables whose CSV only grew get just
+# the new rows.
+
+SYNC_MANIFEST_TABLE = "_sync_manifest"
+HASH_BLOCK = 1 << 20
+
+def primary_key_for(columns) -> Optional[str]:
+    """First column if it looks like an id (`id` / `<x>_id`), else None."""
+    col = columns[0] if len(columns) else None
+    if col and (col == "id" or col.endswith("_id")):
+        return col
+    return None
+
+def hash_file(path: str, prefix_size: int = 0) -> Tuple[str, Optional[str]]:
+    """sha256 of the whole file and of its first prefix_size bytes (one pass)."""
+    sha = hashlib.sha256()
+    prefix = None
+    done = 0
+    with open(path, "rb") as f:
+        while True:
+            want = HASH_BLOCK
+            if prefix is None and 0 < prefix_size - done < HASH_BLOCK:
+                want = prefix_size - done
+            block = f.read(want)
+            if not block:
+                break
+            sha.update(block)
+            done += len(block)
+            if prefix is None and prefix_size and done == prefix_size:
+                prefix = sha.hexdigest()
+    return sha.hexdigest(), prefix
+
+def _ensure_manifest(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {SYNC_MANIFEST_TABLE} ("
+        "table_name TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha256 TEXT, "
+        "rows INTEGER, columns TEXT, synced_at TEXT)"
+    )
+
+def _load_manifest(conn: sqlite3.Connection) -> Dict[str, dict]:
+    cursor = conn.execute(f"SELECT * FROM {SYNC_MANIFEST_TABLE}")
+    names = [d[0] for d in cursor.description]
+    return {row[0]: dict(zip(names, row)) for row in cursor.fetchall()}
+
+def _save_manifest_row(conn: sqlite3.Connection, table: str, st: os.stat_result, sha: str, rows: int, columns) -> None:
+    conn.execute(
+        f"INSERT OR REPLACE INTO {SYNC_MANIFEST_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (table, st.st_size, st.st_mtime_ns, sha, rows, ",".join(columns), time.strftime("%Y-%m-%dT%H:%M:%S")),
+    )
+
+def _insert_chunks(conn: sqlite3.Connection, table: str, chunks, columns) -> int:
+    placeholders = ", ".join("?" for _ in columns)
+    col_list = ", ".join(f'"{c}"' for c in columns)
+    sql = f'INSERT INTO "{table}" ({col_list}) VALUES ({placeholders})'
+    rows = 0
+    for chunk in chunks:
+        # Object arrays hold Python scalars sqlite3 can bind; NaN is stored as NULL
+        conn.executemany(sql, chunk.astype(object).to_numpy().tolist())
+        rows += len(chunk)
+    return rows
+
+def _read_chunks(source, chunk_rows: int, **kwargs):
+    return pd.read_csv(source, chunksize=chunk_rows, **kwargs)
+
+def load_table(conn: sqlite3.Connection, table: str, path: str, chunk_rows: int) -> Tuple[int, list]:
+    """
+    Stream the CSV into "<table>__new" and swap it in. Column types come from the first
+    chunk; the id column is declared PRIMARY KEY unless its values turn out not to be unique.
+    Runs inside the caller's transaction. Returns (rows, columns).
+    """
+    staging = f"{table}__new"
+    chunks = _read_chunks(path, chunk_rows)
+    try:
+        first = next(chunks)
+    except StopIteration:
+        first = pd.read_csv(path)
+    columns = list(first.columns)
+    pk = primary_key_for(columns)
+    for keys in ([pk] if pk else []) + [None]:
+        conn.execute("SAVEPOINT load_table")
+        conn.execute(f'DROP TABLE IF EXISTS "{staging}"')
+        conn.execute(pd.io.sql.get_schema(first, staging, keys=keys, con=conn))
+        try:
+            rows = _insert_chunks(conn, staging, [first], columns)
+            rows += _insert_chunks(conn, staging, chunks, columns)
+        except sqlite3.IntegrityError:
+            # Duplicate ids: load again without the primary key
+            conn.execute("ROLLBACK TO load_table")
+            conn.execute("RELEASE load_table")
+            chunks = _read_chunks(path, chunk_rows)
+            first = next(chunks, first)
+            continue
+        conn.execute("RELEASE load_table")
+        break
+    conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+    conn.execute(f'ALTER TABLE "{staging}" RENAME TO "{table}"')
+    return rows, columns
+
+def append_rows(conn: sqlite3.Connection, table: str, path: str, offset: int, columns: list, chunk_rows: int) -> int:
+    """Insert the rows after byte `offset` (the previously loaded part of an append-only CSV)."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        chunks = _read_chunks(f, chunk_rows, header=None, names=columns)
+        return _insert_chunks(conn, table, chunks, columns)
+
+def _can_append(path: str, old: dict, st: os.stat_result, prefix_sha: Optional[str]) -> bool:
+    if st.st_size <= old["size"] or prefix_sha != old["sha256"]:
+        return False
+    with open(path, "rb") as f:
+        header = f.readline().decode("utf-8").strip()
+        # Previous content must end on a line boundary
+        f.seek(old["size"] - 1)
+        ends_with_newline = f.read(1) == b"\n"
+    return ends_with_newline and header.replace('"', "") == old["columns"]
+
+def sync_table(conn: sqlite3.Connection, table: str, path: str, old: Optional[dict], append_only: bool, chunk_rows: int) -> str:
+    """Bring one table in line with its CSV. Returns the action taken."""
+    st = os.stat(path)
+    if old and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns:
+        return "skipped"
+    prefix_size = old["size"] if old and append_only and st.st_size > old["size"] else 0
+    sha, prefix_sha = hash_file(path, prefix_size)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if old and old["sha256"] == sha:
+            # Touched but identical: only refresh the stat fields
+            _save_manifest_row(conn, table, st, sha, old["rows"], old["columns"].split(","))
+            action = "skipped"
+        elif old and append_only and _can_append(path, old, st, prefix_sha):
+            columns = old["columns"].split(",")
+            conn.execute("SAVEPOINT append_rows")
+            try:
+                added = append_rows(conn, table, path, old["size"], columns, chunk_rows)
+                conn.execute("RELEASE append_rows")
+                _save_manifest_row(conn, table, st, sha, old["rows"] + added, columns)
+                action = f"appended {added} rows"
+            except sqlite3.IntegrityError:
+                # New rows reuse existing ids: not really append-only, reload the table
+                conn.execute("ROLLBACK TO append_rows")
+                conn.execute("RELEASE append_rows")
+                action = None
+        else:
+            action = None
+        if action is None:
+            rows, columns = load_table(conn, table, path, chunk_rows)
+            _save_manifest_row(conn, table, st, sha, rows, columns)
+            action = f"loaded {rows} rows"
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return action
+
+def csvs_to_sqlite(csv_folder: str = None, db_path: str = None, index_advisor=None, chunk_rows: int = None) -> Dict[str, str]:
     """
     Convert all CSV files in csv_folder to tables in SQLite DB at db_path.
-    - If a CSV is updated, update table.
+    - If a CSV is unchanged (size/mtime, then sha256), skip it.
+    - If a CSV is updated, reload its table in chunks and swap it in atomically.
+    - If an append-only CSV only grew, insert just the new rows.
     - If a CSV is deleted, drop table in DB.
     - If a new CSV is added, create new table.
-    Paths are configurable via config.settings.
+    - Id columns become primary keys; advisor indexes are recreated after the sync.
+    Paths are configurable via config.settings; index_advisor=False skips the advisor.
+    Returns {table: action}.
     """
     # Use config if not provided
     csv_folder = str(csv_folder or (settings.ASSETS_DIR / "raw_data"))
     db_path = str(db_path or settings.DATABASE_PATH)
+    chunk_rows = chunk_rows or settings.DB_SYNC_CHUNK_ROWS
+    if index_advisor is None and settings.INDEX_ADVISOR_ENABLED:
+        index_advisor = IndexAdvisor(settings.INDEX_ADVICE_PATH, settings.INDEX_ADVISOR_MIN_USES, settings.INDEX_ADVICE_SAVE_INTERVAL)
+    start = time.time()
 
     # 1. Scan all csv files in the folder
     csv_files = {os.path.splitext(os.path.basename(f))[0]: f
                  for f in glob.glob(os.path.join(csv_folder, "*.csv"))}
-    # 2. Connect to the SQLite database
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    # 2. Connect to the SQLite database (transactions are managed explicitly per table)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    # WAL lets the agent's read-only pooled connections read while a sync is writing
+    conn.execute("PRAGMA journal_mode=WAL;")
+    _ensure_manifest(conn)
+    manifest = _load_manifest(conn)
 
     # 3. Get existing tables in the database
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-    existing_tables = set(row[0] for row in cursor.fetchall())
+    existing_tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table';").fetchall()}
 
     # 4. Create/update tables from CSV files
-    for table, file in csv_files.items():
-        df = pd.read_csv(file)
-        # Overwrite table (if exists) with current CSV
-        df.to_sql(table, conn, if_exists='replace', index=False)
-        print(f"[DB SYNC] Table '{table}' updated from {file}")
+    actions = {}
+    for table, file in sorted(csv_files.items()):
+        old = manifest.get(table) if table in existing_tables else None
+        actions[table] = sync_table(conn, table, file, old, table in settings.DB_APPEND_ONLY_TABLES, chunk_rows)
+        if actions[table] != "skipped":
+            print(f"[DB SYNC] Table '{table}' {actions[table]} from {file}")
 
     # 5. Drop tables that have no corresponding CSV anymore
     for table in existing_tables:
-        if table not in csv_files:
-            cursor.execute(f"DROP TABLE IF EXISTS {table};")
+        if table not in csv_files and not is_internal_table(table) and not table.endswith("__new"):
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(f'DROP TABLE IF EXISTS "{table}";')
+            conn.execute(f"DELETE FROM {SYNC_MANIFEST_TABLE} WHERE table_name = ?", (table,))
+            conn.execute("COMMIT")
+            actions[table] = "dropped"
             print(f"[DB SYNC] Table '{table}' dropped (no CSV found)")
 
-    conn.commit()
+    changed = any(a != "skipped" for a in actions.values())
+    # 6. Recreate the indexes recommended by the index advisor (reloaded tables lose them)
+    if index_advisor:
+        index_advisor.apply(conn, analyze=changed)
+    # 7. Precompute the schema overview used in the database agent's prompt
+    if changed or read_schema_overview(conn) is None:
+        write_schema_overview(conn)
+        print("[DB SYNC] Schema overview metadata refreshed.")
     conn.close()
-    print("[DB SYNC] Database sync completed.")
+    skipped = sum(1 for a in actions.values() if a == "skipped")
+    print(f"[DB SYNC] Database sync completed in {time.time() - start:.2f}s ({skipped} unchanged tables skipped).")
+    return actions
 
 if __name__ == "__main__":
     csvs_to_sqlite()
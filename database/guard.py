@@ -0,0 +1,153 @@
+import re
+import sqlite3
+import time
+from typing import Any, Dict, List, Tuple
+
+import pandas as pd
+
+from database.index_advisor import table_aliases
+
+# Cost guard for LLM-generated SQL run by the database agent.
+# - the statement is wrapped in an outer LIMIT so SQLite stops producing rows early
+# - rows are fetched in batches and never more than max_rows + 1 are materialized
+# - a progress handler aborts statements over a wall-clock / VM-step budget
+# - EXPLAIN QUERY PLAN rejects full scans of tables above a row threshold
+
+SQL_START = re.compile(r"^\s*(select|with)\b", re.IGNORECASE)
+SCAN_DETAIL = re.compile(r"^SCAN (?:TABLE )?(\w+)", re.IGNORECASE)
+FETCH_BATCH = 256
+
+class QueryGuardError(ValueError):
+    """Raised when the guard refuses or aborts a statement; `stats` says which guard fired."""
+    def __init__(self, message: str, stats: Dict[str, Any]):
+        super().__init__(message)
+        self.stats = stats
+
+def prepare_sql(sql: str) -> str:
+    """Strip trailing semicolons and allow a single read-only statement only."""
+    sql = sql.strip().rstrip(";").strip()
+    if not SQL_START.match(sql):
+        raise ValueError("Only SELECT statements are allowed.")
+    if _has_multiple_statements(sql):
+        raise ValueError("Only a single SQL statement is allowed.")
+    return sql
+
+def _has_multiple_statements(sql: str) -> bool:
+    # A semicolon that completes a statement before the end means a second statement follows
+    # (semicolons inside string literals do not complete a statement)
+    for i, ch in enumerate(sql):
+        if ch == ";" and sqlite3.complete_statement(sql[: i + 1]) and sql[i + 1:].strip():
+            return True
+    return False
+
+def wrap_with_limit(sql: str, limit: int) -> str:
+    return f"SELECT * FROM (\n{sql}\n) LIMIT {int(limit)}"
+
+def full_scans(conn: sqlite3.Connection, sql: str) -> List[Tuple[str, int]]:
+    """
+    (table, approximate row count) for every table the plan walks end to end (SCAN, not SEARCH).
+    Aliases ("SCAN o") are resolved from the FROM / JOIN clauses. Plan rows that do not name a
+    table in sqlite_master (SCAN CONSTANT ROW, CTEs, subqueries) are skipped: the tables they
+    read appear as their own plan rows.
+    """
+    scans, aliases, tables = [], None, None
+    for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall():
+        match = SCAN_DETAIL.match(str(row[-1]))
+        if not match:
+            continue
+        if aliases is None:
+            aliases = table_aliases(sql)
+            tables = {name.lower(): name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        name = match.group(1)
+        table = tables.get(aliases.get(name.lower(), name).lower())
+        if table is None:
+            continue
+        try:
+            # MAX(rowid) is an O(log n) estimate of the table size
+            count = conn.execute(f'SELECT MAX(rowid) FROM "{table}"').fetchone()[0] or 0
+        except sqlite3.Error as e:
+            print(f"[QueryGuard] Could not size scanned table '{table}' ({e}); counted as a scan of unknown size.")
+            count = 0
+        scans.append((table, int(count)))
+    return scans
+
+def guarded_query(
+    conn: sqlite3.Connection,
+    sql: str,
+    max_rows: int = 15,
+    time_budget: float = 5.0,
+    max_vm_steps: int = 50_000_000,
+    max_scan_rows: int = 1_000_000,
+    progress_interval: int = 1000,
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Run one SELECT under the cost guard.
+    Returns (DataFrame of at most max_rows rows, stats); raises QueryGuardError when a guard fires.
+    """
+    stats: Dict[str, Any] = {
+        "rows": 0, "truncated": False, "seconds": 0.0, "vm_steps": 0,
+        "scanned_tables": [], "est_rows_scanned": 0, "guard": None,
+    }
+    sql = prepare_sql(sql)
+    wrapped = wrap_with_limit(sql, max_rows + 1)
+
+    scans = full_scans(conn, wrapped)
+    stats["scanned_tables"] = [t for t, _ in scans]
+    stats["est_rows_scanned"] = sum(n for _, n in scans)
+    too_big = [(t, n) for t, n in scans if n > max_scan_rows]
+    if too_big:
+        stats["guard"] = "full_scan"
+        names = ", ".join(f"{t} (~{n:,} rows)" for t, n in too_big)
+        raise QueryGuardError(f"Query rejected: full scan of {names}. Add a filter on an indexed column.", stats)
+
+    start = time.perf_counter()
+    deadline = start + time_budget
+    steps = [0]
+
+    def on_progress():
+        steps[0] += progress_interval
+        if steps[0] > max_vm_steps:
+            stats["guard"] = "vm_steps"
+            return 1
+        if time.perf_counter() > deadline:
+            stats["guard"] = "time"
+            return 1
+        return 0
+
+    # Pooled connections are reused, so the handler is always removed afterwards
+    conn.set_progress_handler(on_progress, progress_interval)
+    try:
+        cursor = conn.execute(wrapped)
+        columns = [d[0] for d in cursor.description]
+        rows: List[tuple] = []
+        while len(rows) <= max_rows:
+            batch = cursor.fetchmany(min(FETCH_BATCH, max_rows + 1 - len(rows)))
+            if not batch:
+                break
+            rows.extend(batch)
+        cursor.close()
+    except sqlite3.OperationalError as e:
+        stats["seconds"] = time.perf_counter() - start
+        stats["vm_steps"] = steps[0]
+        if stats["guard"]:
+            budget = f"{time_budget:.1f}s" if stats["guard"] == "time" else f"{max_vm_steps:,} VM steps"
+            raise QueryGuardError(f"Query aborted: exceeded the {budget} budget.", stats) from e
+        raise
+    finally:
+        conn.set_progress_handler(None, 0)
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["vm_steps"] = steps[0]
+    stats["truncated"] = len(rows) > max_rows
+    rows = rows[:max_rows]
+    stats["rows"] = len(rows)
+    return pd.DataFrame.from_records(rows, columns=columns), stats
+
+def describe(stats: Dict[str, Any]) -> str:
+    """One-line summary for the agent logs."""
+    scanned = ", ".join(stats["scanned_tables"]) or "none"
+    return (
+        f"rows={stats['rows']}{'+' if stats['truncated'] else ''} time={stats['seconds'] * 1000:.1f}ms "
+        f"vm_steps~{stats['vm_steps']:,} full_scans={scanned} (~{stats['est_rows_scanned']:,} rows) "
+        f"guard={stats['guard'] or 'not fired'}"
+    )
@@ -0,0 +1,260 @@
+import atexit
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+# Index advisor for the tables csvs_to_sqlite builds from CSVs.
+# CoffeeDatabaseAgent records every statement it runs; statements whose plan scans a
+# table (or makes SQLite build an automatic index) are parsed for the WHERE / JOIN ON /
+# ORDER BY columns of that table and turned into index advice, persisted as JSON (written
+# by a timer at most every save_interval seconds and at exit, never on the query path).
+# csvs_to_sqlite calls apply() after each sync, so the indexes survive table rebuilds.
+
+INDEX_PREFIX = "idx_advisor_"
+MAX_INDEX_COLUMNS = 3
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+TABLE_REF = re.compile(
+    r"\b(?:from|join)\s+\"?(\w+)\"?(?:\s+(?:as\s+)?(?!(?:on|where|join|left|right|inner|outer|cross|natural|group|order|limit|using)\b)(\w+))?",
+    re.IGNORECASE,
+)
+CLAUSE_END = r"(?=\b(?:where|group\s+by|order\s+by|limit|having|union|join|left|inner|cross|window)\b|\)|$)"
+WHERE_CLAUSE = re.compile(r"\b(?:where|having)\b(.*?)(?=\b(?:group\s+by|order\s+by|limit|union|window)\b|$)", re.IGNORECASE | re.DOTALL)
+ON_CLAUSE = re.compile(r"\bon\b(.*?)" + CLAUSE_END, re.IGNORECASE | re.DOTALL)
+ORDER_CLAUSE = re.compile(r"\border\s+by\b(.*?)(?=\blimit\b|\)|$)", re.IGNORECASE | re.DOTALL)
+PREDICATE = re.compile(
+    r"(?:(\w+)\.)?\"?(\w+)\"?\s*(==|=|<=|>=|<>|!=|<|>|\bin\b|\bbetween\b|\blike\b|\bis\b)", re.IGNORECASE
+)
+JOIN_RHS = re.compile(r"=\s*(\w+)\.\"?(\w+)\"?", re.IGNORECASE)
+ORDER_COLUMN = re.compile(r"^\s*(?:(\w+)\.)?\"?(\w+)\"?", re.IGNORECASE)
+PLAN_TABLE = re.compile(r"^(SCAN|SEARCH) (?:TABLE )?(\w+)(.*)$", re.IGNORECASE)
+
+EQ_OPS = {"=", "==", "in", "is"}
+
+def _table_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")').fetchall()]
+
+def _indexed_prefixes(conn: sqlite3.Connection, table: str) -> Set[Tuple[str, ...]]:
+    """Column tuples of every existing index (including primary keys) on table."""
+    prefixes = set()
+    for index in conn.execute(f'PRAGMA index_list("{table}")').fetchall():
+        cols = tuple(r[2] for r in conn.execute(f'PRAGMA index_info("{index[1]}")').fetchall())
+        prefixes.add(cols)
+    return prefixes
+
+def _unique_columns(conn: sqlite3.Connection, table: str) -> Set[str]:
+    """Columns that are a primary key or unique index on their own (one row per value)."""
+    unique = {row[1] for row in conn.execute(f'PRAGMA table_info("{table}")').fetchall() if row[5] == 1}
+    for index in conn.execute(f'PRAGMA index_list("{table}")').fetchall():
+        cols = [r[2] for r in conn.execute(f'PRAGMA index_info("{index[1]}")').fetchall()]
+        if index[2] and len(cols) == 1:
+            unique.add(cols[0])
+    return unique
+
+def _is_covered(columns: Tuple[str, ...], existing: Set[Tuple[str, ...]]) -> bool:
+    return any(idx[: len(columns)] == columns for idx in existing)
+
+def table_aliases(sql: str) -> Dict[str, str]:
+    """{lowercased table name or alias: table name} for every FROM / JOIN reference."""
+    aliases: Dict[str, str] = {}
+    for table, alias in TABLE_REF.findall(STRING_LITERAL.sub("?", sql)):
+        aliases[table.lower()] = table
+        if alias:
+            aliases[alias.lower()] = table
+    return aliases
+
+def _slow_plan_aliases(conn: sqlite3.Connection, sql: str) -> Set[str]:
+    """Aliases/tables the plan reads with a full scan or a per-query automatic index."""
+    slow = set()
+    for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall():
+        match = PLAN_TABLE.match(str(row[-1]))
+        if not match:
+            continue
+        op, name, rest = match.groups()
+        if op.upper() == "SCAN" or "AUTOMATIC" in rest.upper():
+            slow.add(name.lower())
+    return slow
+
+def analyze_sql(conn: sqlite3.Connection, sql: str) -> List[Tuple[str, Tuple[str, ...]]]:
+    """
+    Index candidates (table, columns) for one statement: equality columns first, then
+    one range or ORDER BY column, only for tables the current plan reads slowly.
+    """
+    slow = _slow_plan_aliases(conn, sql)
+    if not slow:
+        return []
+    text = STRING_LITERAL.sub("?", sql)
+    aliases = table_aliases(text)
+    known_tables = {t for (t,) in conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()}
+    columns = {t: {c.lower(): c for c in _table_columns(conn, t)} for t in set(aliases.values()) if t in known_tables}
+
+    def resolve(qualifier: Optional[str], column: str) -> Optional[Tuple[str, str]]:
+        if qualifier:
+            table = aliases.get(qualifier.lower())
+            owners = [table] if table in columns else []
+        else:
+            owners = [t for t in columns if column.lower() in columns[t]]
+        if len(owners) != 1 or column.lower() not in columns[owners[0]]:
+            return None
+        return owners[0], columns[owners[0]][column.lower()]
+
+    slow_tables = {aliases[a] for a in slow if a in aliases}
+    eq: Dict[str, List[str]] = {}
+    other: Dict[str, List[str]] = {}
+
+    def add(bucket: Dict[str, List[str]], hit: Optional[Tuple[str, str]]) -> None:
+        if hit and hit[0] in slow_tables and hit[1] not in bucket.setdefault(hit[0], []):
+            bucket[hit[0]].append(hit[1])
+
+    for clause in WHERE_CLAUSE.findall(text) + ON_CLAUSE.findall(text):
+        for qualifier, column, op in PREDICATE.findall(clause):
+            add(eq if op.lower() in EQ_OPS else other, resolve(qualifier, column))
+        for qualifier, column in JOIN_RHS.findall(clause):
+            add(eq, resolve(qualifier, column))
+    for clause in ORDER_CLAUSE.findall(text):
+        for part in clause.split(","):
+            match = ORDER_COLUMN.match(part)
+            if match:
+                add(other, resolve(match.group(1), match.group(2)))
+
+    candidates = []
+    for table in sorted(set(eq) | set(other)):
+        cols = sorted(eq.get(table, []))
+        cols += [c for c in other.get(table, []) if c not in cols][:1]
+        if cols:
+            candidates.append((table, tuple(cols[:MAX_INDEX_COLUMNS])))
+    return candidates
+
+def foreign_key_candidates(conn: sqlite3.Connection) -> List[Tuple[str, Tuple[str, ...]]]:
+    """`<x>_id` columns that are the primary key of another table (join keys)."""
+    tables = [t for (t,) in conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
+              if not t.startswith(("_", "sqlite_"))]
+    pk_owner = {}
+    for table in tables:
+        for row in conn.execute(f'PRAGMA table_info("{table}")').fetchall():
+            if row[5] == 1:
+                pk_owner[row[1]] = table
+    candidates = []
+    for table in tables:
+        for column in _table_columns(conn, table):
+            if column.endswith("_id") and pk_owner.get(column) not in (None, table):
+                candidates.append((table, (column,)))
+    return candidates
+
+def index_name(table: str, columns: Tuple[str, ...]) -> str:
+    return f"{INDEX_PREFIX}{table}_{'_'.join(columns)}"
+
+class IndexAdvisor:
+    def __init__(self, advice_path: str, min_uses: int = 1, save_interval: float = 30.0):
+        self.advice_path = Path(advice_path)
+        self.min_uses = min_uses
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._timer: Optional[threading.Timer] = None
+        self.advice: Dict[str, Dict] = self._load()
+        atexit.register(self.flush)
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.advice_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self) -> None:
+        tmp_path = self.advice_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.advice, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.advice_path)
+
+    def flush(self) -> None:
+        """Write pending advice to disk (timer, apply() and interpreter exit)."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            try:
+                self._save()
+                self._dirty = False
+            except OSError as e:
+                print(f"[IndexAdvisor] Could not save advice to {self.advice_path}: {e}")
+
+    def _schedule_save(self) -> None:
+        """Called with the lock held."""
+        self._dirty = True
+        if self._timer is None:
+            self._timer = threading.Timer(self.save_interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def record(self, conn: sqlite3.Connection, sql: str) -> List[str]:
+        """Analyse a statement the agent executed; returns the advice keys it contributed to."""
+        candidates = analyze_sql(conn, sql)
+        if not candidates:
+            return []
+        keys = []
+        with self._lock:
+            for table, columns in candidates:
+                key = f"{table}({', '.join(columns)})"
+                entry = self.advice.setdefault(key, {"table": table, "columns": list(columns), "uses": 0})
+                entry["uses"] += 1
+                entry["last_seen"] = datetime.now().isoformat(timespec="seconds")
+                entry["example_sql"] = sql.strip()[:500]
+                keys.append(key)
+            self._schedule_save()
+        return keys
+
+    def recommendations(self, conn: sqlite3.Connection) -> List[Tuple[str, Tuple[str, ...]]]:
+        """
+        Recorded advice with enough uses plus foreign-key join columns, minus what is already
+        indexed, what involves a unique column, and prefixes of another recommended index.
+        """
+        with self._lock:
+            wanted = [(e["table"], tuple(e["columns"])) for e in self.advice.values() if e["uses"] >= self.min_uses]
+        wanted += foreign_key_candidates(conn)
+        result, seen = [], set()
+        for table, columns in wanted:
+            if (table, columns) in seen:
+                continue
+            seen.add((table, columns))
+            existing_cols = set(_table_columns(conn, table))
+            if not existing_cols or not set(columns) <= existing_cols:
+                continue  # table or column no longer exists
+            if _is_covered(columns, _indexed_prefixes(conn, table)):
+                continue
+            if len(columns) > 1 and set(columns) & _unique_columns(conn, table):
+                continue  # the unique column alone already pins the row
+            result.append((table, columns))
+        return [
+            (table, columns) for table, columns in result
+            if not any(t == table and len(c) > len(columns) and c[: len(columns)] == columns for t, c in result)
+        ]
+
+    def apply(self, conn: sqlite3.Connection, analyze: bool = True) -> List[str]:
+        """Create the recommended indexes and refresh planner statistics (when data or indexes changed)."""
+        self.flush()
+        created = []
+        for table, columns in self.recommendations(conn):
+            name = index_name(table, columns)
+            cols = ", ".join(f'"{c}"' for c in columns)
+            conn.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" ({cols})')
+            created.append(name)
+            print(f"[DB SYNC] Index '{name}' created on {table}({', '.join(columns)})")
+        if analyze or created:
+            conn.execute("ANALYZE")
+        conn.commit()
+        return created
+
+if __name__ == "__main__":
+    from config import settings
+    conn = sqlite3.connect(settings.DATABASE_PATH)
+    IndexAdvisor(settings.INDEX_ADVICE_PATH, settings.INDEX_ADVISOR_MIN_USES).apply(conn)
+    conn.close()
@@ -0,0 +1,104 @@
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict
+from urllib.parse import quote
+
+# Thread-safe pool of read-only SQLite connections, one per worker thread.
+# Gradio and asyncio.to_thread reuse their worker threads, so each thread keeps
+# its connection (and page cache / mmap) across requests instead of reconnecting.
+# WAL journal mode is a property of the database file and is set by database/create_db.py.
+
+class SQLiteConnectionPool:
+    def __init__(self, db_path: str, mmap_size: int = 256 * 1024 * 1024, cache_size_kib: int = 64 * 1024):
+        self.db_path = str(db_path)
+        self.mmap_size = mmap_size
+        self.cache_size_kib = cache_size_kib
+        self._local = threading.local()
+        self._connections: Dict[int, sqlite3.Connection] = {}
+        self._lock = threading.Lock()
+        self.metrics = {"opened": 0, "closed": 0, "checkouts": 0, "errors": 0}
+
+    def _open(self) -> sqlite3.Connection:
+        uri = f"file:{quote(Path(self.db_path).resolve().as_posix())}?mode=ro"
+        # check_same_thread=False only so close_all() can close other threads' connections;
+        # each connection is still used by the thread that opened it
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.execute("PRAGMA query_only=ON")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kib)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """Connection owned by the calling thread (opened on first use)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+            with self._lock:
+                self._prune_dead_threads()
+                self._connections[threading.get_ident()] = conn
+                self.metrics["opened"] += 1
+        with self._lock:
+            self.metrics["checkouts"] += 1
+        return conn
+
+    def _prune_dead_threads(self) -> None:
+        alive = {t.ident for t in threading.enumerate()}
+        for ident in [i for i in self._connections if i not in alive]:
+            try:
+                self._connections.pop(ident).close()
+            except sqlite3.Error:
+                pass
+            self.metrics["closed"] += 1
+
+    def check(self) -> bool:
+        """Health check on the calling thread's pooled connection."""
+        try:
+            self.connection().execute("SELECT 1;").fetchone()
+            return True
+        except sqlite3.Error as e:
+            print(f"[DB POOL] Connection check failed: {e}")
+            with self._lock:
+                self.metrics["errors"] += 1
+            self._discard_current()
+            return False
+
+    def _discard_current(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            with self._lock:
+                self._connections.pop(threading.get_ident(), None)
+                self.metrics["closed"] += 1
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def close_all(self) -> None:
+        with self._lock:
+            for conn in self._connections.values():
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self.metrics["closed"] += len(self._connections)
+            self._connections.clear()
+        self._local = threading.local()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.metrics, "open_connections": len(self._connections), "db_path": self.db_path}
+
+_pools: Dict[str, SQLiteConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+def get_pool(db_path: str, **kwargs) -> SQLiteConnectionPool:
+    """Process-wide pool for db_path (shared by every session's database agent)."""
+    key = str(Path(db_path).resolve())
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = SQLiteConnectionPool(key, **kwargs)
+        return _pools[key]
@@ -0,0 +1,103 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+# Precomputed schema overview for the database agent's SQL prompt.
+# csvs_to_sqlite writes the overview into SCHEMA_META_TABLE after each sync; readers
+# keep it in memory until the database files change on disk.
+
+SCHEMA_META_TABLE = "_schema_meta"
+ENUM_KEYWORDS = ["status", "type", "category", "state", "flag"]
+
+_cache: Dict[str, Tuple[Tuple, str]] = {}
+_lock = threading.Lock()
+
+def is_internal_table(name: str) -> bool:
+    return name.startswith("_") or name.startswith("sqlite_")
+
+def compute_schema_overview(conn: sqlite3.Connection) -> str:
+    """One line per table with its columns, plus distinct values of small enum-like columns."""
+    cursor = conn.cursor()
+    tables = [t for (t,) in cursor.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall() if not is_internal_table(t)]
+    if not tables:
+        return "(No tables found)"
+    lines = []
+    for table in tables:
+        columns = cursor.execute(f"PRAGMA table_info({table})").fetchall()
+        col_list = [col[1] for col in columns]
+        col_meta = []
+        for col in col_list:
+            if any(kw in col.lower() for kw in ENUM_KEYWORDS):
+                vals = cursor.execute(f"SELECT DISTINCT {col} FROM {table} LIMIT 21").fetchall()
+                vals = [str(v[0]) for v in vals if v[0] is not None]
+                if 1 < len(vals) <= 20:
+                    col_meta.append(f"{col}: [{', '.join(vals)}]")
+        if col_meta:
+            lines.append(f"{table}({', '.join(col_list)})  # " + "; ".join(col_meta))
+        else:
+            lines.append(f"{table}({', '.join(col_list)})")
+    return "\n".join(lines)
+
+def write_schema_overview(conn: sqlite3.Connection) -> str:
+    """Compute the overview and store it in SCHEMA_META_TABLE (call after every sync)."""
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {SCHEMA_META_TABLE} (key TEXT PRIMARY KEY, value TEXT)")
+    overview = compute_schema_overview(conn)
+    # Read schema_version after CREATE TABLE so the stored value matches the final schema
+    schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {SCHEMA_META_TABLE} (key, value) VALUES (?, ?)",
+        [
+            ("overview", overview),
+            ("schema_version", str(schema_version)),
+            ("generated_at", datetime.now().isoformat(timespec="seconds")),
+        ],
+    )
+    conn.commit()
+    return overview
+
+def read_schema_overview(conn: sqlite3.Connection) -> Optional[str]:
+    """Stored overview, or None if missing or written for a different schema."""
+    try:
+        rows = dict(conn.execute(f"SELECT key, value FROM {SCHEMA_META_TABLE}").fetchall())
+    except sqlite3.OperationalError:
+        return None
+    schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+    if rows.get("schema_version") != str(schema_version):
+        return None
+    return rows.get("overview")
+
+def db_stamp(db_path: str) -> Tuple:
+    """(mtime, size) of the database and its WAL file; changes whenever data is written."""
+    stamp = []
+    for path in (str(db_path), f"{db_path}-wal"):
+        try:
+            st = os.stat(path)
+            stamp.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+def get_schema_overview(db_path: str, conn: Optional[sqlite3.Connection] = None) -> str:
+    """
+    Cached schema overview for db_path. Re-read only when the database files change;
+    falls back to computing it live if the metadata table is missing or stale.
+    """
+    key = str(db_path)
+    stamp = db_stamp(key)
+    with _lock:
+        cached = _cache.get(key)
+        if cached and cached[0] == stamp:
+            return cached[1]
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(key)
+    try:
+        overview = read_schema_overview(conn) or compute_schema_overview(conn)
+    finally:
+        if own_conn:
+            conn.close()
+    with _lock:
+        _cache[key] = (stamp, overview)
+    return overview
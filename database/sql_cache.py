@@ -0,0 +1,166 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+# Cache of validated NL -> SQL translations for CoffeeDatabaseAgent.
+# Keys: (schema fingerprint, normalized command). Literals derived from "today"
+# (dates, months, years) are stored as placeholders in both the key and the SQL,
+# so a cached "Sales this month" query is re-rendered with the current month.
+# The SQL may only use a placeholder the command justifies: a relative phrase ("today",
+# "this month", "เดือนนี้", ...) or the same placeholder in the key. "Sales on October 5"
+# asked on October 5 is not cached, because its '2026-10-05' is an absolute date.
+
+AS_OF_PREFIX = re.compile(r"^\s*(as of|ณ วันที่)\s+[\d\-/: ]+[,\s]*", re.IGNORECASE)
+TRAILING_PUNCT = re.compile(r"[\s?!.,。]+$")
+SQL_START = re.compile(r"^\s*(select|with)\b", re.IGNORECASE)
+RELATIVE_TIME = re.compile(r"\{(today|yesterday|tomorrow)\}[ T]\d")
+PLACEHOLDER = re.compile(r"(?<!\{)\{(\w+)\}(?!\})")
+MONTH_PLACEHOLDERS = {"month_start", "next_month_start", "month_name_year", "month", "year"}
+# Relative phrases in the command -> placeholders its SQL may use
+RELATIVE_PHRASES = [
+    (re.compile(r"\b(?:today|tonight)\b|วันนี้|คืนนี้", re.IGNORECASE), {"today"}),
+    (re.compile(r"\byesterday\b|เมื่อวาน", re.IGNORECASE), {"yesterday"}),
+    (re.compile(r"\btomorrow\b|พรุ่งนี้", re.IGNORECASE), {"tomorrow"}),
+    (re.compile(r"\b(?:this month|month to date|mtd)\b|เดือนนี้", re.IGNORECASE), MONTH_PLACEHOLDERS),
+    (re.compile(r"\b(?:this year|year to date|ytd)\b|ปีนี้", re.IGNORECASE), {"year"}),
+    (re.compile(r"\b(?:now|right now|currently)\b|ตอนนี้", re.IGNORECASE), {"now", "now_minute"}),
+]
+
+def schema_fingerprint(schema: str) -> str:
+    return hashlib.sha256(schema.encode("utf-8")).hexdigest()[:16]
+
+def _first_of_next_month(d: datetime) -> datetime:
+    return (d.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+def date_placeholders(now: datetime) -> Dict[str, str]:
+    """Placeholder name -> literal for the given reference time (longest/most specific first)."""
+    return {
+        "now": now.strftime("%Y-%m-%d %H:%M:%S"),
+        "now_minute": now.strftime("%Y-%m-%d %H:%M"),
+        "today": now.strftime("%Y-%m-%d"),
+        "yesterday": (now - timedelta(days=1)).strftime("%Y-%m-%d"),
+        "tomorrow": (now + timedelta(days=1)).strftime("%Y-%m-%d"),
+        "month_start": now.replace(day=1).strftime("%Y-%m-%d"),
+        "next_month_start": _first_of_next_month(now).strftime("%Y-%m-%d"),
+        "month_name_year": now.strftime("%B %Y"),
+        "month": now.strftime("%Y-%m"),
+        "year": now.strftime("%Y"),
+    }
+
+def parameterize(text: str, now: datetime) -> Optional[str]:
+    """
+    Replace literals derived from `now` with {placeholders}.
+    Returns None if a literal is ambiguous (e.g. today is also the first of the month).
+    """
+    values = date_placeholders(now)
+    literal_to_name = {}
+    for name, literal in values.items():
+        if literal in literal_to_name:
+            # Same literal means two different things (e.g. today == month_start)
+            if literal in text:
+                return None
+            continue
+        literal_to_name[literal] = name
+    # Longest literals first so '2025-08-01' is not eaten by '2025-08'
+    pattern = re.compile("|".join(re.escape(l) for l in sorted(literal_to_name, key=len, reverse=True)))
+    escaped = text.replace("{", "{{").replace("}", "}}")
+    return pattern.sub(lambda m: "{" + literal_to_name[m.group(0)] + "}", escaped)
+
+def allowed_placeholders(command: str, key: str) -> set:
+    """Placeholders the SQL for `command` (normalized as `key`) may keep."""
+    allowed = set(PLACEHOLDER.findall(key))
+    if allowed & MONTH_PLACEHOLDERS:
+        allowed |= MONTH_PLACEHOLDERS
+    text = AS_OF_PREFIX.sub("", command)
+    for pattern, names in RELATIVE_PHRASES:
+        if pattern.search(text):
+            allowed |= names
+    return allowed
+
+def render(template: str, now: datetime) -> str:
+    return template.format(**date_placeholders(now))
+
+def normalize_command(command: str, now: datetime) -> Optional[str]:
+    text = AS_OF_PREFIX.sub("", command.strip())
+    # Parameterize before lowercasing so month names ("August 2025") still match
+    text = parameterize(text, now)
+    if not text:
+        return None
+    return TRAILING_PUNCT.sub("", " ".join(text.lower().split())) or None
+
+class SQLPlanCache:
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._fingerprint = None
+        self._lock = threading.Lock()
+        self.metrics = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "invalidations": 0}
+
+    def _key(self, command: str, schema: str, now: datetime) -> Optional[Tuple[str, str]]:
+        normalized = normalize_command(command, now)
+        if normalized is None:
+            return None
+        return schema_fingerprint(schema), normalized
+
+    def _check_schema(self, fingerprint: str) -> None:
+        # Schema changed: every cached plan was generated for the old schema
+        if fingerprint != self._fingerprint:
+            if self._entries:
+                self._entries.clear()
+                self.metrics["invalidations"] += 1
+            self._fingerprint = fingerprint
+
+    def get(self, command: str, schema: str, now: Optional[datetime] = None) -> Optional[str]:
+        """Return SQL rendered for `now`, or None on a miss."""
+        now = now or datetime.now()
+        key = self._key(command, schema, now)
+        with self._lock:
+            if key is None:
+                self.metrics["misses"] += 1
+                return None
+            self._check_schema(key[0])
+            template = self._entries.get(key)
+            if template is None:
+                self.metrics["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.metrics["hits"] += 1
+        return render(template, now)
+
+    def put(self, command: str, schema: str, sql: str, now: Optional[datetime] = None) -> bool:
+        """Cache SQL that executed successfully. Returns False if it is not cacheable."""
+        now = now or datetime.now()
+        if not SQL_START.match(sql) or sql.strip().upper() == "NO_SQL":
+            return False
+        key = self._key(command, schema, now)
+        template = parameterize(sql, now)
+        # A day placeholder followed by a clock time means "relative to now" (e.g. the last hour): not reusable
+        if key is None or template is None or RELATIVE_TIME.search(template):
+            return False
+        # A placeholder the command does not justify is an absolute date that happens to equal today's
+        if set(PLACEHOLDER.findall(template)) - allowed_placeholders(command, key[1]):
+            return False
+        with self._lock:
+            self._check_schema(key[0])
+            self._entries[key] = template
+            self._entries.move_to_end(key)
+            self.metrics["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.metrics["evictions"] += 1
+        return True
+
+    def discard(self, command: str, schema: str, now: Optional[datetime] = None) -> None:
+        """Drop an entry whose SQL failed when replayed."""
+        key = self._key(command, schema, now or datetime.now())
+        with self._lock:
+            if key is not None:
+                self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.metrics["hits"] + self.metrics["misses"]
+            return {**self.metrics, "size": len(self._entries), "hit_rate": self.metrics["hits"] / lookups if lookups else 0.0}
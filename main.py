@@ -1,17 +1,55 @@
 import os
+import asyncio
+import contextlib
+from datetime import datetime
 from config import settings
 from config.agent_registry import AGENT_REGISTRY
 from rag.rag_system import RAGSystem
 from workflows.state import AssignmentResponse
 from workflows.graph import build_workflow
+from workflows.session_cache import WorkflowCache
+from workflows.prerouter import PreRouter
+from workflows.response_cache import SemanticResponseCache
+from workflows.tracing import get_tracer
+from workflows.admission import AdmissionRejected, get_admission
+from database.index_advisor import IndexAdvisor
+from database.sql_cache import SQLPlanCache
+from config.config import PREROUTER_EXAMPLES
 from ui.app import create_app
 import gradio as gr
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 # Import LLM (Gemini) and other dependencies as needed
 from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.runnables import RunnableLambda
 
 # --- Initialize RAGSystem ONCE (global, not per chat) ---
-rag = RAGSystem()  # Uses config.settings by default
+# With RAG_LAZY_INIT the model/collection load after the server starts (or on first query)
+rag = RAGSystem(lazy=settings.RAG_LAZY_INIT)  # Uses config.settings by default
+
+# --- Local pre-router shared by all sessions (skips the intake LLM for obvious intents) ---
+pre_router = PreRouter(
+    rag, PREROUTER_EXAMPLES,
+    threshold=settings.PREROUTER_THRESHOLD,
+    margin=settings.PREROUTER_MARGIN,
+) if settings.PREROUTER_ENABLED else None
+
+# --- Semantic answer cache consulted before running the workflow ---
+response_cache = SemanticResponseCache(
+    rag,
+    threshold=settings.RESPONSE_CACHE_THRESHOLD,
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    live_data_ttl=settings.RESPONSE_CACHE_LIVE_DATA_TTL,
+    version_fn=rag.kb_version,
+) if settings.RESPONSE_CACHE_ENABLED else None
+if response_cache is not None:
+    rag.add_rebuild_listener(response_cache.invalidate)
+
+# --- Validated NL-to-SQL plans shared by every session's database agent ---
+sql_cache = SQLPlanCache(max_entries=settings.SQL_CACHE_MAX_ENTRIES) if settings.SQL_CACHE_ENABLED else None
+index_advisor = IndexAdvisor(settings.INDEX_ADVICE_PATH, settings.INDEX_ADVISOR_MIN_USES, settings.INDEX_ADVICE_SAVE_INTERVAL) if settings.INDEX_ADVISOR_ENABLED else None
 
 # --- Factory functions for dependencies ---
 
@@ -30,17 +68,19 @@ def make_agents(api_key: str, rag: RAGSystem):
     # Intake agent expects a Gemini LLM with structured output
     intake_llm = llm.with_structured_output(AssignmentResponse)
     agents = {
-        "intake_agent": AGENT_REGISTRY["intake_agent"](gemini_with_output=intake_llm),
+        "intake_agent": AGENT_REGISTRY["intake_agent"](gemini_with_output=intake_llm, pre_router=pre_router),
         "landscape_cafe_bot": AGENT_REGISTRY["landscape_cafe_bot"](rag_system=rag, gemini_agent=llm),
-        "coffee_db_agent": AGENT_REGISTRY["coffee_db_agent"](db_path=settings.DATABASE_PATH, llm_agent=llm),
+        "coffee_db_agent": AGENT_REGISTRY["coffee_db_agent"](db_path=settings.DATABASE_PATH, llm_agent=llm, sql_cache=sql_cache, index_advisor=index_advisor),
         "aggregator_agent": AGENT_REGISTRY["aggregator_agent"](gemini_agent=llm),
     }
-    # Wrap each agent as a node function for the workflow
-    def node_wrapper(agent):
+    # Wrap each agent as a node for the workflow; sync invoke() uses process, ainvoke()/astream() use aprocess
+    def node_wrapper(name, agent):
         def node_fn(state):
             return agent.process(state)
-        return node_fn
-    return {k: node_wrapper(v) for k, v in agents.items()}
+        async def anode_fn(state):
+            return await agent.aprocess(state)
+        return RunnableLambda(node_fn, afunc=anode_fn, name=name)
+    return {k: node_wrapper(k, v) for k, v in agents.items()}
 
 # --- Workflow state and logic ---
 
@@ -57,47 +97,208 @@ def build_supportflowx_workflow(api_key: str, rag: RAGSystem):
     )
     return workflow
 
+# --- Compiled workflows are cached per API key (LRU + idle TTL) ---
+workflow_cache = WorkflowCache(
+    factory=lambda api_key: build_supportflowx_workflow(api_key, rag),
+    max_size=settings.WORKFLOW_CACHE_SIZE,
+    idle_ttl=settings.WORKFLOW_CACHE_TTL,
+)
+
 # --- Gradio Chat/Backend Logic ---
 
+FALLBACK_REPLY = "Sorry, I did not understand your question. Please try again."
+
+def validate_request(user_message: str, api_key: str):
+    """Return a warning message if the request cannot be processed, else None."""
+    if not api_key or not api_key.startswith("AI"):
+        return "⚠️ Please enter a valid Gemini API Key."
+    if not user_message.strip():
+        return "⚠️ Please fill in the message."
+    return None
+
+def initial_state(user_message: str, chat_history: list) -> dict:
+    return {
+        "user_message": user_message,
+        "chat_history": chat_history,
+        "allowed_agents": list(AGENT_REGISTRY.keys()),
+        "assigned_agents": {"assignments": []},
+        "agent_results": {},
+        "agent_data": {},
+        "final_response": "",
+        "logs": []
+    }
+
+def finish_turn(chat_history: list, user_message: str, bot_reply: str) -> list:
+    chat_history.append({"role": "user", "content": user_message})
+    chat_history.append({"role": "assistant", "content": bot_reply})
+    # Limit history to last 20 messages
+    return chat_history[-20:]
+
+def lookup_cached_reply(user_message: str, chat_history: list):
+    """Return a semantic-cache hit for this turn, or None."""
+    if response_cache is None or (settings.RESPONSE_CACHE_FIRST_TURN_ONLY and chat_history):
+        return None
+    try:
+        with get_tracer().span("response_cache") as span:
+            hit = response_cache.lookup(user_message)
+            span.set(cache_hit=hit is not None)
+        return hit
+    except Exception as e:
+        print(f"[ResponseCache] Lookup failed: {e}")
+        return None
+
+def remember_reply(user_message: str, chat_history: list, result: dict) -> None:
+    """Store a finished turn in the semantic cache if it is safe to reuse."""
+    if response_cache is None or (settings.RESPONSE_CACHE_FIRST_TURN_ONLY and chat_history):
+        return
+    assigned = [a for a in result.get("assigned_agents") or [] if isinstance(a, dict)]
+    # Skip clarifying questions and turns where an agent failed
+    if any(a.get("finish") for a in assigned):
+        return
+    if any(str(r).startswith("❌") for r in result.get("agent_results", {}).values()):
+        return
+    try:
+        response_cache.store(user_message, result.get("final_response", ""), [a["agent"] for a in assigned])
+    except Exception as e:
+        print(f"[ResponseCache] Store failed: {e}")
+
+def cache_hit_log(hit: dict) -> str:
+    now = datetime.now().isoformat(timespec='seconds')
+    return (f"[{now}] [ResponseCache] Reused answer for similar question '{hit['question']}' "
+            f"(similarity {hit['similarity']:.3f}, agents {hit['agents']}); workflow skipped.")
+
+def queue_notice(chat_history: list, user_message: str, position: int) -> tuple:
+    """(display, logs) shown while a turn waits for a workflow slot; the display is replaced by the answer."""
+    now = datetime.now().isoformat(timespec='seconds')
+    display = chat_history + [
+        {"role": "user", "content": user_message},
+        {"role": "assistant", "content": f"⏳ Many guests are chatting right now. You are #{position} in line, your answer will start shortly."},
+    ]
+    stats = get_admission().stats()
+    return display, f"[{now}] [Admission] Waiting for a slot: position {position}, {stats['active']} turns running, {stats['queued']} queued."
+
 def chat(user_message: str, history: list = None, api_key: str = None):
     """
     Handle a chat message from the UI. Returns updated history and logs.
     """
     try:
-        if not api_key or not api_key.startswith("AI"):
-            return history or [], "⚠️ Please enter a valid Gemini API Key."
-        if not user_message.strip():
-            return history or [], "⚠️ Please fill in the message."
-        # Build workflow for this session (could be cached per api_key)
-        workflow = build_supportflowx_workflow(api_key, rag)
-        allowed_agents = list(AGENT_REGISTRY.keys())
+        warning = validate_request(user_message, api_key)
+        if warning:
+            return history or [], warning
         chat_history = history.copy() if history else []
-        state = {
-            "user_message": user_message,
-            "chat_history": chat_history,
-            "allowed_agents": allowed_agents,
-            "assigned_agents": {"assignments": []},
-            "final_response": "",
-            "logs": []
-        }
-        result = workflow.invoke(state)
-        bot_reply = (result.get("final_response") or "Sorry, I did not understand your question. Please try again.")
+        # Bounded concurrency: wait for a workflow slot (or be turned away when busy / rate limited)
+        ticket = get_admission().enqueue(api_key)
+        try:
+            ticket.wait()
+            with get_tracer().span("turn", streamed=False) as turn:
+                hit = lookup_cached_reply(user_message, chat_history)
+                turn.set(cached=hit is not None)
+                if hit is not None:
+                    return finish_turn(chat_history, user_message, hit["answer"]), cache_hit_log(hit)
+                # Reuse the compiled workflow (and its LLM client) for this API key
+                workflow = workflow_cache.get(api_key)
+                result = workflow.invoke(initial_state(user_message, chat_history))
+                remember_reply(user_message, chat_history, result)
+        finally:
+            ticket.release()
+        bot_reply = (result.get("final_response") or FALLBACK_REPLY)
         logs = "\n".join(result.get("logs", []))
-        chat_history.append({"role": "user", "content": user_message})
-        chat_history.append({"role": "assistant", "content": bot_reply})
-        # Limit history to last 20 messages
-        chat_history = chat_history[-20:]
-        return chat_history, logs
+        return finish_turn(chat_history, user_message, bot_reply), logs
+    except AdmissionRejected as e:
+        return history or [], str(e)
     except Exception as e:
         return history or [], f"❌ Internal error: {str(e)[:500]}"
 
+async def achat(user_message: str, history: list = None, api_key: str = None):
+    """
+    Async variant of chat() for the UI. Yields (history, logs) as the turn progresses,
+    streaming the final answer token-by-token into the chat window.
+    """
+    try:
+        warning = validate_request(user_message, api_key)
+        if warning:
+            yield history or [], warning
+            return
+        chat_history = history.copy() if history else []
+        ticket = get_admission().enqueue(api_key)
+        try:
+            # Report the queue position in the chat window until a workflow slot is free
+            async for position in ticket.positions():
+                yield queue_notice(chat_history, user_message, position)
+            with get_tracer().span("turn", streamed=True) as turn:
+                hit = await asyncio.to_thread(lookup_cached_reply, user_message, chat_history)
+                turn.set(cached=hit is not None)
+                if hit is not None:
+                    yield finish_turn(chat_history, user_message, hit["answer"]), cache_hit_log(hit)
+                    return
+                workflow = workflow_cache.get(api_key)
+                display = chat_history + [{"role": "user", "content": user_message}, {"role": "assistant", "content": ""}]
+                result, streamed, stream_nodes = {}, "", {"aggregator"}
+                async for mode, chunk in workflow.astream(
+                    initial_state(user_message, chat_history), stream_mode=["messages", "values"]
+                ):
+                    if mode == "values":
+                        result = chunk
+                        assigned = [a["agent"] for a in result.get("assigned_agents") or [] if isinstance(a, dict)]
+                        # A lone cafe bot answer is passed through by the aggregator, so stream it directly
+                        if assigned == ["landscape_cafe_bot"]:
+                            stream_nodes.add("landscape_cafe_bot")
+                        yield display, "\n".join(result.get("logs", []))
+                        continue
+                    message, metadata = chunk
+                    if metadata.get("langgraph_node") in stream_nodes and isinstance(message.content, str) and message.content:
+                        streamed += message.content
+                        display[-1]["content"] = streamed
+                        yield display, "\n".join(result.get("logs", []))
+                await asyncio.to_thread(remember_reply, user_message, chat_history, result)
+        finally:
+            ticket.release()
+        bot_reply = (result.get("final_response") or FALLBACK_REPLY)
+        yield finish_turn(chat_history, user_message, bot_reply), "\n".join(result.get("logs", []))
+    except AdmissionRejected as e:
+        yield history or [], str(e)
+    except Exception as e:
+        yield history or [], f"❌ Internal error: {str(e)[:500]}"
+
 def clear_chat():
     """Clear the chat and logs."""
     return [], ""
 
+def health() -> dict:
+    """Readiness info for health checks: "starting"/"loading" until RAG is loaded, then "ready"."""
+    return {"status": rag.status, "rag": rag.readiness()}
+
+def create_server() -> FastAPI:
+    """FastAPI app serving the Gradio UI at / plus /health and the Prometheus metrics endpoint."""
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        # Runs when the server starts; the load is a daemon thread, so startup does not wait for it
+        if settings.RAG_LAZY_INIT:
+            rag.start_background_load()
+        yield
+
+    api = FastAPI(lifespan=lifespan)
+
+    @api.get("/health")
+    def health_endpoint():
+        info = health()
+        return JSONResponse(info, status_code=200 if info["status"] == "ready" else 503)
+
+    @api.get(settings.METRICS_PATH)
+    def metrics_endpoint():
+        # Prometheus text format: per-stage latency histograms, token/cache/error counters, admission queue
+        return PlainTextResponse(get_tracer().prometheus() + get_admission().prometheus(), media_type="text/plain; version=0.0.4")
+
+    # Let queued turns reach achat so it can report their position; Gradio queues anything beyond
+    concurrency = settings.ADMISSION_MAX_ACTIVE + settings.ADMISSION_MAX_QUEUE if settings.ADMISSION_ENABLED else "default"
+    return gr.mount_gradio_app(api, create_app(achat, clear_chat, concurrency_limit=concurrency), path="/")
+
+def launch():
+    """Start the server; its lifespan hook loads the RAG model in the background (see create_server)."""
+    uvicorn.run(create_server(), host=settings.SERVER_HOST, port=settings.SERVER_PORT)
+
 # --- Main entry point ---
 if __name__ == "__main__":
     # Optionally: sync database from CSVs on startup
     # csvs_to_sqlite()  # Uncomment if you want to auto-sync DB
-    app = create_app(chat, clear_chat)
-    app.launch(debug=settings.DEBUG) 
\ No newline at end of file
+    launch() 
\ No newline at end of file
@@ -0,0 +1,135 @@
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from pythainlp.tokenize import word_tokenize as thai_word_tokenize
+except ImportError:  # optional: fall back to character bigrams for Thai
+    thai_word_tokenize = None
+
+# In-process BM25 index over the knowledge-base chunks, kept next to the Chroma collection.
+# Thai has no spaces between words: runs of Thai script are segmented with pythainlp
+# (newmm) when it is installed, otherwise indexed as overlapping character bigrams.
+# The index stores chunk text and metadata, so lexical-only queries need neither the
+# embedding model nor Chroma.
+
+TOKENIZER = "pythainlp-newmm" if thai_word_tokenize else "thai-bigram"
+TOKEN_RUN = re.compile(r"[฀-๿]+|[^\W_]+", re.UNICODE)
+THAI_RUN = re.compile(r"^[฀-๿]+$")
+
+def tokenize(text: str) -> List[str]:
+    text = unicodedata.normalize("NFC", text).lower()
+    tokens = []
+    for run in TOKEN_RUN.findall(text):
+        if not THAI_RUN.match(run):
+            tokens.append(run)
+        elif thai_word_tokenize is not None:
+            tokens += [t for t in thai_word_tokenize(run, engine="newmm", keep_whitespace=False) if t.strip()]
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens += [run[i:i + 2] for i in range(len(run) - 1)]
+    return tokens
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse ranked id lists: score(id) = sum 1 / (k + rank)."""
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.docs: Dict[str, Dict[str, Any]] = {}  # id -> {"text", "metadata", "tf": {term: count}, "len"}
+        self._postings: Optional[Dict[str, Dict[str, int]]] = None
+        self._avg_len = 0.0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def upsert(self, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            for doc_id, text, meta in zip(ids, texts, metadatas):
+                tf = Counter(tokenize(text))
+                self.docs[doc_id] = {"text": text, "metadata": meta, "tf": dict(tf), "len": sum(tf.values())}
+            self._postings = None
+
+    def delete(self, ids: Iterable[str]) -> None:
+        with self._lock:
+            for doc_id in ids:
+                self.docs.pop(doc_id, None)
+            self._postings = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self.docs = {}
+            self._postings = None
+
+    def _build_postings(self) -> Dict[str, Dict[str, int]]:
+        # Rebuilt lazily after upserts/deletes (builds and syncs change many docs at once)
+        postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        for doc_id, doc in self.docs.items():
+            for term, count in doc["tf"].items():
+                postings[term][doc_id] = count
+        self._avg_len = sum(d["len"] for d in self.docs.values()) / len(self.docs) if self.docs else 0.0
+        return dict(postings)
+
+    def search(self, query: str, top_k: int = 5, category: Optional[str] = None) -> List[Tuple[str, float]]:
+        """[(chunk id, BM25 score)] best first; only documents sharing at least one term."""
+        with self._lock:
+            if self._postings is None:
+                self._postings = self._build_postings()
+            postings, avg_len, n = self._postings, self._avg_len or 1.0, len(self.docs)
+            scores: Dict[str, float] = defaultdict(float)
+            for term in set(tokenize(query)):
+                matches = postings.get(term)
+                if not matches:
+                    continue
+                idf = math.log(1 + (n - len(matches) + 0.5) / (len(matches) + 0.5))
+                for doc_id, tf in matches.items():
+                    doc_len = self.docs[doc_id]["len"]
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * doc_len / avg_len))
+            if category:
+                scores = {d: s for d, s in scores.items() if self.docs[d]["metadata"].get("category") == category}
+        return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:top_k]
+
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        return self.docs.get(doc_id)
+
+    def save(self, path: str, info: Optional[Dict[str, Any]] = None) -> None:
+        """info: stamp of what was indexed (chunking settings, ...), checked by load()."""
+        path = Path(path)
+        tmp_path = path.with_suffix(".tmp")
+        with self._lock:
+            payload = {
+                "tokenizer": TOKENIZER, "k1": self.k1, "b": self.b, "info": info or {},
+                "docs": {d: {"text": v["text"], "metadata": v["metadata"]} for d, v in self.docs.items()},
+            }
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, info: Optional[Dict[str, Any]] = None) -> Optional["BM25Index"]:
+        """Index saved at path, or None if missing, saved with another tokenizer or with a different info stamp."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if payload.get("tokenizer") != TOKENIZER or (info is not None and payload.get("info") != info):
+            return None
+        index = cls(payload.get("k1", 1.5), payload.get("b", 0.75))
+        ids = list(payload["docs"])
+        index.upsert(ids, [payload["docs"][i]["text"] for i in ids], [payload["docs"][i]["metadata"] for i in ids])
+        return index
@@ -0,0 +1,96 @@
+import re
+from typing import Any, Dict, List, Tuple
+
+# Structure-aware chunking for knowledge-base documents.
+# Markdown is split at headings, so each chunk covers one section and carries its heading
+# path ("Menu & Signature Dishes > Drinks & Coffee") in metadata and as its first line.
+# Sections longer than chunk_size, and documents without headings (txt/pdf), are split
+# on paragraph, then line, then sentence boundaries with overlap.
+
+HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+RULE = re.compile(r"^\s*(-{3,}|\*{3,}|_{3,})\s*$")
+FENCE = re.compile(r"^\s*(```|~~~)")
+SEPARATORS = ["\n\n", "\n", ". ", " "]
+CHUNKER_VERSION = "markdown-v1"
+
+def clean_heading(text: str) -> str:
+    """Heading text without markdown emphasis."""
+    return re.sub(r"[*_`]+", "", text).strip()
+
+def split_sections(text: str) -> List[Tuple[List[str], str]]:
+    """[(heading path, body)] in document order; text before the first heading has an empty path."""
+    sections = []
+    path: List[Tuple[int, str]] = []
+    body: List[str] = []
+    in_fence = False
+
+    def flush():
+        content = "\n".join(body).strip()
+        if content:
+            sections.append(([title for _, title in path], content))
+        body.clear()
+
+    for line in text.splitlines():
+        if FENCE.match(line):
+            in_fence = not in_fence
+        match = None if in_fence else HEADING.match(line)
+        if match:
+            flush()
+            level = len(match.group(1))
+            path = [(lvl, title) for lvl, title in path if lvl < level] + [(level, clean_heading(match.group(2)))]
+        elif in_fence or not RULE.match(line):
+            body.append(line)
+    flush()
+    return sections
+
+def split_text(text: str, chunk_size: int, chunk_overlap: int, separators: List[str] = SEPARATORS) -> List[str]:
+    """Recursive split on the coarsest separator that yields pieces of at most chunk_size."""
+    text = text.strip()
+    if len(text) <= chunk_size:
+        return [text] if text else []
+    sep = next((s for s in separators if s in text), None)
+    if sep is None:
+        step = max(1, chunk_size - chunk_overlap)
+        return [text[i:i + chunk_size] for i in range(0, len(text), step)]
+    rest = separators[separators.index(sep) + 1:]
+    pieces = []
+    for part in text.split(sep):
+        pieces += [part] if len(part) <= chunk_size else split_text(part, chunk_size, chunk_overlap, rest)
+    chunks, current = [], ""
+    for piece in pieces:
+        candidate = f"{current}{sep}{piece}" if current else piece
+        if len(candidate) <= chunk_size:
+            current = candidate
+            continue
+        if current:
+            chunks.append(current.strip())
+            # Carry the tail of the previous chunk over as overlap, starting at a separator
+            tail = current[-chunk_overlap:] if chunk_overlap else ""
+            if sep in tail:
+                tail = tail[tail.find(sep) + len(sep):]
+            current = f"{tail}{sep}{piece}" if tail and len(tail) + len(sep) + len(piece) <= chunk_size else piece
+        else:
+            current = piece
+    if current.strip():
+        chunks.append(current.strip())
+    return [c for c in chunks if c]
+
+class MarkdownChunker:
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def config(self) -> Dict[str, Any]:
+        """Stored in the knowledge-base manifest; a change forces a full rebuild."""
+        return {"chunker": CHUNKER_VERSION, "chunk_size": self.chunk_size, "chunk_overlap": self.chunk_overlap}
+
+    def split(self, text: str, is_markdown: bool = True) -> List[Tuple[str, str]]:
+        """[(section title path, chunk text)]; the heading path is prepended to each chunk."""
+        sections = split_sections(text) if is_markdown else [([], text)]
+        chunks = []
+        for path, body in sections:
+            heading = " > ".join(path)
+            budget = max(self.chunk_size - len(heading) - 1, self.chunk_size // 2)
+            for piece in split_text(body, budget, min(self.chunk_overlap, budget // 2)):
+                chunks.append((heading, f"{heading}\n{piece}" if heading else piece))
+        return chunks
@@ -0,0 +1,98 @@
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+
+class EmbeddingCache:
+    """
+    Two-level embedding cache: in-memory LRU in front of a SQLite store.
+    Keys are sha256(model_name + normalized text), values are float32 vectors.
+    Shared by query encoding and knowledge-base builds.
+    """
+    def __init__(self, db_path: str, model_name: str, max_memory_items: int = 4096):
+        self.db_path = Path(db_path)
+        self.model_name = model_name
+        self.max_memory_items = max_memory_items
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, dim INTEGER NOT NULL, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        # Whitespace and Unicode form only; casing is kept so cached vectors equal fresh ones
+        return " ".join(unicodedata.normalize("NFC", text).split())
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\x00{self.normalize(text)}".encode("utf-8")).hexdigest()
+
+    def encode(self, texts: List[str], encode_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Return embeddings for texts (same order), calling encode_fn only for cache misses.
+        encode_fn(list_of_texts) must return a 2D array-like of vectors.
+        """
+        keys = [self.key(t) for t in texts]
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for k in keys:
+                vec = self._memory.get(k)
+                if vec is not None:
+                    self._memory.move_to_end(k)
+                    found[k] = vec
+            memory_hits = sum(1 for k in keys if k in found)
+            self.stats["memory_hits"] += memory_hits
+            disk_keys = list({k for k in keys if k not in found})
+            for i in range(0, len(disk_keys), 500):
+                batch = disk_keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                for k, blob in rows:
+                    found[k] = np.frombuffer(blob, dtype=np.float32)
+                    self._remember(k, found[k])
+            self.stats["disk_hits"] += sum(1 for k in keys if k in found) - memory_hits
+
+        missing = {}
+        for k, t in zip(keys, texts):
+            if k not in found and k not in missing:
+                missing[k] = t
+        if missing:
+            vectors = np.asarray(encode_fn(list(missing.values())), dtype=np.float32)
+            with self._lock:
+                rows = []
+                for k, vec in zip(missing, vectors):
+                    vec = np.ascontiguousarray(vec, dtype=np.float32)
+                    found[k] = vec
+                    self._remember(k, vec)
+                    rows.append((k, int(vec.shape[0]), vec.tobytes()))
+                self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, dim, vector) VALUES (?, ?, ?)", rows)
+                self._conn.commit()
+                self.stats["misses"] += sum(1 for k in keys if k in missing)
+        return np.stack([found[k] for k in keys]) if keys else np.zeros((0, 0), dtype=np.float32)
+
+    def _remember(self, key: str, vec: np.ndarray) -> None:
+        self._memory[key] = vec
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def hit_rate(self) -> float:
+        total = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+        return (self.stats["memory_hits"] + self.stats["disk_hits"]) / total if total else 0.0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
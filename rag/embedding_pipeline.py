@@ -0,0 +1,147 @@
+import math
+import os
+import time
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+# Batched embedding pipeline for knowledge-base builds.
+# Chunks arrive as a stream and are processed one window at a time, so only a window's
+# texts and vectors are held in memory. Inside a window texts are sorted by length and
+# split into batches whose padded size (batch size x longest text) stays under a token
+# budget: short chunks go in large batches, long chunks in small ones, with little padding.
+# With workers > 1, a sentence-transformers multi-process pool is started lazily during a
+# build, once more than pool_min_texts uncached texts have to be encoded: small syncs and
+# cache-hit rebuilds never pay for starting the worker processes.
+
+CHARS_PER_TOKEN = 4  # rough estimate; only used to size batches
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    it = iter(items)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 2
+
+def default_workers() -> int:
+    # Each worker holds its own copy of the model, so stay well below the core count
+    return max(1, min(4, (os.cpu_count() or 2) // 2))
+
+class EmbeddingPipeline:
+    def __init__(
+        self,
+        model,
+        workers: int = 1,
+        batch_tokens: Optional[int] = 8192,
+        max_batch_size: int = 64,
+        window_size: Optional[int] = 1024,
+        write_batch_size: int = 256,
+        pool_min_texts: int = 4096,
+    ):
+        """
+        model: SentenceTransformer.
+        workers: encoding processes (0 = auto, 1 = encode in this process).
+        batch_tokens: padded-token budget per batch; None uses a fixed max_batch_size.
+        window_size: chunks held in memory at a time; None processes the whole stream at once.
+        write_batch_size: chunks per vector-store write.
+        pool_min_texts: texts to encode in one build before the multi-process pool is started.
+        """
+        self.model = model
+        self.workers = max(1, int(workers or default_workers()))
+        self.batch_tokens = batch_tokens
+        self.max_batch_size = max_batch_size
+        self.window_size = window_size
+        self.write_batch_size = write_batch_size
+        self.pool_min_texts = pool_min_texts
+        self._pool = None
+        self._building = False
+        self._encoded = 0
+
+    def batch_size_for(self, texts: List[str]) -> int:
+        """Adaptive batch size for length-sorted texts: the longest text sets the padding."""
+        if not self.batch_tokens or not texts:
+            return self.max_batch_size
+        longest = max(estimate_tokens(t) for t in texts)
+        return max(1, min(self.max_batch_size, self.batch_tokens // longest))
+
+    @contextmanager
+    def pool(self):
+        """Scope of a build: encode() may start the pool inside it; it is stopped on exit."""
+        if self._building:
+            yield self
+            return
+        self._building, self._encoded = True, 0
+        try:
+            yield self
+        finally:
+            self._building = False
+            if self._pool is not None:
+                self.model.stop_multi_process_pool(self._pool)
+                self._pool = None
+
+    def _maybe_start_pool(self, n: int) -> None:
+        self._encoded += n
+        if self._building and self.workers > 1 and self._pool is None and self._encoded > self.pool_min_texts:
+            print(f"🔮 Starting {self.workers} encoding processes ({self._encoded} texts to encode)")
+            self._pool = self.model.start_multi_process_pool(target_devices=["cpu"] * self.workers)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Encode texts (returned in input order) in length-sorted, token-budgeted batches."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        self._maybe_start_pool(len(texts))
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        sorted_texts = [texts[i] for i in order]
+        parts = []
+        # Each group of similar-length texts gets its own batch size (set by its longest text)
+        group_size = self.max_batch_size * self.workers
+        for start in range(0, len(sorted_texts), group_size):
+            group = sorted_texts[start:start + group_size]
+            size = self.batch_size_for(group)
+            if self._pool is not None:
+                chunk_size = max(size, math.ceil(len(group) / self.workers))
+                parts.append(self.model.encode_multi_process(group, self._pool, batch_size=size, chunk_size=chunk_size))
+            else:
+                parts.append(self.model.encode(group, batch_size=size, convert_to_numpy=True, show_progress_bar=False))
+        vectors = np.asarray(np.concatenate(parts), dtype=np.float32)
+        result = np.empty_like(vectors)
+        result[order] = vectors
+        return result
+
+    def run(
+        self,
+        chunks: Iterable[Dict[str, Any]],
+        write_fn: Callable[[List[Dict[str, Any]], np.ndarray], None],
+        encode_fn: Optional[Callable[[List[str]], np.ndarray]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Embed a stream of chunks ({'id', 'text', 'metadata'}) and hand them to write_fn in
+        batches of at most write_batch_size. encode_fn defaults to self.encode (pass a cached
+        wrapper to go through the embedding cache). Returns throughput stats.
+        """
+        encode_fn = encode_fn or self.encode
+        stats = {"chunks": 0, "windows": 0, "seconds": 0.0, "chunks_per_sec": 0.0, "workers": 1}
+        start = time.time()
+        windows = batched(chunks, self.window_size) if self.window_size else [list(chunks)]
+        with self.pool():
+            for window in windows:
+                if not window:
+                    continue
+                vectors = encode_fn([c["text"] for c in window])
+                if self._pool is not None:
+                    stats["workers"] = self.workers
+                for i in range(0, len(window), self.write_batch_size):
+                    write_fn(window[i:i + self.write_batch_size], vectors[i:i + self.write_batch_size])
+                stats["chunks"] += len(window)
+                stats["windows"] += 1
+                elapsed = time.time() - start
+                print(f"🔮 Embedded {stats['chunks']} chunks ({stats['chunks'] / max(elapsed, 1e-9):.1f} chunks/s)")
+        stats["seconds"] = time.time() - start
+        stats["chunks_per_sec"] = stats["chunks"] / stats["seconds"] if stats["seconds"] else 0.0
+        return stats
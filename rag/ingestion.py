@@ -0,0 +1,77 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple
+
+import PyPDF2
+import fitz  # PyMuPDF
+
+# Parallel document reading for knowledge-base builds.
+# PDF text extraction is CPU-bound and runs in a process pool; text files are I/O-bound
+# and run in a thread pool. Results are yielded in input order with a bounded number of
+# documents in flight, so a large tree does not end up in memory at once.
+
+TEXT_ENCODINGS = ['utf-8', 'utf-8-sig', 'cp874', 'latin-1']
+
+def read_pdf(path: str) -> str:
+    """Extract PDF text with PyMuPDF, falling back to PyPDF2."""
+    try:
+        with fitz.open(path) as doc:
+            return "".join(page.get_text() for page in doc)
+    except Exception:
+        with open(path, 'rb') as f:
+            reader = PyPDF2.PdfReader(f)
+            return "".join(page.extract_text() or "" for page in reader.pages)
+
+def read_text(path: str) -> str:
+    for enc in TEXT_ENCODINGS:
+        try:
+            with open(path, 'r', encoding=enc) as f:
+                return f.read()
+        except Exception:
+            continue
+    return ""
+
+def read_document(path: str) -> str:
+    """Text content of a .pdf/.md/.txt file ("" if it cannot be read)."""
+    try:
+        return read_pdf(path) if path.lower().endswith('.pdf') else read_text(path)
+    except Exception as e:
+        print(f"❌ Error reading {Path(path).name}: {e}")
+        return ""
+
+def iter_documents(
+    files: Iterable[Tuple[Path, str]],
+    pdf_workers: int = 0,
+    text_workers: int = 8,
+) -> Iterator[Tuple[Path, str, str]]:
+    """
+    Yield (path, category, text) for (path, category) pairs, reading in parallel.
+    pdf_workers: processes for PDF extraction (0 = one per CPU, 1 = read PDFs in a thread).
+    """
+    files = list(files)
+    pdf_workers = pdf_workers or os.cpu_count() or 1
+    has_pdfs = any(p.suffix.lower() == '.pdf' for p, _ in files)
+    pdf_pool: Optional[Executor] = None
+    if has_pdfs and pdf_workers > 1:
+        # spawn: do not fork a parent that may already hold model/torch threads
+        pdf_pool = ProcessPoolExecutor(max_workers=pdf_workers, mp_context=multiprocessing.get_context("spawn"))
+    text_pool = ThreadPoolExecutor(max_workers=max(1, text_workers), thread_name_prefix="kb-reader")
+    max_in_flight = 4 * (max(pdf_workers, text_workers) if pdf_pool else text_workers)
+    pending = deque()
+    try:
+        for path, category in files:
+            pool = pdf_pool if pdf_pool is not None and path.suffix.lower() == '.pdf' else text_pool
+            pending.append((path, category, pool.submit(read_document, str(path))))
+            if len(pending) >= max_in_flight:
+                path_, category_, future = pending.popleft()
+                yield path_, category_, future.result()
+        while pending:
+            path_, category_, future = pending.popleft()
+            yield path_, category_, future.result()
+    finally:
+        for pool in (text_pool, pdf_pool):
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
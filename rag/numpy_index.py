@@ -0,0 +1,95 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Exact cosine search over all chunk embeddings in one contiguous NumPy matrix.
+# For a knowledge base of a few thousand chunks a single matrix-vector product is faster
+# than Chroma's HNSW + SQLite path. Rows are L2-normalized when the index is written, so
+# cosine similarity is a plain dot product. The matrix is saved as .npy and opened with
+# mmap_mode="r": every worker process maps the same file and shares one page-cache copy.
+
+MATRIX_FILE = "vectors.npy"
+META_FILE = "meta.json"
+
+class NumpyVectorIndex:
+    def __init__(self, matrix: np.ndarray, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]], info: Optional[Dict[str, Any]] = None):
+        self.matrix = matrix
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self.info = info or {}
+        # Precomputed boolean row mask per category for category_filter
+        categories = np.array([m.get("category", "") for m in metadatas], dtype=object)
+        self.category_masks = {c: categories == c for c in set(categories.tolist())}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_embeddings(cls, embeddings, ids, documents, metadatas, dtype: str = "float32", info=None) -> "NumpyVectorIndex":
+        matrix = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = (matrix / np.maximum(norms, 1e-12)).astype(dtype)
+        return cls(np.ascontiguousarray(matrix), list(ids), list(documents), list(metadatas), info)
+
+    def search(self, queries, top_k: int = 5, category: Optional[str] = None) -> List[List[Tuple[int, float]]]:
+        """
+        Exact cosine top-k for a batch of query vectors (n, dim) or a single vector.
+        Returns one [(row, score)] list per query, best first.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        if not len(self.ids):
+            return [[] for _ in queries]
+        scores = queries @ self.matrix.T if self.matrix.dtype == np.float32 else queries @ self.matrix.T.astype(np.float32)
+        if category is not None:
+            mask = self.category_masks.get(category)
+            if mask is None:
+                return [[] for _ in queries]
+            scores[:, ~mask] = -np.inf
+            top_k = min(top_k, int(mask.sum()))
+        top_k = min(top_k, scores.shape[1])
+        if top_k <= 0:
+            return [[] for _ in queries]
+        # argpartition finds the top_k in O(n); only those k are sorted
+        part = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+        results = []
+        for row_scores, rows in zip(scores, part):
+            rows = rows[np.argsort(-row_scores[rows])]
+            results.append([(int(r), float(row_scores[r])) for r in rows])
+        return results
+
+    def rows(self, hits: List[Tuple[int, float]]) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """[(id, document, metadata)] for search hits."""
+        return [(self.ids[r], self.documents[r], self.metadatas[r]) for r, _ in hits]
+
+    def save(self, directory) -> None:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        # Write to temp files and swap, so processes mapping the old file keep a valid copy
+        tmp_matrix = directory / ("tmp_" + MATRIX_FILE)
+        with open(tmp_matrix, "wb") as f:
+            np.save(f, self.matrix)
+        tmp_meta = directory / (META_FILE + ".tmp")
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump({"info": self.info, "dtype": str(self.matrix.dtype), "ids": self.ids,
+                       "documents": self.documents, "metadatas": self.metadatas}, f, ensure_ascii=False)
+        os.replace(tmp_matrix, directory / MATRIX_FILE)
+        os.replace(tmp_meta, directory / META_FILE)
+
+    @classmethod
+    def load(cls, directory, mmap: bool = True) -> Optional["NumpyVectorIndex"]:
+        """Index saved in directory (matrix memory-mapped read-only), or None if missing/corrupt."""
+        directory = Path(directory)
+        try:
+            with open(directory / META_FILE, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            matrix = np.load(directory / MATRIX_FILE, mmap_mode="r" if mmap else None)
+        except (OSError, ValueError):
+            return None
+        if matrix.shape[0] != len(meta["ids"]):
+            return None
+        return cls(matrix, meta["ids"], meta["documents"], meta["metadatas"], meta.get("info"))
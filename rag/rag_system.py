@@ -1,13 +1,24 @@
 import os
+import sys
+import json
 import time
+import hashlib
+import threading
+import numpy as np
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Iterator, Optional
 import chromadb
 from sentence_transformers import SentenceTransformer
-import PyPDF2
-import fitz  # PyMuPDF
-from langchain_text_splitters import CharacterTextSplitter
 from config import settings
+from rag.bm25 import BM25Index, reciprocal_rank_fusion
+from rag.chunking import CHUNKER_VERSION, MarkdownChunker
+from rag.embedding_cache import EmbeddingCache
+from rag.embedding_pipeline import EmbeddingPipeline
+from rag.ingestion import iter_documents, read_document
+from rag.numpy_index import NumpyVectorIndex
+from rag.reranker import CrossEncoderReranker
+from workflows.tracing import get_tracer
+from workflows.admission import get_admission
 
 class RAGSystem:
     """
@@ -22,42 +33,141 @@ class RAGSystem:
         chunk_size: int = 1000,
         chunk_overlap: int = 200,
         db_path: str = None,
-        embedding_model_name: str = None
+        embedding_model_name: str = None,
+        lazy: bool = False
     ):
+        """
+        lazy=True defers loading the embedding model and ChromaDB until
+        start_background_load() or the first call that needs them.
+        """
         # Use config if not provided
         self.knowledge_base_path = Path(knowledge_base_path or settings.KNOWLEDGE_BASE_PATH)
         self.collection_name = collection_name or settings.COLLECTION_NAME
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.chunker = MarkdownChunker(chunk_size, chunk_overlap)
         self.db_path = str(db_path or settings.EMBEDDING_PATH)
         self.embedding_model_name = embedding_model_name or settings.EMBEDDING_MODEL_NAME
+        self.manifest_path = Path(self.db_path) / settings.KB_MANIFEST_NAME
+        self.bm25_path = Path(self.db_path) / settings.BM25_INDEX_NAME
+        self.bm25 = None
+        self._bm25_lock = threading.Lock()
+        self.vector_backend = settings.VECTOR_BACKEND
+        self.numpy_index_dir = Path(self.db_path) / settings.NUMPY_INDEX_DIR_NAME
+        self.numpy_index = None
+        self._numpy_lock = threading.Lock()
+        self.reranker = self._make_reranker() if settings.RERANK_ENABLED else None
 
-        print(f"🔄 Loading embedding model: {self.embedding_model_name}")
-        self.embedding_model = SentenceTransformer(self.embedding_model_name)
-        self.embedding_dimension = len(self.embedding_model.encode(["test"], convert_to_tensor=False)[0])
-        print(f"📏 Model dimension: {self.embedding_dimension}")
+        self.embedding_model = None
+        self.embedding_dimension = None
+        self.embedding_cache = None
+        self.embedding_pipeline = None
+        self.chroma_client = None
+        self.collection = None
 
-        print("🔄 Initializing ChromaDB...")
-        self.chroma_client = chromadb.PersistentClient(path=self.db_path)
-        self.collection = self._get_or_create_collection()
-        print(f"✅ Robust RAG System initialized!")
+        # Readiness: "starting" -> "loading" -> "ready" (or "error")
+        self.status = "starting"
+        self.error = None
+        self.load_seconds = None
+        self._load_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._load_thread = None
+        self._rebuild_listeners = []
+        if not lazy:
+            self.load()
+
+    def load(self) -> None:
+        """Load the embedding model and open the Chroma collection (idempotent, thread-safe)."""
+        with self._load_lock:
+            if self._ready.is_set():
+                return
+            self.status = "loading"
+            start = time.time()
+            try:
+                print("🔄 Initializing ChromaDB...")
+                self.chroma_client = chromadb.PersistentClient(path=self.db_path)
+                print(f"🔄 Loading embedding model: {self.embedding_model_name}")
+                self.embedding_model = SentenceTransformer(self.embedding_model_name)
+                self.embedding_dimension = self._read_collection_dimension() or self.embedding_model.get_sentence_embedding_dimension()
+                print(f"📏 Model dimension: {self.embedding_dimension}")
+                self.embedding_cache = (
+                    EmbeddingCache(settings.EMBEDDING_CACHE_PATH, self.embedding_model_name, settings.EMBEDDING_CACHE_MEMORY_ITEMS)
+                    if settings.EMBEDDING_CACHE_ENABLED else None
+                )
+                self.embedding_pipeline = EmbeddingPipeline(
+                    self.embedding_model,
+                    workers=settings.EMBED_WORKERS,
+                    batch_tokens=settings.EMBED_BATCH_TOKENS,
+                    max_batch_size=settings.EMBED_MAX_BATCH_SIZE,
+                    window_size=settings.EMBED_WINDOW_CHUNKS,
+                    write_batch_size=settings.CHROMA_WRITE_BATCH,
+                    pool_min_texts=settings.EMBED_POOL_MIN_TEXTS,
+                )
+                self.collection = self._get_or_create_collection()
+                if self.reranker is not None:
+                    self.reranker.load()
+            except Exception as e:
+                self.status = "error"
+                self.error = str(e)
+                print(f"❌ RAG System failed to load: {e}")
+                raise
+            self.load_seconds = time.time() - start
+            self.status = "ready"
+            self._ready.set()
+            print(f"✅ Robust RAG System initialized in {self.load_seconds:.2f}s!")
+
+    def start_background_load(self) -> None:
+        """Load the model and collection in a daemon thread (e.g. while the UI starts)."""
+        with self._load_lock:
+            if self._ready.is_set() or self._load_thread is not None:
+                return
+            self._load_thread = threading.Thread(target=self._background_load, name="rag-loader", daemon=True)
+            self._load_thread.start()
+
+    def _background_load(self) -> None:
+        try:
+            self.load()
+        except Exception:
+            pass  # status/error already recorded for health checks
+
+    def ensure_ready(self, timeout: Optional[float] = None) -> None:
+        """Block until loaded; loads synchronously on first use (or retries after a failed background load)."""
+        if self._ready.is_set():
+            return
+        thread = self._load_thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+            if thread.is_alive():
+                raise RuntimeError(f"RAG system not ready (status: {self.status})")
+        if not self._ready.is_set():
+            self.load()
+
+    def readiness(self) -> Dict[str, Any]:
+        return {"status": self.status, "error": self.error, "load_seconds": self.load_seconds}
+
+    def _collection_names(self) -> List[str]:
+        # chromadb >= 0.6 returns names, older versions return Collection objects
+        return [getattr(c, "name", c) for c in self.chroma_client.list_collections()]
+
+    def _read_collection_dimension(self) -> Optional[int]:
+        """Dimension recorded in the collection metadata, if it was built with this model."""
+        if self.collection_name not in self._collection_names():
+            return None
+        meta = self.chroma_client.get_collection(self.collection_name).metadata or {}
+        if meta.get("model_name") == self.embedding_model_name and meta.get("dimension"):
+            return int(meta["dimension"])
+        return None
 
     def _get_or_create_collection(self):
-        """Check if collection exists and is compatible, otherwise recreate."""
+        """Check if collection exists and is compatible (via its metadata), otherwise recreate."""
         try:
-            colls = self.chroma_client.list_collections()
-            col_exists = any(c.name == self.collection_name for c in colls)
-            if col_exists:
+            if self.collection_name in self._collection_names():
                 col = self.chroma_client.get_collection(self.collection_name)
-                if col.count() > 0:
-                    try:
-                        test_vec = self.embedding_model.encode(["test"], convert_to_tensor=False)[0].tolist()
-                        col.query(query_embeddings=[test_vec], n_results=1)
-                        print("✅ Existing collection is compatible.")
-                        return col
-                    except Exception as e:
-                        if "dimension" in str(e).lower():
-                            print(f"⚠️ Dimension mismatch: {e}")
+                meta = col.metadata or {}
+                if meta.get("model_name") == self.embedding_model_name and meta.get("dimension") == self.embedding_dimension:
+                    print("✅ Existing collection is compatible.")
+                    return col
+                print(f"⚠️ Collection mismatch: model={meta.get('model_name')}, dimension={meta.get('dimension')}")
                 print("🗑️ Recreating collection...")
                 self.chroma_client.delete_collection(self.collection_name)
             # Create new collection
@@ -74,84 +184,245 @@ class RAGSystem:
             print(f"❌ Error managing collection: {e}")
             raise
 
-    def build_knowledge_base(self) -> None:
-        """Create knowledge base from source files."""
+    def build_knowledge_base(self) -> Dict[str, Any]:
+        """Create knowledge base from source files. Returns the embedding pipeline stats."""
+        self.ensure_ready()
         print("🚀 Building knowledge base...")
         start = time.time()
         self.clear_database()
-        chunks = self._process_documents()
-        if not chunks:
+        manifest = self._new_manifest()
+        for file_path, _ in self._iter_source_files():
+            manifest["files"][self._manifest_key(str(file_path))] = {"sha256": self._hash_file(file_path), "chunks": {}}
+
+        def record_chunks(chunks):
+            # Fill the manifest while chunks stream through the embedding pipeline
+            for c in chunks:
+                manifest["files"][self._manifest_key(c['metadata']['source'])]["chunks"][c['id']] = self._hash_text(c['text'])
+                yield c
+
+        stats = self._create_and_save_embeddings(record_chunks(self._process_documents()))
+        if not stats["chunks"]:
             print("❌ No documents processed!")
-            return
-        self._create_and_save_embeddings(chunks)
+            return stats
+        self._save_manifest(manifest)
+        self._save_bm25()
+        self._refresh_numpy_index()
         print(f"🎉 Knowledge base built in {time.time() - start:.2f}s!")
         self.show_database_stats()
+        self._notify_rebuild()
+        return stats
 
-    def _process_documents(self) -> List[Dict[str, Any]]:
+    def sync_knowledge_base(self) -> Dict[str, Any]:
+        """
+        Incrementally sync the collection with the knowledge base folder.
+        Only new/changed chunks are embedded; chunks of removed files are deleted.
+        Falls back to a full build if the manifest is missing or was made with another model/chunking.
+        """
+        self.ensure_ready()
+        print("🔄 Syncing knowledge base...")
+        start = time.time()
         if not self.knowledge_base_path.exists():
             print(f"❌ Knowledge base not found: {self.knowledge_base_path}")
-            return []
-        chunks = []
+            return {"mode": "none", "seconds": 0.0}
+        manifest = self._load_manifest()
+        if manifest is None or self.collection.count() == 0:
+            print("⚠️ No compatible manifest found, running full build.")
+            self.build_knowledge_base()
+            return {"mode": "full", "seconds": time.time() - start}
+
+        stats = {"mode": "incremental", "added": 0, "updated": 0, "deleted": 0, "skipped": 0, "files_changed": 0}
+        new_manifest = self._new_manifest()
+        to_embed, to_delete = [], []
+        for file_path, category in self._iter_source_files():
+            key = self._manifest_key(str(file_path))
+            old_entry = manifest["files"].get(key)
+            file_hash = self._hash_file(file_path)
+            if old_entry and old_entry.get("sha256") == file_hash:
+                new_manifest["files"][key] = old_entry
+                stats["skipped"] += len(old_entry["chunks"])
+                continue
+            stats["files_changed"] += 1
+            old_chunks = old_entry["chunks"] if old_entry else {}
+            content = self._read_file_content(file_path)
+            chunks = self._create_chunks_from_text(content, str(file_path), category, file_path.name) if content else []
+            entry = {"sha256": file_hash, "chunks": {}}
+            for c in chunks:
+                chunk_hash = self._hash_text(c['text'])
+                entry["chunks"][c['id']] = chunk_hash
+                if c['id'] not in old_chunks:
+                    stats["added"] += 1
+                    to_embed.append(c)
+                elif old_chunks[c['id']] != chunk_hash:
+                    stats["updated"] += 1
+                    to_embed.append(c)
+                else:
+                    stats["skipped"] += 1
+            to_delete += [cid for cid in old_chunks if cid not in entry["chunks"]]
+            new_manifest["files"][key] = entry
+            print(f"✏️ Changed {file_path.name}: {len(chunks)} chunks")
+        for key, old_entry in manifest["files"].items():
+            if key not in new_manifest["files"]:
+                print(f"🗑️ Removed {key}: {len(old_entry['chunks'])} chunks")
+                to_delete += list(old_entry["chunks"])
+
+        if to_delete:
+            self.collection.delete(ids=to_delete)
+            self._lexical_index().delete(to_delete)
+            stats["deleted"] = len(to_delete)
+        if to_embed:
+            self._create_and_save_embeddings(to_embed)
+        if new_manifest != manifest:
+            self._save_manifest(new_manifest)
+            self._save_bm25()
+            self._refresh_numpy_index()
+            self._notify_rebuild()
+        stats["seconds"] = time.time() - start
+        print(
+            f"🎉 Sync done in {stats['seconds']:.2f}s: {stats['added']} added, {stats['updated']} updated, "
+            f"{stats['deleted']} deleted, {stats['skipped']} skipped ({stats['files_changed']} files changed)"
+        )
+        return stats
+
+    def add_rebuild_listener(self, callback) -> None:
+        """Register callback() to run after the knowledge base content changes (e.g. cache invalidation)."""
+        self._rebuild_listeners.append(callback)
+
+    def _notify_rebuild(self) -> None:
+        for callback in self._rebuild_listeners:
+            try:
+                callback()
+            except Exception as e:
+                print(f"⚠️ Rebuild listener failed: {e}")
+
+    def kb_version(self) -> Optional[int]:
+        """Version stamp of the indexed knowledge base (manifest mtime); changes on every build/sync."""
+        try:
+            return self.manifest_path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    # --- Manifest helpers (per-file and per-chunk content hashes) ---
+
+    def _new_manifest(self) -> Dict[str, Any]:
+        return {
+            "model_name": self.embedding_model_name,
+            "chunker": CHUNKER_VERSION,
+            "chunk_size": self.chunk_size,
+            "chunk_overlap": self.chunk_overlap,
+            "files": {},
+        }
+
+    def _load_manifest(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        expected = self._new_manifest()
+        if any(manifest.get(k) != expected[k] for k in ("model_name", "chunker", "chunk_size", "chunk_overlap")):
+            return None
+        return manifest
+
+    def _save_manifest(self, manifest: Dict[str, Any]) -> None:
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _manifest_key(self, source: str) -> str:
+        return Path(source).relative_to(self.knowledge_base_path).as_posix()
+
+    @staticmethod
+    def _hash_file(file_path: Path) -> str:
+        with open(file_path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    @staticmethod
+    def _hash_text(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _iter_source_files(self):
+        """Yield (file_path, category) for every supported file in the knowledge base."""
         exts = ['.md', '.txt', '.pdf']
         for root, _, files in os.walk(self.knowledge_base_path):
             root_path = Path(root)
             category = root_path.relative_to(self.knowledge_base_path).parts[0] if root_path != self.knowledge_base_path else "root"
-            for file in files:
+            for file in sorted(files):
                 file_path = root_path / file
                 if file_path.suffix.lower() in exts:
-                    content = self._read_file_content(file_path)
-                    if content:
-                        chunks += self._create_chunks_from_text(content, str(file_path), category, file_path.name)
-                        print(f"✅ Processed {file_path.name}: {len(chunks)} chunks (running total)")
-        print(f"📊 Total chunks created: {len(chunks)}")
-        return chunks
-
-    def _create_and_save_embeddings(self, chunks: List[Dict[str, Any]]) -> None:
-        texts = [c['text'] for c in chunks]
-        ids = [c['id'] for c in chunks]
-        metas = [c['metadata'] for c in chunks]
-        print(f"🔮 Generating embeddings for {len(texts)} chunks...")
-        embeddings = self.embedding_model.encode(texts, batch_size=16, show_progress_bar=True, convert_to_tensor=False)
-        assert len(embeddings[0]) == self.embedding_dimension, "Embedding dimension mismatch"
-        print("💾 Saving to ChromaDB...")
-        self.collection.add(
-            embeddings=[e.tolist() if hasattr(e, "tolist") else list(e) for e in embeddings],
-            documents=texts,
-            metadatas=metas,
-            ids=ids
-        )
-        print("✅ Saved to ChromaDB!")
+                    yield file_path, category
+
+    def _process_documents(self) -> Iterator[Dict[str, Any]]:
+        """Yield chunks file by file (nothing is accumulated, so builds stream into the embedder)."""
+        if not self.knowledge_base_path.exists():
+            print(f"❌ Knowledge base not found: {self.knowledge_base_path}")
+            return
+        total = 0
+        # PDFs are extracted in a process pool, text files in a thread pool
+        documents = iter_documents(self._iter_source_files(), settings.INGEST_PDF_WORKERS, settings.INGEST_TEXT_WORKERS)
+        for file_path, category, content in documents:
+            if content:
+                chunks = self._create_chunks_from_text(content, str(file_path), category, file_path.name)
+                total += len(chunks)
+                print(f"✅ Processed {file_path.name}: {len(chunks)} chunks ({total} total)")
+                yield from chunks
+        print(f"📊 Total chunks created: {total}")
+
+    def _create_and_save_embeddings(self, chunks: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """Embed a stream of chunks with the batched pipeline and upsert them in bounded batches."""
+        bm25 = self._lexical_index()
+
+        def write(batch: List[Dict[str, Any]], embeddings) -> None:
+            assert embeddings.shape[1] == self.embedding_dimension, "Embedding dimension mismatch"
+            # upsert so incremental syncs can overwrite changed chunks in place
+            self.collection.upsert(
+                embeddings=embeddings.tolist(),
+                documents=[c['text'] for c in batch],
+                metadatas=[c['metadata'] for c in batch],
+                ids=[c['id'] for c in batch]
+            )
+            bm25.upsert([c['id'] for c in batch], [c['text'] for c in batch], [c['metadata'] for c in batch])
+
+        encode_fn = None
+        if self.embedding_cache is not None:
+            encode_fn = lambda texts: self.embedding_cache.encode(texts, self.embedding_pipeline.encode)
+        print(f"🔮 Generating embeddings (up to {self.embedding_pipeline.workers} worker(s))...")
+        stats = self.embedding_pipeline.run(chunks, write, encode_fn)
+        if self.embedding_cache is not None:
+            cache = self.embedding_cache.stats
+            print(f"🧠 Embedding cache: {cache['memory_hits']} memory / {cache['disk_hits']} disk hits, "
+                  f"{cache['misses']} misses (hit rate {self.embedding_cache.hit_rate():.0%})")
+        print(f"✅ Saved {stats['chunks']} chunks to ChromaDB in {stats['seconds']:.2f}s ({stats['chunks_per_sec']:.1f} chunks/s)")
+        return stats
+
+    def _encode(self, texts: List[str]):
+        """Encode texts through the embedding cache (if enabled); cached vectors assume the default encode options."""
+        # Only model calls (cache misses) take an "embedding" slot (workflows/admission.py)
+        def encode_fn(batch):
+            with get_admission().stage("embedding"):
+                return self.embedding_model.encode(batch, convert_to_tensor=False)
+        if self.embedding_cache is None:
+            with get_tracer().span("rag.encode", texts=len(texts)):
+                return encode_fn(texts)
+        # Per-call hits go to the span (cache metrics / JSONL trace); builds print the totals
+        with get_tracer().span("rag.encode", texts=len(texts)) as span:
+            misses = self.embedding_cache.stats["misses"]
+            vectors = self.embedding_cache.encode(texts, encode_fn)
+            missed = self.embedding_cache.stats["misses"] - misses
+            span.set(cache_hit=missed == 0, cache_misses=missed)
+        return vectors
+
+    def embed(self, texts: List[str]):
+        """Embed texts with the loaded model (through the embedding cache), e.g. for routing."""
+        self.ensure_ready()
+        return self._encode(texts)
 
     def _read_file_content(self, file_path: Path) -> str:
-        try:
-            if file_path.suffix.lower() == '.pdf':
-                try:
-                    with fitz.open(str(file_path)) as doc:
-                        return "".join(page.get_text() for page in doc)
-                except Exception:
-                    with open(file_path, 'rb') as f:
-                        reader = PyPDF2.PdfReader(f)
-                        return "".join(page.extract_text() for page in reader.pages)
-            else:
-                for enc in ['utf-8', 'utf-8-sig', 'cp874', 'latin-1']:
-                    try:
-                        with open(file_path, 'r', encoding=enc) as f:
-                            return f.read()
-                    except Exception:
-                        continue
-        except Exception as e:
-            print(f"❌ Error reading {file_path.name}: {e}")
-        return ""
+        return read_document(str(file_path))
 
     def _create_chunks_from_text(self, text: str, source: str, category: str, filename: str) -> List[Dict[str, Any]]:
-        splitter = CharacterTextSplitter(
-            separator="---",
-            chunk_size=self.chunk_size,
-            chunk_overlap=self.chunk_overlap,
-            length_function=len,
-            is_separator_regex=False,
-        )
-        chunks_text = splitter.split_text(text)
+        """Heading-aware chunks; each carries its section title path in metadata."""
+        pieces = self.chunker.split(text, is_markdown=Path(filename).suffix.lower() == '.md')
         return [
             {
                 'id': f"{category}_{Path(filename).stem}_{i}",
@@ -161,29 +432,209 @@ class RAGSystem:
                     'category': category,
                     'chunk_id': f"{category}_{Path(filename).stem}_{i}",
                     'chunk_number': i,
-                    'filename': filename
+                    'filename': filename,
+                    'section': section
                 }
             }
-            for i, chunk in enumerate(chunks_text)
+            for i, (section, chunk) in enumerate(pieces)
         ]
 
-    def query(self, query_text: str, top_k: int = 5, category_filter: Optional[str] = None) -> str:
-        print(f"🔍 Querying: '{query_text[:50]}...'")
-        query_embedding = self.embedding_model.encode([query_text], convert_to_tensor=False)[0]
-        where_clause = {"category": category_filter} if category_filter else None
-        results = self.collection.query(
-            query_embeddings=[query_embedding.tolist() if hasattr(query_embedding, "tolist") else list(query_embedding)],
-            n_results=top_k,
-            where=where_clause
+    def query(self, query_text: str, top_k: int = 5, category_filter: Optional[str] = None, mode: Optional[str] = None) -> str:
+        """
+        Retrieve top_k chunks as formatted context.
+        mode: "hybrid" (BM25 + vector, reciprocal rank fusion), "vector", or "lexical"
+        (BM25 only: no embedding call, and the model does not need to be loaded). Default: settings.RETRIEVAL_MODE.
+        """
+        return self.query_batch([query_text], top_k, category_filter, mode)[0]["context"]
+
+    def query_batch(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        category_filter: Optional[str] = None,
+        mode: Optional[str] = None,
+        rerank: Optional[bool] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieve for several queries at once: one model forward pass and one vector search for all of them.
+        Returns per query {"query", "ids", "scores", "documents", "metadatas", "context"}; scores are
+        cosine similarities (vector), BM25 scores (lexical), RRF scores (hybrid) or reranker relevance.
+        rerank: rerank RERANK_CANDIDATES candidates with the cross-encoder and keep at most top_k
+        (default: settings.RERANK_ENABLED); adds "rerank" stats (kept chunks, tokens saved) per query.
+        """
+        mode = mode or settings.RETRIEVAL_MODE
+        rerank = self.reranker is not None if rerank is None else rerank
+        if rerank and self.reranker is None:
+            self.reranker = self._make_reranker()
+        print(f"🔍 Querying ({mode}, {len(queries)} queries): '{queries[0][:50] if queries else ''}...'")
+        fetch_k = max(top_k, settings.RERANK_CANDIDATES) if rerank else top_k
+        with get_tracer().span("rag.retrieve", mode=mode, queries=len(queries)):
+            hits_batch = self._retrieve_many(queries, fetch_k, category_filter, mode)
+        rerank_stats = [None] * len(queries)
+        if rerank and queries:
+            with get_admission().stage("embedding"), get_tracer().span("rag.rerank") as span:
+                hits_batch, rerank_stats = self.reranker.rerank_many(queries, hits_batch, top_k)
+                span.set(skipped=rerank_stats[0]["skipped"])
+            if rerank_stats[0]["skipped"]:
+                print(f"⏱️ Reranking skipped (expected over the {self.reranker.latency_budget}s budget)")
+            else:
+                print(f"🎯 Reranked {sum(s['candidates'] for s in rerank_stats)} candidates -> {sum(s['kept'] for s in rerank_stats)} chunks "
+                      f"in {rerank_stats[0]['seconds']:.2f}s, ~{sum(s['tokens_saved'] for s in rerank_stats)} prompt tokens saved")
+        results = []
+        for query_text, hits, stats in zip(queries, hits_batch, rerank_stats):
+            result = {
+                "query": query_text,
+                "ids": [h[0] for h in hits],
+                "scores": [h[3] for h in hits],
+                "documents": [h[1] for h in hits],
+                "metadatas": [h[2] for h in hits],
+                "context": self.format_context([(h[1], h[2]) for h in hits]),
+            }
+            if stats is not None:
+                result["rerank"] = stats
+            results.append(result)
+        return results
+
+    def _make_reranker(self) -> CrossEncoderReranker:
+        return CrossEncoderReranker(
+            settings.RERANK_MODEL_NAME,
+            batch_size=settings.RERANK_BATCH_SIZE,
+            max_length=settings.RERANK_MAX_LENGTH,
+            score_cutoff=settings.RERANK_SCORE_CUTOFF,
+            token_budget=settings.RERANK_TOKEN_BUDGET,
+            latency_budget=settings.RERANK_LATENCY_BUDGET,
         )
-        if not results['documents'][0]:
+
+    def _retrieve_many(self, queries: List[str], top_k: int, category_filter: Optional[str], mode: str) -> List[List[tuple]]:
+        """Per query [(id, document, metadata, score)], best first."""
+        if not queries:
+            return []
+        if mode == "lexical":
+            bm25 = self._lexical_index()
+            with get_tracer().span("rag.lexical_search"):
+                return [self._lexical_rows(bm25, bm25.search(q, top_k, category_filter)) for q in queries]
+        candidates = top_k * settings.HYBRID_CANDIDATES if mode == "hybrid" else top_k
+        dense_batch = self._vector_search_many(queries, candidates, category_filter)
+        if mode != "hybrid":
+            return dense_batch
+        bm25 = self._lexical_index()
+        with get_tracer().span("rag.lexical_search"):
+            lexical_batch = [self._lexical_rows(bm25, bm25.search(q, candidates, category_filter)) for q in queries]
+        fused_batch = []
+        for dense, lexical in zip(dense_batch, lexical_batch):
+            docs = {row[0]: row for row in lexical}
+            docs.update({row[0]: row for row in dense})
+            fused = reciprocal_rank_fusion([[row[0] for row in dense], [row[0] for row in lexical]], k=settings.RRF_K)
+            fused_batch.append([docs[doc_id][:3] + (score,) for doc_id, score in fused[:top_k]])
+        return fused_batch
+
+    @staticmethod
+    def _lexical_rows(bm25: BM25Index, hits: List[tuple]) -> List[tuple]:
+        rows = []
+        for doc_id, score in hits:
+            doc = bm25.get(doc_id)
+            rows.append((doc_id, doc["text"], doc["metadata"], score))
+        return rows
+
+    def _vector_search_many(self, queries: List[str], n_results: int, category_filter: Optional[str] = None) -> List[List[tuple]]:
+        """Per query [(id, document, metadata, cosine similarity)] from Chroma or the NumPy index."""
+        self.ensure_ready()
+        query_embeddings = self._encode(queries)
+        if self.vector_backend == "numpy":
+            index = self._vector_index()
+            with get_tracer().span("rag.vector_search", backend="numpy"):
+                return [
+                    [row + (score,) for row, (_, score) in zip(index.rows(hits), hits)]
+                    for hits in index.search(query_embeddings, n_results, category_filter)
+                ]
+        where_clause = {"category": category_filter} if category_filter else None
+        with get_tracer().span("rag.vector_search", backend="chroma"):
+            results = self.collection.query(
+                query_embeddings=[e.tolist() if hasattr(e, "tolist") else list(e) for e in query_embeddings],
+                n_results=n_results,
+                where=where_clause
+            )
+        # Cosine space: distance = 1 - similarity
+        return [
+            [(doc_id, doc, meta, 1.0 - dist) for doc_id, doc, meta, dist in zip(ids, docs, metas, dists)]
+            for ids, docs, metas, dists in zip(results['ids'], results['documents'], results['metadatas'], results['distances'])
+        ]
+
+    @staticmethod
+    def format_context(results: List[tuple]) -> str:
+        """Numbered context blocks for the LLM prompt from [(document, metadata)]."""
+        if not results:
             return "No relevant information found."
         return "\n---\n".join(
-            f"[Context {i+1}]\nSource: {m['filename']} (Category: {m['category']})\nContent: {doc.strip()}\n"
-            for i, (doc, m) in enumerate(zip(results['documents'][0], results['metadatas'][0]))
+            f"[Context {i+1}]\nSource: {m['filename']}{' › ' + m['section'] if m.get('section') else ''} (Category: {m['category']})\nContent: {doc.strip()}\n"
+            for i, (doc, m) in enumerate(results)
         )
 
+    # --- Lexical (BM25) index, persisted next to the Chroma collection ---
+
+    def _lexical_index(self) -> BM25Index:
+        """BM25 index: loaded from disk without the embedding model, or rebuilt from the collection."""
+        if self.bm25 is not None:
+            return self.bm25
+        with self._bm25_lock:
+            if self.bm25 is None:
+                # Checked against its own chunking stamp, so a restart never needs the embedding model
+                index = BM25Index.load(self.bm25_path, self._bm25_info())
+                if index is None:
+                    self.ensure_ready()
+                    print("🔤 Building BM25 index from the collection...")
+                    index = BM25Index()
+                    data = self.collection.get(include=["documents", "metadatas"])
+                    index.upsert(data['ids'], data['documents'], data['metadatas'])
+                    self.bm25 = index
+                    self._save_bm25()
+                print(f"🔤 BM25 index ready: {len(index)} chunks")
+                self.bm25 = index
+        return self.bm25
+
+    def _bm25_info(self) -> Dict[str, Any]:
+        """Stamp saved with the BM25 index: it is only reused for the same collection and chunking."""
+        return {"collection": self.collection_name, "chunker": CHUNKER_VERSION,
+                "chunk_size": self.chunk_size, "chunk_overlap": self.chunk_overlap}
+
+    def _save_bm25(self) -> None:
+        if self.bm25 is not None:
+            self.bm25.save(self.bm25_path, self._bm25_info())
+
+    # --- NumPy vector index (VECTOR_BACKEND = "numpy"), a memory-mapped copy of the collection ---
+
+    def _vector_index(self) -> NumpyVectorIndex:
+        """Memory-mapped index; reloaded when another process rebuilt it, rebuilt if missing or stale."""
+        version = self.kb_version()
+        index = self.numpy_index
+        if index is not None and index.info.get("kb_version") == version:
+            return index
+        with self._numpy_lock:
+            index = NumpyVectorIndex.load(self.numpy_index_dir)
+            stale = index is None or index.matrix.dtype != np.dtype(settings.NUMPY_INDEX_DTYPE) or \
+                index.info.get("kb_version") != version or index.info.get("model_name") != self.embedding_model_name
+            if stale:
+                index = self._refresh_numpy_index(force=True)
+            self.numpy_index = index
+        return index
+
+    def _refresh_numpy_index(self, force: bool = False) -> Optional[NumpyVectorIndex]:
+        """Copy every embedding from the collection into the NumPy index (after builds/syncs)."""
+        if self.vector_backend != "numpy" and not force:
+            return None
+        start = time.time()
+        data = self.collection.get(include=["embeddings", "documents", "metadatas"])
+        embeddings = data['embeddings'] if len(data['ids']) else np.zeros((0, self.embedding_dimension))
+        info = {"kb_version": self.kb_version(), "model_name": self.embedding_model_name}
+        NumpyVectorIndex.from_embeddings(
+            embeddings, data['ids'], data['documents'], data['metadatas'], settings.NUMPY_INDEX_DTYPE, info
+        ).save(self.numpy_index_dir)
+        self.numpy_index = NumpyVectorIndex.load(self.numpy_index_dir)
+        print(f"🧮 NumPy vector index: {len(self.numpy_index)} chunks ({settings.NUMPY_INDEX_DTYPE}) in {time.time() - start:.2f}s")
+        return self.numpy_index
+
     def show_database_stats(self) -> None:
+        self.ensure_ready()
         try:
             count = self.collection.count()
             meta = self.collection.metadata
@@ -201,14 +652,19 @@ class RAGSystem:
             print(f"❌ Error getting stats: {e}")
 
     def clear_database(self) -> None:
+        self.ensure_ready()
         print("🗑️ Clearing database...")
         try:
             self.chroma_client.delete_collection(self.collection_name)
             self.collection = self._get_or_create_collection()
+            self.bm25 = BM25Index()
             print("✅ Database cleared!")
         except Exception as e:
             print(f"❌ Error clearing database: {e}")
 
 if __name__ == "__main__":
     rag = RAGSystem()  # Uses config.settings by default
-    rag.build_knowledge_base()
\ No newline at end of file
+    if "--sync" in sys.argv:
+        rag.sync_knowledge_base()
+    else:
+        rag.build_knowledge_base()
\ No newline at end of file
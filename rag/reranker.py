@@ -0,0 +1,117 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sentence_transformers import CrossEncoder
+
+from rag.embedding_pipeline import estimate_tokens
+
+# Cross-encoder reranking of retrieved chunks before they go into the LLM prompt.
+# Retrieval returns a wide candidate set; a small local cross-encoder scores each
+# (query, chunk) pair on CPU and only the chunks above a score cutoff that fit a token
+# budget are kept. Scoring time per pair is tracked, and a batch that is expected to take
+# longer than the latency budget is not reranked (retrieval order is used instead).
+
+PROBE_EVERY = 20  # after this many skipped batches, rerank anyway to refresh the estimate
+
+class CrossEncoderReranker:
+    def __init__(
+        self,
+        model_name: str,
+        batch_size: int = 16,
+        max_length: int = 512,
+        score_cutoff: float = 0.1,
+        token_budget: Optional[int] = 1200,
+        min_keep: int = 1,
+        latency_budget: Optional[float] = 0.3,
+    ):
+        """
+        score_cutoff: minimum relevance (0-1) to keep a chunk; the best min_keep chunks are always kept.
+        token_budget: maximum estimated prompt tokens of the kept chunks (None = unlimited).
+        latency_budget: seconds; skip reranking when the expected scoring time is higher (None = always rerank).
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.score_cutoff = score_cutoff
+        self.token_budget = token_budget
+        self.min_keep = min_keep
+        self.latency_budget = latency_budget
+        self.model = None
+        self.seconds_per_pair = None  # moving average of measured scoring time
+        self._skips = 0
+        self._lock = threading.Lock()
+        self.stats = {"reranked": 0, "skipped": 0, "tokens_saved": 0}
+
+    def load(self) -> None:
+        with self._lock:
+            if self.model is None:
+                print(f"🔄 Loading reranker: {self.model_name}")
+                self.model = CrossEncoder(self.model_name, max_length=self.max_length, device="cpu")
+
+    def expected_seconds(self, pairs: int) -> Optional[float]:
+        return None if self.seconds_per_pair is None else self.seconds_per_pair * pairs
+
+    def should_skip(self, pairs: int) -> bool:
+        expected = self.expected_seconds(pairs)
+        if self.latency_budget is None or expected is None or expected <= self.latency_budget:
+            return False
+        self._skips += 1
+        if self._skips >= PROBE_EVERY:
+            self._skips = 0
+            return False
+        return True
+
+    def score(self, pairs: Sequence[Tuple[str, str]]) -> np.ndarray:
+        """Relevance in [0, 1] for (query, document) pairs, scored in batches."""
+        self.load()
+        start = time.perf_counter()
+        scores = np.asarray(self.model.predict(list(pairs), batch_size=self.batch_size, show_progress_bar=False), dtype=np.float32)
+        per_pair = (time.perf_counter() - start) / max(1, len(pairs))
+        self.seconds_per_pair = per_pair if self.seconds_per_pair is None else 0.8 * self.seconds_per_pair + 0.2 * per_pair
+        if scores.size and (scores.min() < 0 or scores.max() > 1):
+            scores = 1 / (1 + np.exp(-scores))  # models that return logits
+        return scores
+
+    def select(self, rows: List[tuple], scores: Sequence[float], top_k: int) -> List[tuple]:
+        """Best rows by score: at most top_k, above the cutoff and within the token budget."""
+        ranked = sorted(zip(rows, scores), key=lambda rs: rs[1], reverse=True)
+        kept, tokens = [], 0
+        for row, score in ranked[:top_k]:
+            cost = estimate_tokens(row[1])
+            if len(kept) >= self.min_keep:
+                if score < self.score_cutoff or (self.token_budget is not None and tokens + cost > self.token_budget):
+                    break
+            kept.append(row[:3] + (float(score),))
+            tokens += cost
+        return kept
+
+    def rerank_many(self, queries: List[str], candidates: List[List[tuple]], top_k: int) -> Tuple[List[List[tuple]], List[Dict[str, Any]]]:
+        """
+        Rerank per-query candidate rows [(id, document, metadata, score)] with one batched scoring call.
+        Returns (kept rows per query, stats per query); the baseline for tokens_saved is the
+        first top_k candidates in retrieval order.
+        """
+        pairs = [(q, row[1]) for q, rows in zip(queries, candidates) for row in rows]
+        baseline = [sum(estimate_tokens(row[1]) for row in rows[:top_k]) for rows in candidates]
+        if not pairs or self.should_skip(len(pairs)):
+            self.stats["skipped"] += 1
+            stats = [{"skipped": True, "candidates": len(rows), "kept": min(top_k, len(rows)), "tokens": b, "tokens_saved": 0}
+                     for rows, b in zip(candidates, baseline)]
+            return [rows[:top_k] for rows in candidates], stats
+
+        start = time.perf_counter()
+        scores = self.score(pairs)
+        seconds = time.perf_counter() - start
+        kept_all, stats, offset = [], [], 0
+        for rows, base in zip(candidates, baseline):
+            kept = self.select(rows, scores[offset:offset + len(rows)], top_k)
+            offset += len(rows)
+            tokens = sum(estimate_tokens(row[1]) for row in kept)
+            kept_all.append(kept)
+            stats.append({"skipped": False, "candidates": len(rows), "kept": len(kept), "tokens": tokens,
+                          "tokens_saved": max(0, base - tokens), "seconds": seconds})
+        self.stats["reranked"] += 1
+        self.stats["tokens_saved"] += sum(s["tokens_saved"] for s in stats)
+        return kept_all, stats
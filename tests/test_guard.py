@@ -0,0 +1,37 @@
+import sqlite3
+
+import pytest
+
+from database.guard import QueryGuardError, full_scans, guarded_query
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(
+        "CREATE TABLE orders (order_id INTEGER PRIMARY KEY, customer_id INTEGER, total_amount REAL);"
+        "CREATE TABLE customer (customer_id INTEGER PRIMARY KEY, first_name TEXT);"
+        "INSERT INTO customer VALUES (1, 'Ann');"
+        "INSERT INTO orders VALUES (5000, 1, 120.0);"
+    )
+    yield conn
+    conn.close()
+
+def test_aliased_join_is_sized_by_table_name(conn):
+    sql = "SELECT * FROM orders o JOIN customer c ON c.customer_id = o.customer_id"
+    assert full_scans(conn, sql) == [("orders", 5000)]
+    with pytest.raises(QueryGuardError) as e:
+        guarded_query(conn, sql, max_scan_rows=100)
+    assert e.value.stats["guard"] == "full_scan"
+
+def test_constant_select_has_no_scans(conn, capsys):
+    df, stats = guarded_query(conn, "SELECT 1 AS one", max_scan_rows=0)
+    assert df["one"].tolist() == [1]
+    assert stats["scanned_tables"] == []
+    assert capsys.readouterr().out == ""
+
+def test_cte_counts_only_the_underlying_table(conn, capsys):
+    sql = "WITH totals AS (SELECT customer_id, SUM(total_amount) AS spent FROM orders GROUP BY customer_id) SELECT * FROM totals"
+    df, stats = guarded_query(conn, sql)
+    assert stats["scanned_tables"] == ["orders"]
+    assert df["spent"].tolist() == [120.0]
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from database.sql_cache import SQLPlanCache
+
+SCHEMA = "orders(order_id, order_datetime, total_amount)"
+OCT_5 = datetime(2026, 10, 5, 9, 0, 0)
+NOV_5 = datetime(2026, 11, 5, 9, 0, 0)
+
+def as_of(now: datetime, message: str) -> str:
+    return f"As of {now:%Y-%m-%d %H:%M:%S}\n{message}"
+
+def test_absolute_date_is_not_replayed_in_a_later_month():
+    cache = SQLPlanCache()
+    sql = "SELECT SUM(total_amount) FROM orders WHERE date(order_datetime) = '2026-10-05'"
+    cache.put(as_of(OCT_5, "Sales on October 5"), SCHEMA, sql, now=OCT_5)
+    replayed = cache.get(as_of(NOV_5, "Sales on October 5"), SCHEMA, now=NOV_5)
+    assert replayed is None or "2026-10-05" in replayed
+
+def test_relative_month_is_rendered_for_the_current_month():
+    cache = SQLPlanCache()
+    sql = ("SELECT SUM(total_amount) FROM orders "
+           "WHERE order_datetime >= '2026-10-01' AND order_datetime < '2026-11-01'")
+    assert cache.put(as_of(OCT_5, "Sales this month"), SCHEMA, sql, now=OCT_5)
+    replayed = cache.get(as_of(NOV_5, "Sales this month"), SCHEMA, now=NOV_5)
+    assert replayed == ("SELECT SUM(total_amount) FROM orders "
+                        "WHERE order_datetime >= '2026-11-01' AND order_datetime < '2026-12-01'")
+
+def test_relative_day_is_rendered_for_the_current_day():
+    cache = SQLPlanCache()
+    sql = "SELECT COUNT(*) FROM orders WHERE date(order_datetime) = '2026-10-05'"
+    assert cache.put(as_of(OCT_5, "How many orders today?"), SCHEMA, sql, now=OCT_5)
+    replayed = cache.get(as_of(NOV_5, "How many orders today?"), SCHEMA, now=NOV_5)
+    assert replayed == "SELECT COUNT(*) FROM orders WHERE date(order_datetime) = '2026-11-05'"
@@ -4,11 +4,13 @@ from pathlib import Path
 
 # UI function: only handles UI, not workflow logic
 
-def create_app(chat_fn, clear_fn):
+def create_app(chat_fn, clear_fn, concurrency_limit="default"):
     """
     Create the Gradio UI for SupportFlowX.
-    chat_fn: function to handle chat (inputs: user_message, history, api_key)
+    chat_fn: function to handle chat (inputs: user_message, history, api_key);
+             may be an async generator yielding (history, logs) to stream replies
     clear_fn: function to clear chat (no inputs)
+    concurrency_limit: chat events Gradio runs at once ("default" = the queue default, None = unlimited)
     Returns: gr.Blocks object
     """
     base_dir = Path(__file__).parent.parent
@@ -114,7 +116,9 @@ def create_app(chat_fn, clear_fn):
         send_btn.click(
             fn=chat_fn,
             inputs=[msg, chatbot, api_key_box],
-            outputs=[chatbot, logbox]
+            outputs=[chatbot, logbox],
+            concurrency_limit=concurrency_limit,
+            concurrency_id="chat"
         ).then(
             fn=lambda: "",
             outputs=[msg]
@@ -122,7 +126,9 @@ def create_app(chat_fn, clear_fn):
         msg.submit(
             fn=chat_fn,
             inputs=[msg, chatbot, api_key_box],
-            outputs=[chatbot, logbox]
+            outputs=[chatbot, logbox],
+            concurrency_limit=concurrency_limit,
+            concurrency_id="chat"
         ).then(
             fn=lambda: "",
             outputs=[msg]
@@ -0,0 +1,331 @@
+import asyncio
+import contextlib
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Optional
+
+from config import settings
+from workflows.session_cache import hash_api_key
+from workflows.tracing import Histogram, histogram_lines
+
+# Admission control in front of the workflow (main.chat / main.achat).
+# - Turns: at most max_active run at once; up to max_queue more wait FIFO (achat reports the
+#   queue position to the UI); beyond that, or after queue_timeout, the turn is shed with a
+#   friendly message. Each API key also has a token bucket (key_rate turns/s, key_burst).
+# - Stages: shared resources have their own limits, held around the call by the agents and
+#   RAGSystem: "embedding" (bge-m3 / cross-encoder on the CPU), "sqlite" and "llm" (Gemini).
+#   stage() is for sync code (worker threads), astage() for coroutines (never blocks the loop).
+# Queue depth, active turns, waits and shed counts are exported with the tracing metrics.
+
+POLL_MIN = 0.002  # seconds; async waiters poll with exponential backoff up to POLL_MAX
+POLL_MAX = 0.05
+
+MESSAGES = {
+    "queue_full": "☕ We're serving a lot of guests right now. Please try again in a minute.",
+    "timeout": "☕ Sorry, the wait is longer than usual. Please try again in a minute.",
+    "rate_limited": "⏳ You're sending messages a little fast. Please wait {seconds:.0f}s and try again.",
+}
+
+class AdmissionRejected(Exception):
+    """The turn was shed; str(exc) is the message for the user, reason is the metric label."""
+    def __init__(self, reason: str, **fields):
+        super().__init__(MESSAGES[reason].format(**fields))
+        self.reason = reason
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """0.0 if a token was taken, else seconds until the next one."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+class StageGate:
+    def __init__(self, name: str, limit: int, buckets):
+        self.name = name
+        self.limit = limit
+        self._sem = threading.Semaphore(limit)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+        self.wait = Histogram(buckets)
+
+    def _enter(self, waited: float) -> None:
+        with self._lock:
+            self.in_flight += 1
+            self.wait.observe(waited)
+
+    def _exit(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        self._sem.release()
+
+    @contextlib.contextmanager
+    def hold(self):
+        start = time.perf_counter()
+        if not self._sem.acquire(blocking=False):
+            with self._lock:
+                self.waiting += 1
+            try:
+                self._sem.acquire()
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+        self._enter(time.perf_counter() - start)
+        try:
+            yield
+        finally:
+            self._exit()
+
+    @contextlib.asynccontextmanager
+    async def ahold(self):
+        start, delay = time.perf_counter(), POLL_MIN
+        if not self._sem.acquire(blocking=False):
+            with self._lock:
+                self.waiting += 1
+            try:
+                # Polling keeps the event loop free and leaves nothing to clean up on cancellation
+                while not self._sem.acquire(blocking=False):
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, POLL_MAX)
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+        self._enter(time.perf_counter() - start)
+        try:
+            yield
+        finally:
+            self._exit()
+
+class Ticket:
+    """A turn's place in the queue; always release() it (also when the turn is abandoned)."""
+    def __init__(self, controller: "AdmissionController", admitted: bool = False):
+        self.controller = controller
+        self.enqueued = time.monotonic()
+        self.deadline = self.enqueued + controller.queue_timeout
+        self.admitted = admitted
+        self.released = False
+
+    def position(self) -> int:
+        """1-based place in the queue (0 once admitted)."""
+        return self.controller._position(self)
+
+    def wait(self) -> None:
+        """Block until admitted; raises AdmissionRejected("timeout") after queue_timeout."""
+        if not self.controller._wait(self):
+            raise AdmissionRejected("timeout")
+
+    async def positions(self, every: float = 1.0) -> AsyncIterator[int]:
+        """Yield the queue position about every `every` seconds until admitted (nothing if admitted at once)."""
+        delay, last_report = POLL_MIN, None
+        while not self.controller._try_admit(self):
+            now = time.monotonic()
+            if now >= self.deadline:
+                self.controller._abandon(self, "timeout")
+                raise AdmissionRejected("timeout")
+            if last_report is None or now - last_report >= every:
+                last_report = now
+                yield self.position()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, POLL_MAX)
+
+    def release(self) -> None:
+        self.controller._release(self)
+
+class AdmissionController:
+    def __init__(
+        self,
+        enabled: bool = True,
+        max_active: int = 8,
+        max_queue: int = 32,
+        queue_timeout: float = 60.0,
+        key_rate: Optional[float] = None,
+        key_burst: int = 5,
+        stage_limits: Optional[Dict[str, int]] = None,
+        buckets=(0.01, 0.1, 1.0, 10.0),
+        max_keys: int = 10_000,
+    ):
+        """
+        enabled: False admits every turn at once and makes stage() a no-op.
+        max_active: turns running the workflow at the same time.
+        max_queue: turns allowed to wait for a slot; more are shed ("queue_full").
+        queue_timeout: seconds a turn may wait before it is shed ("timeout").
+        key_rate / key_burst: token bucket per API key (turns/s, bucket size); None = no limit.
+        stage_limits: {"embedding": n, "sqlite": n, "llm": n}; unknown stages are not limited.
+        """
+        self.enabled = enabled
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.key_rate = key_rate
+        self.key_burst = key_burst
+        self.max_keys = max_keys
+        self.gates = {name: StageGate(name, limit, buckets) for name, limit in (stage_limits or {}).items()}
+        self._cond = threading.Condition()
+        self._queue: deque = deque()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self.active = 0
+        self.queue_wait = Histogram(buckets)
+        self.metrics = {"admitted": 0, "queue_full": 0, "timeout": 0, "rate_limited": 0, "abandoned": 0}
+
+    # --- Turns ---
+
+    def enqueue(self, api_key: str) -> Ticket:
+        """Take a place in the queue; raises AdmissionRejected when rate limited or the queue is full."""
+        if not self.enabled:
+            return Ticket(self, admitted=True)
+        now = time.monotonic()
+        with self._cond:
+            # Capacity first: a turn shed as "queue_full" must not spend the caller's rate-limit token
+            if len(self._queue) >= self.max_queue and self.active >= self.max_active:
+                self.metrics["queue_full"] += 1
+                raise AdmissionRejected("queue_full")
+            if self.key_rate:
+                retry_after = self._bucket(hash_api_key(api_key or ""), now).take(now)
+                if retry_after:
+                    self.metrics["rate_limited"] += 1
+                    raise AdmissionRejected("rate_limited", seconds=max(1.0, retry_after))
+            ticket = Ticket(self)
+            self._queue.append(ticket)
+            self._admit_locked(ticket)
+            return ticket
+
+    def _bucket(self, key: str, now: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                # Drop buckets that have refilled completely; they carry no state
+                full = [k for k, b in self._buckets.items() if b.tokens + (now - b.updated) * b.rate >= b.burst]
+                for k in full:
+                    del self._buckets[k]
+            bucket = self._buckets[key] = TokenBucket(self.key_rate, self.key_burst, now)
+        return bucket
+
+    def _admit_locked(self, ticket: Ticket) -> bool:
+        if ticket.admitted:
+            return True
+        if self._queue and self._queue[0] is ticket and self.active < self.max_active:
+            self._queue.popleft()
+            self.active += 1
+            ticket.admitted = True
+            self.metrics["admitted"] += 1
+            self.queue_wait.observe(time.monotonic() - ticket.enqueued)
+            self._cond.notify_all()  # the next ticket may fit as well
+        return ticket.admitted
+
+    def _try_admit(self, ticket: Ticket) -> bool:
+        with self._cond:
+            return self._admit_locked(ticket)
+
+    def _wait(self, ticket: Ticket) -> bool:
+        with self._cond:
+            while not self._admit_locked(ticket):
+                remaining = ticket.deadline - time.monotonic()
+                if remaining <= 0:
+                    self._abandon_locked(ticket, "timeout")
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def _position(self, ticket: Ticket) -> int:
+        with self._cond:
+            if ticket.admitted:
+                return 0
+            try:
+                return self._queue.index(ticket) + 1
+            except ValueError:
+                return 0
+
+    def _abandon(self, ticket: Ticket, reason: str) -> None:
+        with self._cond:
+            self._abandon_locked(ticket, reason)
+
+    def _abandon_locked(self, ticket: Ticket, reason: str) -> None:
+        if ticket in self._queue:
+            self._queue.remove(ticket)
+            self.metrics[reason] += 1
+            self._cond.notify_all()
+
+    def _release(self, ticket: Ticket) -> None:
+        if not self.enabled or ticket.released:
+            return
+        with self._cond:
+            ticket.released = True
+            if ticket.admitted:
+                self.active -= 1
+                self._cond.notify_all()
+            else:
+                self._abandon_locked(ticket, "abandoned")
+
+    # --- Stages ---
+
+    def stage(self, name: str):
+        """Context manager holding one slot of the named stage (sync code)."""
+        gate = self.gates.get(name) if self.enabled else None
+        return gate.hold() if gate is not None else contextlib.nullcontext()
+
+    def astage(self, name: str):
+        """Async context manager holding one slot of the named stage (coroutines)."""
+        gate = self.gates.get(name) if self.enabled else None
+        return gate.ahold() if gate is not None else contextlib.nullcontext()
+
+    # --- Metrics ---
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = {**self.metrics, "active": self.active, "queued": len(self._queue),
+                     "queue_wait_mean": self.queue_wait.sum / self.queue_wait.count if self.queue_wait.count else 0.0,
+                     "queue_wait_p95": self.queue_wait.quantile(0.95)}
+        stats["stages"] = {name: {"limit": g.limit, "in_flight": g.in_flight, "waiting": g.waiting,
+                                  "wait_mean": g.wait.sum / g.wait.count if g.wait.count else 0.0}
+                           for name, g in self.gates.items()}
+        return stats
+
+    def prometheus(self, prefix: str = "cafeagentx") -> str:
+        p = prefix
+        with self._cond:
+            lines = [
+                f"# HELP {p}_queue_depth Turns waiting for a workflow slot.", f"# TYPE {p}_queue_depth gauge",
+                f"{p}_queue_depth {len(self._queue)}",
+                f"# HELP {p}_active_turns Turns running the workflow.", f"# TYPE {p}_active_turns gauge",
+                f"{p}_active_turns {self.active}",
+                f"# HELP {p}_admission_total Turns admitted or shed, by outcome.", f"# TYPE {p}_admission_total counter",
+            ]
+            lines += [f'{p}_admission_total{{outcome="{k}"}} {v}' for k, v in self.metrics.items()]
+            lines += histogram_lines(f"{p}_queue_wait_seconds", "Time turns waited in the admission queue.", {"": self.queue_wait})
+        lines += [f"# HELP {p}_stage_in_flight Calls holding a stage slot.", f"# TYPE {p}_stage_in_flight gauge"]
+        lines += [f'{p}_stage_in_flight{{stage="{n}"}} {g.in_flight}' for n, g in self.gates.items()]
+        lines += [f"# HELP {p}_stage_waiting Calls waiting for a stage slot.", f"# TYPE {p}_stage_waiting gauge"]
+        lines += [f'{p}_stage_waiting{{stage="{n}"}} {g.waiting}' for n, g in self.gates.items()]
+        lines += histogram_lines(f"{p}_stage_wait_seconds", "Time calls waited for a stage slot.", {n: g.wait for n, g in self.gates.items()})
+        return "\n".join(lines) + "\n"
+
+_controller: Optional[AdmissionController] = None
+_controller_lock = threading.Lock()
+
+def get_admission() -> AdmissionController:
+    """Process-wide admission controller configured from settings."""
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdmissionController(
+                    enabled=settings.ADMISSION_ENABLED,
+                    max_active=settings.ADMISSION_MAX_ACTIVE,
+                    max_queue=settings.ADMISSION_MAX_QUEUE,
+                    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+                    key_rate=settings.ADMISSION_KEY_RATE_PER_MIN / 60 if settings.ADMISSION_KEY_RATE_PER_MIN else None,
+                    key_burst=settings.ADMISSION_KEY_BURST,
+                    stage_limits=settings.STAGE_LIMITS,
+                    buckets=settings.TRACE_BUCKETS,
+                )
+    return _controller
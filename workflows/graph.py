@@ -14,7 +14,9 @@ def build_workflow(intake_node, landscape_cafe_bot, coffee_db_agent, aggregator_
     graph.add_node("intake_agent", intake_node)
     graph.add_node("landscape_cafe_bot", landscape_cafe_bot)
     graph.add_node("coffee_db_agent", coffee_db_agent)
-    graph.add_node("aggregator", aggregator_node)
+    # defer=True: the aggregator waits until every branch of the fan-out has finished,
+    # so it runs exactly once per turn (specialists themselves run concurrently)
+    graph.add_node("aggregator", aggregator_node, defer=True)
     # Add extra agent nodes dynamically (for extensibility)
     for agent_name, agent_fn in extra_agents.items():
         graph.add_node(agent_name, agent_fn)
@@ -0,0 +1,89 @@
+import re
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Local fast-path router in front of the intake LLM.
+# Scores a message against labeled example utterances with the already-loaded
+# embedding model and only answers when it is confident; otherwise returns None
+# so the IntakeAgent falls back to the full Gemini structured-output call.
+# The route passes the message through as the command, so on later turns only messages that
+# stand on their own are pre-routed; follow-ups ("How much is it?", "and tomorrow?") need the
+# LLM intake to rewrite them with the chat history.
+
+FOLLOW_UP = re.compile(
+    r"^\s*(?:and|or|but|also|then|so|what about|how about)\b|\b(?:it|its|that|those|them|they|same|else|instead)\b",
+    re.IGNORECASE,
+)
+
+def is_standalone(message: str) -> bool:
+    """
+    False for messages that read as a follow-up (pronouns, leading "and", very short).
+    Thai drops the subject ("ราคาเท่าไหร่" = "how much is it?"), so non-ASCII text never counts.
+    """
+    text = message.strip()
+    if not text.isascii() or len(text.split()) < 3:
+        return False
+    return not FOLLOW_UP.search(text)
+
+class PreRouter:
+    def __init__(self, embedder, examples: Dict[str, List[str]], threshold: float = 0.72, margin: float = 0.06, top_k: int = 3):
+        """
+        embedder: object with embed(texts) -> 2D array (e.g. RAGSystem); an optional
+                  `status` attribute other than "ready" makes the router abstain instead of blocking.
+        examples: agent name -> list of example user messages.
+        threshold: minimum similarity score for the best agent.
+        margin: minimum gap between the best and second-best agent scores.
+        top_k: score of an agent = mean of its top_k most similar examples.
+        """
+        self.embedder = embedder
+        self.examples = examples
+        self.threshold = threshold
+        self.margin = margin
+        self.top_k = top_k
+        self._labels = None
+        self._matrix = None
+        self._lock = threading.Lock()
+        self.stats = {"routed": 0, "fallback": 0, "skipped": 0}
+
+    def _normalize(self, vectors) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _ensure_index(self) -> None:
+        with self._lock:
+            if self._matrix is not None:
+                return
+            labels, texts = [], []
+            for agent, utterances in self.examples.items():
+                labels += [agent] * len(utterances)
+                texts += utterances
+            self._matrix = self._normalize(self.embedder.embed(texts))
+            self._labels = np.array(labels)
+
+    def score(self, message: str) -> Dict[str, float]:
+        """Per-agent similarity scores for a message."""
+        self._ensure_index()
+        query = self._normalize(self.embedder.embed([message]))[0]
+        sims = self._matrix @ query
+        scores = {}
+        for agent in self.examples:
+            agent_sims = np.sort(sims[self._labels == agent])[::-1][:self.top_k]
+            scores[agent] = float(agent_sims.mean()) if len(agent_sims) else 0.0
+        return scores
+
+    def route(self, message: str) -> Optional[Dict[str, float]]:
+        """Return {"agent", "score", "margin"} for a confident route, or None to fall back to the LLM."""
+        if not message.strip() or getattr(self.embedder, "status", "ready") != "ready":
+            self.stats["skipped"] += 1
+            return None
+        ranked = sorted(self.score(message).items(), key=lambda kv: kv[1], reverse=True)
+        best_agent, best = ranked[0]
+        second = ranked[1][1] if len(ranked) > 1 else 0.0
+        if best >= self.threshold and best - second >= self.margin:
+            self.stats["routed"] += 1
+            return {"agent": best_agent, "score": best, "margin": best - second}
+        self.stats["fallback"] += 1
+        return None
@@ -0,0 +1,128 @@
+import re
+import threading
+import time
+import unicodedata
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+# Semantic cache of full question -> answer turns, consulted before running the workflow.
+# Answers from knowledge-base agents live until the knowledge base changes; answers that
+# touched live data (coffee_db_agent) only live for a short TTL.
+
+LIVE_DATA_AGENTS = {"coffee_db_agent"}
+
+def normalize_question(text: str) -> str:
+    text = unicodedata.normalize("NFC", text).lower()
+    text = " ".join(text.split())
+    return re.sub(r"[\s?!.。,]+$", "", text)
+
+class SemanticResponseCache:
+    def __init__(
+        self,
+        embedder,
+        threshold: float = 0.95,
+        max_entries: int = 512,
+        live_data_ttl: float = 120.0,
+        version_fn: Optional[Callable[[], Any]] = None,
+    ):
+        """
+        embedder: object with embed(texts) -> 2D array (e.g. RAGSystem); an optional
+                  `status` attribute other than "ready" disables lookups instead of blocking.
+        threshold: minimum cosine similarity to reuse a previous answer.
+        max_entries: size bound; least-recently-used entries are evicted first.
+        live_data_ttl: seconds an answer that used live database data stays valid.
+        version_fn: returns the current knowledge-base version; a change invalidates the cache
+                    (catches rebuilds done by another process).
+        """
+        self.embedder = embedder
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.live_data_ttl = live_data_ttl
+        self.version_fn = version_fn
+        self._version = version_fn() if version_fn else None
+        self._entries: List[Dict[str, Any]] = []
+        self._matrix = None
+        self._lock = threading.Lock()
+        self.metrics = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0, "invalidations": 0}
+
+    def _ready(self) -> bool:
+        return getattr(self.embedder, "status", "ready") == "ready"
+
+    def _embed(self, question: str) -> np.ndarray:
+        vec = np.asarray(self.embedder.embed([normalize_question(question)])[0], dtype=np.float32)
+        return vec / max(float(np.linalg.norm(vec)), 1e-12)
+
+    def _check_version(self) -> None:
+        if self.version_fn is None:
+            return
+        version = self.version_fn()
+        if version != self._version:
+            self._version = version
+            self.invalidate()
+
+    def lookup(self, question: str) -> Optional[Dict[str, Any]]:
+        """Return {"answer", "question", "agents", "similarity"} for a close previous question, else None."""
+        if not self._ready():
+            return None
+        self._check_version()
+        vec = self._embed(question)
+        now = time.monotonic()
+        with self._lock:
+            self._drop_expired(now)
+            if not self._entries:
+                self.metrics["misses"] += 1
+                return None
+            sims = self._matrix @ vec
+            best = int(np.argmax(sims))
+            if sims[best] < self.threshold:
+                self.metrics["misses"] += 1
+                return None
+            entry = self._entries[best]
+            entry["last_used"] = now
+            self.metrics["hits"] += 1
+            return {"answer": entry["answer"], "question": entry["question"], "agents": entry["agents"], "similarity": float(sims[best])}
+
+    def store(self, question: str, answer: str, agents: List[str]) -> bool:
+        """Cache an answer; returns False if the turn is not cacheable."""
+        if not answer or not agents or "END" in agents or not self._ready():
+            return False
+        vec = self._embed(question)
+        now = time.monotonic()
+        expires = now + self.live_data_ttl if LIVE_DATA_AGENTS.intersection(agents) else None
+        if expires is not None and self.live_data_ttl <= 0:
+            return False
+        with self._lock:
+            self._entries.append({
+                "question": question, "answer": answer, "agents": list(agents),
+                "expires": expires, "last_used": now, "vector": vec,
+            })
+            while len(self._entries) > self.max_entries:
+                lru = min(range(len(self._entries)), key=lambda i: self._entries[i]["last_used"])
+                del self._entries[lru]
+                self.metrics["evictions"] += 1
+            self._rebuild_matrix()
+            self.metrics["stores"] += 1
+        return True
+
+    def invalidate(self, *args, **kwargs) -> None:
+        """Drop every cached answer (hooked to knowledge-base rebuilds/syncs)."""
+        with self._lock:
+            self._entries = []
+            self._matrix = None
+            self.metrics["invalidations"] += 1
+
+    def _drop_expired(self, now: float) -> None:
+        alive = [e for e in self._entries if e["expires"] is None or e["expires"] > now]
+        if len(alive) != len(self._entries):
+            self.metrics["expired"] += len(self._entries) - len(alive)
+            self._entries = alive
+            self._rebuild_matrix()
+
+    def _rebuild_matrix(self) -> None:
+        self._matrix = np.stack([e["vector"] for e in self._entries]) if self._entries else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.metrics["hits"] + self.metrics["misses"]
+            return {**self.metrics, "size": len(self._entries), "hit_rate": self.metrics["hits"] / lookups if lookups else 0.0}
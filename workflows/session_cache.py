@@ -0,0 +1,78 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict
+
+# Bounded cache of compiled workflows, one entry per API key.
+# Keys are SHA-256 hashes so raw API keys never sit in memory as dict keys.
+# Eviction: least-recently-used when full, plus an idle TTL per entry.
+
+def hash_api_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+class WorkflowCache:
+    def __init__(self, factory: Callable[[str], Any], max_size: int = 32, idle_ttl: float = 1800.0):
+        """
+        factory: callable(api_key) -> compiled workflow, called on a cache miss.
+        max_size: maximum number of cached workflows (LRU eviction beyond this).
+        idle_ttl: seconds an entry may stay unused before it is evicted.
+        """
+        self.factory = factory
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.metrics = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def get(self, api_key: str) -> Any:
+        key = hash_api_key(api_key)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry["last_used"] = now
+                self._entries.move_to_end(key)
+                self.metrics["hits"] += 1
+                return entry["workflow"]
+            self.metrics["misses"] += 1
+        # Build outside the lock so one slow build does not block other sessions
+        workflow = self.factory(api_key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                # Another thread built the same key meanwhile; keep the first one
+                entry["last_used"] = now
+                self._entries.move_to_end(key)
+                return entry["workflow"]
+            self._entries[key] = {"workflow": workflow, "last_used": now}
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.metrics["evictions"] += 1
+        return workflow
+
+    def invalidate(self, api_key: str = None) -> None:
+        """Drop one API key's workflow, or everything if api_key is None."""
+        with self._lock:
+            if api_key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(hash_api_key(api_key), None)
+
+    def _evict_expired(self, now: float) -> None:
+        expired = [k for k, e in self._entries.items() if now - e["last_used"] > self.idle_ttl]
+        for k in expired:
+            del self._entries[k]
+        self.metrics["expired"] += len(expired)
+        self.metrics["evictions"] += len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.metrics["hits"] + self.metrics["misses"]
+            return {
+                **self.metrics,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hit_rate": self.metrics["hits"] / lookups if lookups else 0.0,
+            }
@@ -1,7 +1,12 @@
-from typing import List, Dict, TypedDict
+from typing import Any, List, Dict, TypedDict
 from typing_extensions import Annotated
 import operator
 
+# Reducer for per-agent results: parallel specialists each return {agent_name: result}
+# and LangGraph merges them here (fan-in) instead of agents mutating shared dicts.
+def merge_agent_results(left: Dict[str, str], right: Dict[str, str]) -> Dict[str, str]:
+    return {**(left or {}), **(right or {})}
+
 # Represents a single agent assignment (for any agent, extensible)
 class AgentAssignment(TypedDict):
     agent: str         # Agent name (e.g., "product_agent", "support_agent", ...)
@@ -19,5 +24,7 @@ class SupportFlowXState(TypedDict):
     chat_history: List[Dict[str, str]]     # Full chat history (user/agent)
     allowed_agents: List[str]              # List of allowed/registered agent names (can be extended)
     assigned_agents: AssignmentResponse    # List of agent assignments (for monitoring/debugging)
+    agent_results: Annotated[Dict[str, str], merge_agent_results]  # Agent name -> result (merged from parallel agents)
+    agent_data: Annotated[Dict[str, Any], merge_agent_results]     # Agent name -> structured payload (e.g. DB columns/rows)
     final_response: str                    # Final response to the user (set/replace)
     logs: Annotated[List[str], operator.add]                    # System logs (append/add) 
\ No newline at end of file
@@ -0,0 +1,217 @@
+import bisect
+import contextvars
+import json
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from config import settings
+
+# Per-stage latency tracing for the agent workflow.
+# Agents and RAGSystem wrap each stage (RAG encode, vector search, SQL generation/execution,
+# every LLM call, ...) in `with get_tracer().span("stage") as span:`. A finished span feeds a
+# latency histogram per stage plus token / cache-hit / error counters, served as Prometheus
+# text at settings.METRICS_PATH, and is optionally appended to a JSONL trace file.
+# Spans started inside a "turn" span share its trace id (contextvars follow asyncio tasks and
+# asyncio.to_thread). When tracing is disabled span() returns a shared no-op object.
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs) -> None:
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+class Span:
+    __slots__ = ("tracer", "stage", "attrs", "trace_id", "parent", "start", "wall_start", "duration", "error", "parent_span")
+
+    def __init__(self, tracer: "Tracer", stage: str, attrs: Dict[str, Any]):
+        self.tracer = tracer
+        self.stage = stage
+        self.attrs = attrs
+        self.error = None
+        self.duration = 0.0
+
+    def set(self, **attrs) -> None:
+        """Attach attributes: tokens_in / tokens_out and cache_hit also feed the metrics."""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        parent = self.parent_span = _current_span.get()
+        self.parent = parent.stage if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex[:16]
+        _current_span.set(self)
+        self.wall_start = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        # set() rather than reset(token): an async generator (main.achat) may exit in another context
+        _current_span.set(self.parent_span)
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"[:200]
+        self.tracer.record(self)
+        return False
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot: +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bucket bound containing the q-quantile (inf when it falls past the last bucket)."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+class Tracer:
+    def __init__(self, enabled: bool = True, jsonl_path: Optional[str] = None, buckets: Sequence[float] = (0.01, 0.1, 1.0, 10.0), prefix: str = "cafeagentx"):
+        """
+        enabled: False makes span() return NOOP_SPAN (nothing is timed or recorded).
+        jsonl_path: append one JSON object per finished span to this file (None/"" = off).
+        buckets: histogram upper bounds in seconds.
+        """
+        self.enabled = enabled
+        self.jsonl_path = jsonl_path or None
+        self.buckets = tuple(sorted(buckets))
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._file = None
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms: Dict[str, Histogram] = {}
+            self.errors: Dict[str, int] = {}
+            self.tokens: Dict[Tuple[str, str], int] = {}
+            self.cache: Dict[Tuple[str, str], int] = {}
+
+    def span(self, stage: str, **attrs):
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, stage, attrs)
+
+    def record(self, span: Span) -> None:
+        attrs = span.attrs
+        with self._lock:
+            histogram = self.histograms.get(span.stage)
+            if histogram is None:
+                histogram = self.histograms[span.stage] = Histogram(self.buckets)
+            histogram.observe(span.duration)
+            if span.error:
+                self.errors[span.stage] = self.errors.get(span.stage, 0) + 1
+            for direction in ("in", "out"):
+                n = attrs.get(f"tokens_{direction}")
+                if n:
+                    key = (span.stage, direction)
+                    self.tokens[key] = self.tokens.get(key, 0) + int(n)
+            if "cache_hit" in attrs:
+                key = (span.stage, "hit" if attrs["cache_hit"] else "miss")
+                self.cache[key] = self.cache.get(key, 0) + 1
+            if self.jsonl_path:
+                self._write(span)
+
+    def _write(self, span: Span) -> None:
+        """Called with the lock held."""
+        line = {
+            "ts": round(span.wall_start, 6),
+            "trace": span.trace_id,
+            "stage": span.stage,
+            "parent": span.parent,
+            "ms": round(span.duration * 1000, 3),
+            "error": span.error,
+            **{k: v for k, v in span.attrs.items() if isinstance(v, (str, int, float, bool)) or v is None},
+        }
+        try:
+            if self._file is None:
+                self._file = open(self.jsonl_path, "a", encoding="utf-8", buffering=1)
+            self._file.write(json.dumps(line, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"[Tracer] Trace file disabled ({self.jsonl_path}): {e}")
+            self.jsonl_path = None
+
+    def close(self) -> None:
+        """Stop writing the JSONL trace and close the file."""
+        with self._lock:
+            self.jsonl_path = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Per stage: count, mean and approximate p50/p95/p99 seconds (bucket bounds), errors."""
+        with self._lock:
+            return {
+                stage: {
+                    "count": h.count,
+                    "mean": h.sum / h.count if h.count else 0.0,
+                    "p50": h.quantile(0.5),
+                    "p95": h.quantile(0.95),
+                    "p99": h.quantile(0.99),
+                    "errors": self.errors.get(stage, 0),
+                }
+                for stage, h in sorted(self.histograms.items())
+            }
+
+    def prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format (version 0.0.4)."""
+        p = self.prefix
+        with self._lock:
+            lines = histogram_lines(f"{p}_stage_duration_seconds", "Latency of workflow stages.", dict(sorted(self.histograms.items())))
+            lines += [f"# HELP {p}_stage_errors_total Stages that raised.", f"# TYPE {p}_stage_errors_total counter"]
+            lines += [f'{p}_stage_errors_total{{stage="{stage}"}} {n}' for stage, n in sorted(self.errors.items())]
+            lines += [f"# HELP {p}_llm_tokens_total LLM tokens by stage and direction.", f"# TYPE {p}_llm_tokens_total counter"]
+            lines += [f'{p}_llm_tokens_total{{stage="{s}",direction="{d}"}} {n}' for (s, d), n in sorted(self.tokens.items())]
+            lines += [f"# HELP {p}_cache_lookups_total Cache lookups by stage and result.", f"# TYPE {p}_cache_lookups_total counter"]
+            lines += [f'{p}_cache_lookups_total{{stage="{s}",result="{r}"}} {n}' for (s, r), n in sorted(self.cache.items())]
+        return "\n".join(lines) + "\n"
+
+def histogram_lines(name: str, help_text: str, histograms: Dict[str, Histogram]) -> list:
+    """Prometheus text lines for {stage: histogram}; stage "" means no label."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for stage, h in histograms.items():
+        label = f'stage="{stage}"' if stage else ""
+        cumulative = 0
+        for bound, n in zip(h.buckets + (float("inf"),), h.counts):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'{name}_bucket{{{label + "," if label else ""}le="{le}"}} {cumulative}')
+        suffix = f"{{{label}}}" if label else ""
+        lines.append(f"{name}_sum{suffix} {h.sum:.6f}")
+        lines.append(f"{name}_count{suffix} {h.count}")
+    return lines
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+def get_tracer() -> Tracer:
+    """Process-wide tracer configured from settings."""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = Tracer(settings.TRACING_ENABLED, settings.TRACE_JSONL_PATH, settings.TRACE_BUCKETS)
+    return _tracer